@@ -0,0 +1,189 @@
+import csv
+import gzip
+import io
+import itertools
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from article_table import ARTICLE_FIELDS, LIST_FIELDS, SECTION_FIELD
+
+
+# Fields exported as lists (joined with '; ' in CSV, list<string> in Parquet)
+EXPORT_LIST_FIELDS = LIST_FIELDS + (SECTION_FIELD,)
+
+
+def open_text(path: str, compress: Optional[bool] = None):
+    """
+    Open path for writing text, gzip-compressed if compress or path ends in .gz
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if compress or (compress is None and path.endswith('.gz')):
+        return io.TextIOWrapper(gzip.open(path, 'wb'), encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_fields(articles: Iterable[Dict]) -> List[str]:
+    """
+    Columns for an export: ARTICLE_FIELDS, then every other key the articles have
+
+    Only lists and tuples are scanned for extra keys; a generator would be
+    consumed, so it gets ARTICLE_FIELDS alone.
+    """
+    fields = dict.fromkeys(ARTICLE_FIELDS)
+    if isinstance(articles, (list, tuple)):
+        for article in articles:
+            fields.update(dict.fromkeys(article))
+    return list(fields)
+
+
+def _peek_fields(articles: Iterable[Dict], fields: Optional[Sequence[str]]):
+    # Take the column list from the first article without losing it from the stream
+    iterator = iter(articles)
+    if fields is not None:
+        return list(fields), iterator
+    first = next(iterator, None)
+    if first is None:
+        return [], iterator
+    return list(first), itertools.chain([first], iterator)
+
+
+def write_csv(articles: Iterable[Dict], path: str, fields: Optional[Sequence[str]] = None,
+              chunk_size: int = 1000, compress: Optional[bool] = None) -> int:
+    """
+    Stream articles to CSV without modifying them
+
+    Args:
+        articles: Iterable of article dicts (a generator is consumed once)
+        path (str): Output file; '.gz' compresses
+        fields (list, optional): Columns to write; defaults to the first article's keys
+        chunk_size (int): Rows formatted and written per step
+        compress (bool, optional): Force gzip on or off regardless of the extension
+
+    Returns:
+        int: Rows written
+    """
+    fields, articles = _peek_fields(articles, fields)
+    count = 0
+    with open_text(path, compress) as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        for chunk in _chunks(articles, chunk_size):
+            writer.writerows(
+                {key: '; '.join(map(str, value)) if isinstance(value, list) else value
+                 for key, value in article.items()}
+                for article in chunk
+            )
+            count += len(chunk)
+    return count
+
+
+def write_json(articles: Iterable[Dict], path: str, chunk_size: int = 1000, lines: Optional[bool] = None,
+               compress: Optional[bool] = None) -> int:
+    """
+    Stream articles to a JSON array (or JSON Lines)
+
+    The array is written element by element, in the same indented layout as
+    json.dump(articles, indent=2), so the whole list never has to exist.
+
+    Args:
+        articles: Iterable of article dicts
+        path (str): Output file; '.jsonl' writes JSON Lines, '.gz' compresses
+        chunk_size (int): Articles serialized per write
+        lines (bool, optional): Force JSON Lines on or off regardless of the extension
+        compress (bool, optional): Force gzip on or off regardless of the extension
+
+    Returns:
+        int: Articles written
+    """
+    if lines is None:
+        lines = path[:-3].endswith('.jsonl') if path.endswith('.gz') else path.endswith('.jsonl')
+    count = 0
+    with open_text(path, compress) as f:
+        if not lines:
+            f.write('[')
+        for chunk in _chunks(articles, chunk_size):
+            if lines:
+                f.write(''.join(json.dumps(article, ensure_ascii=False) + '\n' for article in chunk))
+            else:
+                f.write(''.join(
+                    (',\n  ' if count or i else '\n  ') +
+                    json.dumps(article, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+                    for i, article in enumerate(chunk)
+                ))
+            count += len(chunk)
+        if not lines:
+            f.write('\n]' if count else ']')
+    return count
+
+
+def parquet_schema(fields: Sequence[str], types: Optional[Dict] = None):
+    """
+    Fixed Parquet schema for an export
+
+    List fields become list<string> columns and the rest string columns,
+    unless types gives a pyarrow type for the field. Every file written with
+    the same fields gets the same schema, even when a column is all null.
+    """
+    import pyarrow as pa
+
+    types = types or {}
+    return pa.schema([
+        (field, types.get(field) or (pa.list_(pa.string()) if field in EXPORT_LIST_FIELDS else pa.string()))
+        for field in fields
+    ])
+
+
+def write_parquet(articles: Iterable[Dict], path: str, fields: Optional[Sequence[str]] = None,
+                  chunk_size: int = 10000, compression: str = 'snappy', types: Optional[Dict] = None) -> int:
+    """
+    Stream articles to a Parquet file, one row group per chunk
+
+    List fields (authors, MeSH terms, ...) become list<string> columns, the
+    rest string columns. Needs pyarrow.
+
+    Args:
+        articles: Iterable of article dicts
+        path (str): Output .parquet file
+        fields (list, optional): Columns to write; defaults to the first article's keys
+        chunk_size (int): Rows per row group
+        compression (str): Parquet codec ('snappy', 'gzip', 'zstd', 'none')
+        types (dict, optional): field -> pyarrow type for non-string columns
+
+    Returns:
+        int: Rows written
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fields, articles = _peek_fields(articles, fields)
+    schema = parquet_schema(fields, types)
+
+    def column(chunk, field):
+        kind = schema.field(field).type
+        if pa.types.is_list(kind):
+            return [None if a.get(field) is None else [str(v) for v in a[field]] for a in chunk]
+        if pa.types.is_string(kind):
+            return [None if a.get(field) is None else str(a[field]) for a in chunk]
+        return [a.get(field) for a in chunk]
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    count = 0
+    with pq.ParquetWriter(path, schema, compression=compression) as writer:
+        for chunk in _chunks(articles, chunk_size):
+            writer.write_table(pa.Table.from_arrays([column(chunk, field) for field in fields], schema=schema))
+            count += len(chunk)
+    return count
@@ -0,0 +1,113 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class ArticleStore:
+    def __init__(self, path=".pubkin_cache/articles.sqlite", ttl=7 * 24 * 3600):
+        """
+        Local cache of parsed PubMed records keyed by PMID
+
+        Stores the dict produced by _extract_article_info together with the
+        time it was fetched. Records older than ttl seconds count as misses.
+
+        Args:
+            path (str): SQLite file to use (created if missing)
+            ttl (float): Seconds a record stays fresh; None keeps records forever
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                pmid TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get_many(self, pmids, fresh_only=True):
+        """
+        Look up fresh records
+
+        Args:
+            pmids (list): PubMed IDs
+            fresh_only (bool): Skip records older than ttl; False returns any
+                stored record (used to render hits from the vector indexes)
+
+        Returns:
+            dict: Mapping of pmid -> article dict for the hits
+        """
+        hits = {}
+        pmids = [str(p) for p in pmids]
+        if not pmids:
+            return hits
+
+        oldest = time.time() - self.ttl if self.ttl is not None and fresh_only else 0
+        with self._lock:
+            for start in range(0, len(pmids), 500):
+                chunk = pmids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT pmid, data FROM articles "
+                    f"WHERE pmid IN ({placeholders}) AND fetched_at >= ?",
+                    chunk + [oldest],
+                ).fetchall()
+                for pmid, data in rows:
+                    hits[pmid] = json.loads(data)
+        return hits
+
+    def put_many(self, articles):
+        """
+        Insert or refresh records
+
+        Args:
+            articles (list): Article dictionaries (must contain 'pmid')
+        """
+        now = time.time()
+        rows = [
+            (str(a['pmid']), json.dumps(a, ensure_ascii=False), now)
+            for a in articles if a.get('pmid')
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO articles (pmid, data, fetched_at) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def purge_expired(self):
+        """
+        Delete records older than ttl
+
+        Vector index hits are rendered from these records, so purged articles
+        drop out of corpus-wide results until they are fetched again.
+        """
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM articles WHERE fetched_at < ?", (time.time() - self.ttl,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
@@ -0,0 +1,202 @@
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+
+# Free-text fields that are (almost) unique per article
+TEXT_FIELDS = ('pmid', 'title', 'abstract', 'doi', 'pub_date', 'volume', 'issue', 'pages')
+
+# Low-cardinality fields stored as codes into a shared vocabulary
+CATEGORY_FIELDS = ('journal', 'journal_abbrev', 'issn', 'pub_year', 'language',
+                   'country', 'nlm_unique_id', 'issn_linking')
+
+# List fields stored as offsets + codes into a shared vocabulary
+LIST_FIELDS = ('authors', 'keywords', 'mesh_terms', 'publication_types')
+
+# AbstractText sections, stored as start offsets into the abstract they were joined into
+SECTION_FIELD = 'abstract_sections'
+
+# Key order of PubMedQuerier._extract_article_info
+ARTICLE_FIELDS = ('pmid', 'title', 'abstract', 'abstract_sections', 'authors', 'journal', 'journal_abbrev', 'issn',
+                  'volume', 'issue', 'pages', 'pub_date', 'pub_year', 'doi', 'keywords',
+                  'mesh_terms', 'publication_types', 'language', 'country', 'nlm_unique_id',
+                  'issn_linking')
+
+
+class _Vocabulary:
+    __slots__ = ('values', 'codes')
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value):
+        value = '' if value is None else str(value)
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.codes[value] = code
+        return code
+
+
+class SearchHit:
+    __slots__ = ('row', 'score', 'rrf_score')
+
+    def __init__(self, row: int, score: Optional[float], rrf_score: Optional[float] = None):
+        """
+        A search result: a row of an ArticleTable and its similarity score
+
+        score is always the dense (cosine) similarity, None when it cannot be
+        computed; rrf_score is the fused rank score hybrid search orders by.
+        """
+        self.row = row
+        self.score = score
+        self.rrf_score = rrf_score
+
+    def __repr__(self):
+        return f"SearchHit(row={self.row}, score={self.score}, rrf_score={self.rrf_score})"
+
+
+class ArticleTable:
+    def __init__(self):
+        """
+        Columnar container for article dicts from _extract_article_info
+
+        Text fields are kept as one list per column, journal/year/language
+        style fields as integer codes into a vocabulary, and list fields
+        (authors, keywords, MeSH terms, publication types) as flat code
+        arrays with per-row offsets. Every distinct string is stored once.
+        Abstract sections only cost one offset each, since the abstract is
+        their concatenation.
+        """
+        self._text = {field: [] for field in TEXT_FIELDS}
+        self._category = {field: array('I') for field in CATEGORY_FIELDS}
+        self._category_vocab = {field: _Vocabulary() for field in CATEGORY_FIELDS}
+        self._list_codes = {field: array('I') for field in LIST_FIELDS}
+        self._list_offsets = {field: array('Q', [0]) for field in LIST_FIELDS}
+        self._list_vocab = {field: _Vocabulary() for field in LIST_FIELDS}
+        self._section_starts = array('I')
+        self._section_offsets = array('Q', [0])
+        self._rows_by_pmid: Dict[str, int] = {}
+
+    @classmethod
+    def from_articles(cls, articles: Iterable[Dict]):
+        table = cls()
+        table.extend(articles)
+        return table
+
+    def __len__(self):
+        return len(self._text['pmid'])
+
+    def __getitem__(self, row):
+        return self.row(row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.row(row)
+
+    def append(self, article: Dict) -> int:
+        """
+        Add one article and return its row index (existing PMIDs are not duplicated)
+        """
+        pmid = str(article.get('pmid', ''))
+        if pmid and pmid in self._rows_by_pmid:
+            return self._rows_by_pmid[pmid]
+
+        row = len(self)
+        for field in TEXT_FIELDS:
+            value = article.get(field) or ''
+            self._text[field].append(str(value))
+
+        for field in CATEGORY_FIELDS:
+            self._category[field].append(self._category_vocab[field].encode(article.get(field)))
+
+        for field in LIST_FIELDS:
+            codes = self._list_codes[field]
+            vocab = self._list_vocab[field]
+            for value in article.get(field) or []:
+                codes.append(vocab.encode(value))
+            self._list_offsets[field].append(len(codes))
+
+        sections = article.get(SECTION_FIELD) or []
+        if len(sections) > 1 and ' '.join(sections) == self._text['abstract'][row]:
+            start = 0
+            for section in sections:
+                self._section_starts.append(start)
+                start += len(section) + 1
+        self._section_offsets.append(len(self._section_starts))
+
+        if pmid:
+            self._rows_by_pmid[pmid] = row
+        return row
+
+    def extend(self, articles: Iterable[Dict]):
+        for article in articles:
+            self.append(article)
+
+    def row_of(self, pmid):
+        """
+        Row index of pmid, or None
+        """
+        return self._rows_by_pmid.get(str(pmid))
+
+    def get(self, row: int, field: str):
+        """
+        Value of one field for one row
+        """
+        if field in self._text:
+            return self._text[field][row]
+        if field in self._category:
+            return self._category_vocab[field].values[self._category[field][row]]
+        if field in self._list_codes:
+            offsets = self._list_offsets[field]
+            values = self._list_vocab[field].values
+            return [values[c] for c in self._list_codes[field][offsets[row]:offsets[row + 1]]]
+        if field == SECTION_FIELD:
+            abstract = self._text['abstract'][row]
+            starts = self._section_starts[self._section_offsets[row]:self._section_offsets[row + 1]]
+            if not starts:
+                return [abstract] if abstract else []
+            ends = [start - 1 for start in starts[1:]] + [len(abstract)]
+            return [abstract[start:end] for start, end in zip(starts, ends)]
+        raise KeyError(field)
+
+    def list_codes(self, row: int, field: str):
+        """
+        Vocabulary codes of a list field for one row (no string materialization)
+        """
+        offsets = self._list_offsets[field]
+        return self._list_codes[field][offsets[row]:offsets[row + 1]]
+
+    def vocabulary(self, field: str) -> List[str]:
+        """
+        Distinct values of a category or list field, indexed by code
+        """
+        if field in self._category_vocab:
+            return self._category_vocab[field].values
+        return self._list_vocab[field].values
+
+    def row(self, row: int) -> Dict:
+        """
+        Materialize one row as an article dict
+        """
+        return {field: self.get(row, field) for field in ARTICLE_FIELDS}
+
+    def result(self, hit: SearchHit, chunk: str = '') -> Dict:
+        """
+        Materialize a search hit in the result-dict format the UI renders
+        """
+        row = hit.row
+        return {
+            "pmid": self.get(row, 'pmid'),
+            "similarity": hit.score,
+            "rrf_score": hit.rrf_score,
+            "title": self.get(row, 'title'),
+            "abstract": self.get(row, 'abstract'),
+            "chunk": chunk,
+            "authors": self.get(row, 'authors'),
+            "doi": self.get(row, 'doi'),
+            "journal": self.get(row, 'journal'),
+            "pub_year": self.get(row, 'pub_year'),
+            "publication_types": self.get(row, 'publication_types')
+        }
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+import asyncio
+import io
+import json
+
+import aiohttp
+
+from pubmed_xml import parse_pubmed_articles
+from rate_limiter import get_entrez_limiter, retry_delay
+
+EUTILS_BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+
+
+class EntrezHTTPError(Exception):
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AsyncPubMedQuerier:
+    # Retry policy for transient E-utilities failures
+    max_retries = 4
+    backoff_base = 0.5
+    backoff_max = 30.0
+
+    def __init__(self, email, api_key=None, base_url=EUTILS_BASE_URL, max_concurrency=None,
+                 article_store=None, tool="pubkin"):
+        """
+        asyncio PubMed querier sharing one keep-alive connection pool
+
+        Create one instance per process and reuse it across user searches;
+        every request goes through the same process-wide rate limiter as
+        PubMedQuerier.
+
+        Args:
+            email (str): Your email address (required by NCBI)
+            api_key (str, optional): NCBI API key for higher rate limits
+            base_url (str): E-utilities base URL (point at a local mock for testing)
+            max_concurrency (int, optional): Requests in flight at once (defaults to the rate limit)
+            article_store (ArticleStore, optional): Local cache consulted before fetching
+            tool (str): Tool name reported to NCBI
+        """
+        self.email = email
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/') + '/'
+        self.tool = tool
+        self.article_store = article_store
+
+        self.rate_limiter = get_entrez_limiter(api_key)
+        self.max_concurrency = max_concurrency or int(self.rate_limiter.rate)
+        self._semaphore = None
+        self._session = None
+
+        # PMIDs that could not be fetched by the last fetch_article_details call
+        self.failed_pmids = []
+
+    async def __aenter__(self):
+        await self._get_session()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=120),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def _acquire_rate_limit(self):
+        while True:
+            wait = self.rate_limiter.try_acquire()
+            if wait == 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def _request(self, endpoint, params):
+        """
+        POST one E-utilities request with rate limiting and retries
+
+        Returns:
+            bytes: Response body
+        """
+        session = await self._get_session()
+        params = dict(params, tool=self.tool, email=self.email)
+        if self.api_key:
+            params['api_key'] = self.api_key
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    await self._acquire_rate_limit()
+                    async with session.post(self.base_url + endpoint, data=params) as response:
+                        body = await response.read()
+                        if response.status != 200:
+                            raise EntrezHTTPError(
+                                response.status,
+                                body[:200].decode('utf-8', 'replace'),
+                                response.headers.get('Retry-After'),
+                            )
+                        return body
+            except (EntrezHTTPError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # Client errors other than 429 will not succeed on retry
+                retryable = not isinstance(e, EntrezHTTPError) or e.status == 429 or e.status >= 500
+                if attempt == self.max_retries or not retryable:
+                    raise
+                delay = retry_delay(getattr(e, 'retry_after', None), attempt, self.backoff_base, self.backoff_max)
+                print(f"[WARN] Request failed ({e}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def search_pubmed(self, query, max_results=30, sort_by='relevance'):
+        """
+        Search PubMed for articles matching the query
+
+        Args:
+            query (str): Search query
+            max_results (int): Maximum number of results to retrieve
+            sort_by (str): Sort order ('relevance', 'pub_date', 'title', etc.)
+
+        Returns:
+            list: List of PubMed IDs
+        """
+        try:
+            print(f"Searching PubMed for: '{query}'")
+            body = await self._request('esearch.fcgi', {
+                'db': 'pubmed',
+                'term': query,
+                'retmax': max_results,
+                'sort': sort_by,
+                'retmode': 'json',
+            })
+            result = json.loads(body)['esearchresult']
+            id_list = result.get('idlist', [])
+            print(f"Found {len(id_list)} articles")
+            return id_list
+
+        except Exception as e:
+            print(f"Error during search: {e}")
+            return []
+
+    async def _efetch(self, batch):
+        body = await self._request('efetch.fcgi', {
+            'db': 'pubmed',
+            'id': ','.join(str(p) for p in batch),
+            'rettype': 'medline',
+            'retmode': 'xml',
+        })
+        # Parsing is CPU-bound; keep it off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, parse_pubmed_articles, io.BytesIO(body))
+
+    async def _fetch_batch(self, batch):
+        """
+        Fetch one batch of PMIDs, splitting it in half when it keeps failing
+
+        Returns:
+            tuple: (articles, failed_pmids)
+        """
+        try:
+            return await self._efetch(batch), []
+        except Exception as e:
+            if len(batch) == 1:
+                print(f"[ERROR] Failed fetching PMID {batch[0]}: {e}")
+                return [], list(batch)
+            print(f"[WARN] Batch {batch} kept failing ({e}); splitting")
+            mid = len(batch) // 2
+            (left, left_failed), (right, right_failed) = await asyncio.gather(
+                self._fetch_batch(batch[:mid]), self._fetch_batch(batch[mid:])
+            )
+            return left + right, left_failed + right_failed
+
+    async def fetch_article_details(self, pmid_list, return_failed=False, batch_size=10):
+        """
+        Fetch detailed information for a list of PubMed IDs concurrently
+
+        Args:
+            pmid_list (list): PubMed IDs to fetch
+            return_failed (bool): Also return the PMIDs that still failed
+            batch_size (int): PMIDs per efetch request
+
+        Returns:
+            list: Article dictionaries, or (articles, failed_pmids) if return_failed
+        """
+        articles = []
+        failed = []
+
+        # The store does blocking SQLite I/O; keep it off the event loop like parsing
+        loop = asyncio.get_running_loop()
+        if self.article_store is not None:
+            cached = await loop.run_in_executor(None, self.article_store.get_many, pmid_list)
+            articles.extend(cached[str(p)] for p in pmid_list if str(p) in cached)
+            pmid_list = [p for p in pmid_list if str(p) not in cached]
+
+        print(f"Fetching {len(pmid_list)} articles in batches of {batch_size}...")
+        batches = [pmid_list[i:i + batch_size] for i in range(0, len(pmid_list), batch_size)]
+
+        for batch_articles, batch_failed in await asyncio.gather(
+            *(self._fetch_batch(batch) for batch in batches)
+        ):
+            articles.extend(batch_articles)
+            failed.extend(batch_failed)
+            if batch_articles and self.article_store is not None:
+                await loop.run_in_executor(None, self.article_store.put_many, batch_articles)
+
+        self.failed_pmids = failed
+        print(f"[INFO] Finished fetching {len(articles)} articles")
+        if failed:
+            print(f"[WARN] {len(failed)} PMIDs could not be fetched: {failed}")
+
+        if return_failed:
+            return articles, failed
+        return articles
@@ -0,0 +1,53 @@
+import atexit
+import threading
+from typing import Callable, Iterable
+
+
+class Autosaver:
+    def __init__(self, saves: Iterable[Callable[[], None]], interval: float = 120):
+        """
+        Flush persistent indexes from a background thread
+
+        Searches only change the in-memory indexes; this thread writes the
+        dirty ones every interval seconds, and once more at interpreter exit,
+        so no request waits on disk I/O.
+
+        Args:
+            saves (list): Callables that write their index if it changed
+                (VectorIndexStore.save_all, BM25Index.save_if_dirty)
+            interval (float): Seconds between flushes
+        """
+        self.saves = list(saves)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, name="pubkin-autosave", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """
+        Write every dirty index now
+        """
+        with self._flush_lock:
+            for save in self.saves:
+                try:
+                    save()
+                except Exception as e:
+                    # Keep the data in memory and try again next round
+                    print(f"[WARN] Saving index failed: {e}")
+
+    def stop(self):
+        """
+        Stop the thread and write what is still unsaved
+        """
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        atexit.unregister(self.stop)
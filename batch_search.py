@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Headless batch search: run a file of queries through the same
+convert → esearch → efetch → rank chain as the Streamlit app.
+
+Queries run concurrently in one SearchJobs pool, so they share the model,
+the embedding cache, the article store and the query-conversion cache.
+Each query is ranked only against its own PMIDs, so its results do not
+depend on the other queries or on the order they ran in; --shared-index
+ranks against everything in the persistent vector/BM25 indexes instead,
+like the app does. Results are streamed to JSONL or Parquet, one row
+per (query, rank). Every finished query is recorded in a checkpoint log
+next to the output, so an interrupted run resumes with the queries it had
+not finished.
+
+The query file is either plain text (one query per line, '#' comments) or
+JSONL with a "query" key and optional "id", "use_case" and "max_results".
+
+Usage:
+    python batch_search.py queries.txt --email me@example.org -o results.jsonl
+    python batch_search.py queries.jsonl --email me@example.org -o results.parquet --concurrency 8
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from collections import deque
+
+from article_export import write_parquet
+from article_store import ArticleStore
+from autosave import Autosaver
+from embedding_cache import EmbeddingCache
+from hybrid_search import BM25Index
+from metrics import get_metrics, summarize
+from search_jobs import SearchJob, SearchJobs
+from vector_index import VectorIndexStore
+
+
+# similarity is the cosine similarity; rrf_score the fused rank score (hybrid runs only)
+RESULT_FIELDS = ('pmid', 'similarity', 'rrf_score', 'title', 'journal', 'pub_year', 'doi', 'authors',
+                 'publication_types', 'abstract')
+
+# Columns of an output row: the query, then the result
+ROW_FIELDS = ('query_id', 'query', 'converted_query', 'use_case', 'rank') + RESULT_FIELDS
+
+
+class Verbatim:
+    def __init__(self, query: str):
+        """
+        Query "conversion" that keeps the query as written (--no-convert)
+        """
+        self.query = query
+
+    def query_convert(self):
+        return self.query
+
+
+def isolated(search_class, bm25=True):
+    """
+    search_class that ranks a query only against the articles it fetched
+
+    Each searcher gets an in-memory vector store and, with bm25, its own BM25
+    index; vectors still come from the shared embedding cache.
+    """
+    def make(model, query, articles):
+        return search_class(model, query, articles, sparse_index=BM25Index() if bm25 else None)
+    return make
+
+
+def query_id(query):
+    return hashlib.sha1(" ".join(query.split()).encode("utf-8")).hexdigest()[:16]
+
+
+def read_queries(path, use_case, max_results):
+    """
+    Read a .txt or .jsonl query file
+
+    Returns:
+        list: Dicts with id, query, use_case and max_results, duplicates removed
+    """
+    queries = {}
+    with open(path, encoding='utf-8') as f:
+        jsonl = path.endswith('.jsonl')
+        for line in f:
+            line = line.strip()
+            if not line or (not jsonl and line.startswith('#')):
+                continue
+            entry = json.loads(line) if jsonl else {'query': line}
+            entry.setdefault('use_case', use_case)
+            entry.setdefault('max_results', max_results)
+            entry['id'] = str(entry.get('id') or query_id(entry['query']))
+            queries.setdefault(entry['id'], entry)
+    return list(queries.values())
+
+
+class Checkpoint:
+    def __init__(self, path):
+        """
+        Append-only log of finished queries, one JSON line per query
+
+        Each line also records the output size after the query's rows were
+        written, so a JSONL output can be cut back to the last finished query.
+        """
+        self.path = path
+        self.completed = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        good = 0
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # torn last line from a crash
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    self.completed[entry['id']] = entry
+                    good += len(line)
+        self._file = open(path, 'a', encoding='utf-8')
+        # Cut the torn tail so the next record starts on a line of its own
+        self._file.truncate(good)
+
+    @property
+    def offset(self):
+        return max((entry.get('offset', 0) for entry in self.completed.values()), default=0)
+
+    def record(self, entry):
+        self.completed[entry['id']] = entry
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlOutput:
+    def __init__(self, path, checkpoint):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a+b')
+        # Drop rows of a query that was being written when the last run stopped
+        self._file.truncate(checkpoint.offset)
+        self._file.seek(0, os.SEEK_END)
+
+    def write(self, query_id, rows):
+        for row in rows:
+            self._file.write((json.dumps(row, ensure_ascii=False) + '\n').encode('utf-8'))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetOutput:
+    def __init__(self, path, checkpoint):
+        """
+        Parquet dataset directory with one part file per query
+
+        Parquet files cannot be appended to, so each query is written whole
+        (atomically, through a temporary file). Every part has the same fixed
+        schema, so pandas.read_parquet(path) reads the directory back as one
+        table even when a column is all null in some parts.
+        """
+        import pyarrow as pa
+
+        self.types = {'rank': pa.int32(), 'similarity': pa.float64(), 'rrf_score': pa.float64()}
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        # A query is only done if its part file made it to disk
+        for qid in [qid for qid in checkpoint.completed
+                    if checkpoint.completed[qid].get('rows') and not os.path.exists(self._part(qid))]:
+            del checkpoint.completed[qid]
+
+    def _part(self, query_id):
+        return os.path.join(self.path, f"part-{query_id}.parquet")
+
+    def write(self, query_id, rows):
+        if rows:
+            part = self._part(query_id)
+            write_parquet(rows, part + '.tmp', fields=ROW_FIELDS, types=self.types)
+            os.replace(part + '.tmp', part)
+        return 0
+
+    def close(self):
+        pass
+
+
+def result_rows(entry, job):
+    use_case = entry['use_case']
+    rows = []
+    for rank, item in enumerate(job.similarities, start=1):
+        row = {
+            'query_id': entry['id'],
+            'query': entry['query'],
+            'converted_query': job.converted,
+            'use_case': use_case if isinstance(use_case, str) else json.dumps(use_case, sort_keys=True),
+            'rank': rank,
+        }
+        row.update({field: item.get(field) for field in RESULT_FIELDS})
+        rows.append(row)
+    return rows
+
+
+def run_batch(jobs, queries, output, checkpoint, email, window):
+    """
+    Submit queries with at most window outstanding and write them back in order
+
+    Returns:
+        tuple: (finished, failed) query counts
+    """
+    pending = [entry for entry in queries if entry['id'] not in checkpoint.completed]
+    print(f"[INFO] {len(queries)} queries, {len(queries) - len(pending)} already done, {len(pending)} to run")
+
+    in_flight = deque()
+    finished = failed = 0
+    todo = iter(pending)
+    while True:
+        while len(in_flight) < window:
+            entry = next(todo, None)
+            if entry is None:
+                break
+            in_flight.append((entry, jobs.submit(email, entry['query'], entry['use_case'], entry['max_results'])))
+        if not in_flight:
+            break
+
+        entry, job = in_flight.popleft()
+        job.wait()
+        if job.status == SearchJob.FAILED:
+            # Not checkpointed, so the next run retries it
+            failed += 1
+            print(f"[WARN] Query {entry['id']} failed: {job.error}")
+            continue
+
+        rows = result_rows(entry, job)
+        offset = output.write(entry['id'], rows)
+        checkpoint.record({'id': entry['id'], 'rows': len(rows), 'articles': len(job.articles),
+                           'cached': job.cached, 'offset': offset})
+        finished += 1
+        print(f"[INFO] {finished + failed}/{len(pending)} {entry['id']}: {len(rows)} results"
+              f"{' (cached)' if job.cached else ''}")
+    return finished, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('queries', help='.txt (one query per line) or .jsonl query file')
+    parser.add_argument('-o', '--output', required=True, help='.jsonl file or .parquet dataset directory')
+    parser.add_argument('--email', required=True, help='Contact email for NCBI E-utilities')
+    parser.add_argument('--use-case', default='combined', choices=('title', 'abstract', 'combined'))
+    parser.add_argument('--max-results', type=int, default=30, help='PMIDs fetched per query')
+    parser.add_argument('--top-k', type=int, default=25, help='Ranked results written per query')
+    parser.add_argument('--concurrency', type=int, default=4, help='Queries running at the same time')
+    parser.add_argument('--no-convert', action='store_true', help='Send queries to PubMed as written')
+    parser.add_argument('--no-bm25', action='store_true',
+                        help='Rank by embedding similarity only instead of fusing it with BM25')
+    parser.add_argument('--shared-index', action='store_true',
+                        help='Rank against every article in the persistent indexes, not just the query\'s own '
+                             '(results then depend on which queries ran before)')
+    parser.add_argument('--checkpoint', help='Checkpoint log (default: <output>.checkpoint.jsonl)')
+    parser.add_argument('--metrics-file', help='Write Prometheus text metrics here at the end')
+    parser.add_argument('--trace-file', help='Write a Chrome/Perfetto JSON trace of every stage here')
+    parser.add_argument('--embed-workers', type=int, default=int(os.getenv('PUBKIN_EMBED_WORKERS', '0')),
+                        help='Embedding worker processes (0 encodes in this process)')
+    args = parser.parse_args()
+
+    parquet = args.output.endswith('.parquet')
+    if not parquet and not args.output.endswith('.jsonl'):
+        parser.error("--output must end in .jsonl or .parquet")
+    queries = read_queries(args.queries, args.use_case, args.max_results)
+    if not queries:
+        parser.error("No queries found")
+
+    # Imported here so --help works without loading torch or the LLM client
+    from embedding_service import EmbeddingService
+    from query_conversion import queryConvert
+    from query_pubmed import PubMedQuerier
+    from searchworkflow_faiss import SearchWork_faiss
+    from wrapPubmed import PubMedBERTEmbedding
+
+    checkpoint = Checkpoint(args.checkpoint or args.output.rstrip('/') + '.checkpoint.jsonl')
+    output = ParquetOutput(args.output, checkpoint) if parquet else JsonlOutput(args.output, checkpoint)
+
+    service = EmbeddingService(workers=args.embed_workers) if args.embed_workers > 0 else None
+    model = PubMedBERTEmbedding(cache=EmbeddingCache(), service=service)
+    article_store = ArticleStore()
+    search_class, shared, autosaver = isolated(SearchWork_faiss, bm25=not args.no_bm25), {}, None
+    if args.shared_index:
+        index_store = VectorIndexStore(dim=model.model.get_sentence_embedding_dimension(),
+                                       article_store=article_store, model=model.cache_name)
+        index_store.load_all()
+        search_class, shared, saves = SearchWork_faiss, {'index_store': index_store}, [index_store.save_all]
+        if not args.no_bm25:
+            shared['sparse_index'] = BM25Index.open()
+            saves.append(shared['sparse_index'].save_if_dirty)
+        autosaver = Autosaver(saves)
+    jobs = SearchJobs(
+        model, PubMedQuerier, search_class, Verbatim if args.no_convert else queryConvert,
+        article_store=article_store, max_workers=args.concurrency, top_k=args.top_k, **shared,
+    )
+
+    try:
+        finished, failed = run_batch(jobs, queries, output, checkpoint, args.email, window=2 * args.concurrency)
+    finally:
+        output.close()
+        checkpoint.close()
+        if autosaver is not None:
+            autosaver.stop()
+        if service is not None:
+            service.close()
+    print(f"[INFO] Done: {finished} queries written to {args.output}, {failed} failed")
+
+    metrics = get_metrics()
+    for row in summarize(metrics.spans()):
+        print(f"[INFO] {row['stage']:<14} calls={row['calls']:<6} p50={row['p50_ms']}ms "
+              f"p95={row['p95_ms']}ms total={row['total_ms'] / 1000:.1f}s")
+    if args.metrics_file:
+        metrics.write_prometheus(args.metrics_file)
+    if args.trace_file:
+        metrics.write_trace(args.trace_file)
+
+
+if __name__ == '__main__':
+    main()
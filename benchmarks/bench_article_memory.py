@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Measure memory of article dicts + per-result copies against ArticleTable +
+SearchHit on a synthetic corpus.
+
+Usage:
+    python benchmarks/bench_article_memory.py --articles 50000
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from article_table import ArticleTable, SearchHit
+
+
+WORDS = (
+    "kinase inhibitor glycogen synthase tau neuronal apoptosis signaling pathway "
+    "cohort randomized trial patients outcome expression receptor binding affinity"
+).split()
+PUB_TYPES = ["Journal Article", "Review", "Randomized Controlled Trial", "Meta-Analysis",
+             "Case Reports", "Research Support, Non-U.S. Gov't"]
+
+
+def _text(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+
+def synthetic_articles(n, seed=0):
+    """
+    Article dicts with the _extract_article_info schema and realistic repetition
+    """
+    rng = random.Random(seed)
+    journals = [f"Journal of {_text(rng, 2).title()} {i}" for i in range(2000)]
+    mesh = [_text(rng, 2).title() for _ in range(5000)]
+    authors = [f"Name{i} N Author{i}" for i in range(100000)]
+    for i in range(n):
+        journal = rng.choice(journals)
+        yield {
+            'pmid': str(30000000 + i),
+            'title': _text(rng, 12),
+            'abstract': _text(rng, 200),
+            'authors': rng.sample(authors, rng.randint(1, 8)),
+            'journal': journal,
+            'journal_abbrev': journal[:12],
+            'issn': f"{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+            'volume': str(rng.randint(1, 80)),
+            'issue': str(rng.randint(1, 12)),
+            'pages': f"{rng.randint(1, 500)}-{rng.randint(501, 999)}",
+            'pub_date': f"{rng.randint(1990, 2025)}-Jan",
+            'pub_year': str(rng.randint(1990, 2025)),
+            'doi': f"10.1000/test.{i}",
+            'keywords': [_text(rng, 1) for _ in range(rng.randint(0, 5))],
+            'mesh_terms': rng.sample(mesh, rng.randint(0, 12)),
+            'publication_types': rng.sample(PUB_TYPES, rng.randint(1, 2)),
+            'language': 'eng',
+            'country': rng.choice(['United States', 'England', 'Germany', 'China']),
+            'nlm_unique_id': str(rng.randint(1, 2000)),
+            'issn_linking': f"{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+        }
+
+
+def measure(name, build):
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<40} {current / 2**20:9.1f} MiB")
+    return obj, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=50000)
+    args = parser.parse_args()
+
+    # The parsed corpus exists either way; what differs is what the search layer keeps
+    articles = list(synthetic_articles(args.articles))
+    scores = [random.random() for _ in articles]
+
+    def dict_pipeline():
+        # What SearchWork_faiss used to hold: per-article metadata copies plus result dicts
+        metadata = [{
+            "pmid": a['pmid'], "title": a['title'], "abstract": a['abstract'],
+            "chunk": f"{a['title']}. {a['abstract']}", "authors": list(a['authors']),
+            "doi": a['doi'], "journal": a['journal'], "pub_year": a['pub_year'],
+            "publication_types": list(a['publication_types']),
+        } for a in articles]
+        results = [dict(m, similarity=s) for m, s in zip(metadata, scores)]
+        return metadata, results
+
+    def table_pipeline():
+        table = ArticleTable.from_articles(articles)
+        hits = [SearchHit(row, score) for row, score in enumerate(scores)]
+        return table, hits
+
+    _, before = measure("dict metadata + result dicts", dict_pipeline)
+    (table, _), after = measure("ArticleTable + SearchHit", table_pipeline)
+
+    # The table itself can replace the list of dicts
+    del table
+    gc.collect()
+    _, dicts = measure("source list of article dicts (rebuilt)", lambda: list(synthetic_articles(args.articles)))
+    _, columnar = measure("ArticleTable only (from generator)",
+                          lambda: ArticleTable.from_articles(synthetic_articles(args.articles)))
+
+    print(f"\nSearch layer: {before / after:.1f}x smaller")
+    print(f"Corpus storage: {dicts / columnar:.1f}x smaller")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Throughput of concurrent embedding requests: one in-process model (what the
+Streamlit server does today) against EmbeddingService worker pools.
+
+Each client thread sends --requests requests of --texts-per-request
+abstract-length texts, like sessions embedding queries and result batches
+at the same time.
+
+Usage:
+    python benchmarks/bench_embedding_service.py --clients 16 --workers 1,2,4
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from embedding_service import EmbeddingService
+
+
+WORDS = ("patients treatment randomized trial outcome cohort risk mortality clinical "
+         "therapy dose placebo efficacy adverse events follow-up analysis").split()
+
+
+def make_texts(n, words=120, seed=0):
+    rng = np.random.default_rng(seed)
+    return [' '.join(rng.choice(WORDS, words)) for _ in range(n)]
+
+
+def run_clients(encode, clients, requests, texts, per_request):
+    def client(i):
+        for r in range(requests):
+            start = ((i * requests + r) * per_request) % (len(texts) - per_request + 1)
+            encode(texts[start:start + per_request])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        list(pool.map(client, range(clients)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='neuml/pubmedbert-base-embeddings')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent client threads')
+    parser.add_argument('--requests', type=int, default=4, help='Requests per client')
+    parser.add_argument('--texts-per-request', type=int, default=8)
+    parser.add_argument('--workers', default='1,2,4', help='Comma-separated pool sizes to try')
+    parser.add_argument('--max-latency-ms', type=float, default=10.0)
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts_per_request * 10)
+    total = args.clients * args.requests * args.texts_per_request
+    print(f"{args.clients} clients x {args.requests} requests x {args.texts_per_request} texts "
+          f"= {total} texts, {os.cpu_count()} CPUs\n")
+    print(f"{'backend':<28} {'seconds':>8} {'texts/s':>9}")
+
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(args.model, device='cpu')
+    lock = threading.Lock()
+
+    def in_process(batch):
+        # One model shared by all sessions: requests serialize on it
+        with lock:
+            return model.encode(batch, convert_to_numpy=True)
+
+    in_process(texts[:2])
+    elapsed = run_clients(in_process, args.clients, args.requests, texts, args.texts_per_request)
+    print(f"{'in-process':<28} {elapsed:8.2f} {total / elapsed:9.1f}")
+    del model
+
+    for workers in (int(w) for w in args.workers.split(',')):
+        with EmbeddingService(args.model, workers=workers, max_batch_size=args.max_batch_size,
+                              max_latency_ms=args.max_latency_ms) as service:
+            service.encode(texts[:2])
+            elapsed = run_clients(service.encode, args.clients, args.requests, texts, args.texts_per_request)
+            label = f"service {workers}w x {service.threads_per_worker}t"
+            print(f"{label:<28} {elapsed:8.2f} {total / elapsed:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
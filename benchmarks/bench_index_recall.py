@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Recall vs latency report for the PmidFaissIndex layouts.
+
+Every configuration is compared against exact (flat) search on the same
+vectors: recall@k, p50/p95 single-query latency and index size.
+
+Usage:
+    python benchmarks/bench_index_recall.py --n 200000 --dim 768
+    python benchmarks/bench_index_recall.py --vectors corpus.npy --queries 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from vector_index import IndexConfig, PmidFaissIndex
+
+
+def synthetic_vectors(n, dim, seed=0):
+    """
+    Clustered, normalized vectors that roughly resemble sentence embeddings
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(n // 500, 8), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), n)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def build(config, vectors):
+    index = PmidFaissIndex(vectors.shape[1], config=config)
+    ids = [str(i + 1) for i in range(len(vectors))]
+    start = time.perf_counter()
+    if config.train_size:
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), config.train_size * 4), replace=False)]
+        index.train(sample)
+    for start_row in range(0, len(vectors), 50000):
+        chunk = slice(start_row, start_row + 50000)
+        index.add(ids[chunk], vectors[chunk])
+    return index, time.perf_counter() - start
+
+
+def run_queries(index, queries, k):
+    latencies = []
+    found = []
+    for query in queries:
+        start = time.perf_counter()
+        results = index.search(query, k=k)
+        latencies.append(time.perf_counter() - start)
+        found.append({pmid for pmid, _ in results})
+    return found, np.asarray(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vectors', help='.npy file with corpus vectors (float32, n x dim)')
+    parser.add_argument('--n', type=int, default=100000, help='Synthetic corpus size')
+    parser.add_argument('--dim', type=int, default=768, help='Synthetic vector dimension')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=25)
+    parser.add_argument('--metric', choices=('l2', 'ip'), default='ip')
+    parser.add_argument('--nlist', type=int, default=1024)
+    parser.add_argument('--pq-m', type=int, default=64)
+    args = parser.parse_args()
+
+    if args.vectors:
+        vectors = np.load(args.vectors).astype(np.float32)
+    else:
+        vectors = synthetic_vectors(args.n, args.dim)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    print(f"Corpus: {len(vectors)} x {vectors.shape[1]}, {args.queries} queries, k={args.k}\n")
+
+    exact, _ = build(IndexConfig("flat", metric=args.metric), vectors)
+    truth, _ = run_queries(exact, queries, args.k)
+
+    candidates = [
+        (IndexConfig("flat", metric=args.metric), {}),
+        (IndexConfig("sqfp16", metric=args.metric), {}),
+        (IndexConfig("sq8", metric=args.metric), {}),
+        (IndexConfig("hnsw", metric=args.metric), {"ef_search": [16, 32, 64, 128, 256]}),
+        (IndexConfig("ivfpq", metric=args.metric, nlist=args.nlist, pq_m=args.pq_m),
+         {"nprobe": [1, 4, 16, 64, 128]}),
+    ]
+
+    header = f"{'index':<10} {'param':<14} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8} {'size MiB':>9} {'build s':>8}"
+    print(header)
+    print('-' * len(header))
+    for config, sweep in candidates:
+        index, build_time = build(config, vectors)
+        size = len(faiss.serialize_index(index.index)) / 2**20
+        settings = [(name, value) for name, values in sweep.items() for value in values] or [(None, None)]
+        for name, value in settings:
+            if name:
+                index.set_search_params(**{name: value})
+            found, latencies = run_queries(index, queries, args.k)
+            recall = np.mean([len(f & t) / max(len(t), 1) for f, t in zip(found, truth)])
+            param = f"{name}={value}" if name else "-"
+            print(f"{config.index_type:<10} {param:<14} {recall:9.3f} {np.percentile(latencies, 50):8.2f} "
+                  f"{np.percentile(latencies, 95):8.2f} {size:9.1f} {build_time:8.1f}")
+
+
+if __name__ == '__main__':
+    main()
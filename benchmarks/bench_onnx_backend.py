@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Speed and accuracy of the ONNX Runtime backends against the torch model.
+
+All backends embed the same fixed article set ("title. abstract" texts).
+Accuracy is checked against the torch vectors: per-article cosine agreement
+(mean and worst case) and overlap@k of the article rankings for a fixed set
+of queries.
+
+Export first:
+    python onnx_backend.py
+
+Usage:
+    python benchmarks/bench_onnx_backend.py --n 500
+    python benchmarks/bench_onnx_backend.py --articles articles.json --k 10
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from onnx_backend import DEFAULT_ONNX_DIR, OnnxEncoder
+
+
+QUERIES = [
+    "statin therapy and cardiovascular mortality",
+    "CRISPR gene editing off-target effects",
+    "gut microbiome in inflammatory bowel disease",
+    "long-term outcomes of bariatric surgery",
+    "immune checkpoint inhibitors in non-small cell lung cancer",
+    "antibiotic resistance in hospital-acquired infections",
+    "sleep deprivation and cognitive performance",
+    "metformin and cancer incidence in type 2 diabetes",
+]
+
+WORDS = ("patients treatment randomized trial outcome cohort risk mortality clinical therapy dose "
+         "placebo efficacy adverse events follow-up analysis gene expression tumor cells mice "
+         "infection antibiotic microbiome inflammation cognitive sleep surgery diabetes insulin "
+         "cardiovascular statin immune checkpoint lung cancer resistance hospital").split()
+
+
+def synthetic_articles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'title': ' '.join(rng.choice(WORDS, 10)).capitalize(),
+            'abstract': '. '.join(' '.join(rng.choice(WORDS, 18)).capitalize() for _ in range(8)) + '.',
+        }
+        for _ in range(n)
+    ]
+
+
+def load_articles(path, n):
+    with open(path, encoding='utf-8') as f:
+        articles = json.load(f)
+    return [a for a in articles if a.get('title') or a.get('abstract')][:n]
+
+
+def timed_encode(model, texts, batch_size):
+    model.encode(texts[:2], batch_size=batch_size, convert_to_numpy=True)
+    start = time.perf_counter()
+    vectors = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    return np.asarray(vectors, dtype=np.float32), time.perf_counter() - start
+
+
+def normalize(vectors):
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def top_k(queries, docs, k):
+    return np.argsort(-(normalize(queries) @ normalize(docs).T), axis=1, kind='stable')[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='neuml/pubmedbert-base-embeddings')
+    parser.add_argument('--onnx-dir', default=DEFAULT_ONNX_DIR)
+    parser.add_argument('--articles', help='JSON list of article dicts (title, abstract); synthetic if omitted')
+    parser.add_argument('--n', type=int, default=500, help='Articles to embed')
+    parser.add_argument('--k', type=int, default=10, help='Ranking depth for overlap@k')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--threads', type=int, help='ONNX Runtime intra-op threads')
+    args = parser.parse_args()
+
+    articles = load_articles(args.articles, args.n) if args.articles else synthetic_articles(args.n)
+    texts = [f"{a.get('title') or ''}. {a.get('abstract') or ''}".strip() for a in articles]
+    k = min(args.k, len(texts))
+    print(f"{len(texts)} articles, {len(QUERIES)} queries, {os.cpu_count()} CPUs\n")
+
+    from sentence_transformers import SentenceTransformer
+
+    reference = SentenceTransformer(args.model, device='cpu')
+    ref_docs, ref_seconds = timed_encode(reference, texts, args.batch_size)
+    ref_queries = np.asarray(reference.encode(QUERIES, convert_to_numpy=True), dtype=np.float32)
+    ref_top = top_k(ref_queries, ref_docs, k)
+    del reference
+
+    print(f"{'backend':<12} {'seconds':>8} {'texts/s':>9} {'speedup':>8} "
+          f"{'cos mean':>9} {'cos min':>8} {f'overlap@{k}':>11}")
+    print(f"{'torch':<12} {ref_seconds:8.2f} {len(texts) / ref_seconds:9.1f} {1.0:8.2f} "
+          f"{1.0:9.4f} {1.0:8.4f} {1.0:11.3f}")
+
+    for int8 in (False, True):
+        label = 'onnx-int8' if int8 else 'onnx-fp32'
+        try:
+            model = OnnxEncoder(args.onnx_dir, int8=int8, threads=args.threads)
+        except FileNotFoundError as e:
+            print(f"{label:<12} skipped: {e}")
+            continue
+        docs, seconds = timed_encode(model, texts, args.batch_size)
+        queries = model.encode(QUERIES, convert_to_numpy=True)
+        cosines = np.sum(normalize(docs) * normalize(ref_docs), axis=1)
+        top = top_k(queries, docs, k)
+        overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(top, ref_top)])
+        print(f"{label:<12} {seconds:8.2f} {len(texts) / seconds:9.1f} {ref_seconds / seconds:8.2f} "
+              f"{cosines.mean():9.4f} {cosines.min():8.4f} {overlap:11.3f}")
+
+
+if __name__ == '__main__':
+    main()
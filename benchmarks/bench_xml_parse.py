@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Compare the Entrez.read + _extract_article_info path against the streaming
+iterparse extractor on a saved PubMed efetch XML file.
+
+Usage:
+    python benchmarks/bench_xml_parse.py --fixture efetch.xml
+    python benchmarks/bench_xml_parse.py --fixture efetch.xml --generate 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Bio import Entrez
+
+from pubmed_xml import parse_pubmed_articles
+from query_pubmed import PubMedQuerier
+
+
+HEADER = (
+    '<?xml version="1.0" ?>\n'
+    '<!DOCTYPE PubmedArticleSet PUBLIC "-//NLM//DTD PubMedArticle, 1st January 2025//EN" '
+    '"https://dtd.nlm.nih.gov/ncbi/pubmed/out/pubmed_250101.dtd">\n'
+    '<PubmedArticleSet>\n'
+)
+
+WORDS = (
+    "kinase inhibitor glycogen synthase tau neuronal apoptosis signaling pathway "
+    "cohort randomized trial patients outcome expression receptor binding affinity "
+    "synthesis design docking selectivity in vitro in vivo model mice"
+).split()
+
+
+def _sentence(rng, n):
+    return escape(' '.join(rng.choice(WORDS) for _ in range(n)).capitalize() + '.')
+
+
+def generate_fixture(path, n_records, seed=0):
+    """
+    Write a synthetic efetch-style PubmedArticleSet with n_records articles
+    """
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(HEADER)
+        for i in range(n_records):
+            pmid = 30000000 + i
+            sections = ''.join(
+                f'<AbstractText Label="{label}">{_sentence(rng, 40)}</AbstractText>'
+                for label in ('BACKGROUND', 'METHODS', 'RESULTS', 'CONCLUSIONS')
+            )
+            authors = ''.join(
+                f'<Author ValidYN="Y"><LastName>Author{j}</LastName><ForeName>Name{j}</ForeName>'
+                f'<Initials>N</Initials></Author>'
+                for j in range(rng.randint(1, 8))
+            )
+            mesh = ''.join(
+                f'<MeshHeading><DescriptorName UI="D{j:06d}" MajorTopicYN="N">{rng.choice(WORDS).title()}'
+                f'</DescriptorName></MeshHeading>'
+                for j in range(rng.randint(0, 10))
+            )
+            f.write(
+                '<PubmedArticle><MedlineCitation Status="MEDLINE" Owner="NLM">'
+                f'<PMID Version="1">{pmid}</PMID>'
+                '<Article PubModel="Print">'
+                '<Journal><ISSN IssnType="Print">1234-5678</ISSN>'
+                '<JournalIssue CitedMedium="Print"><Volume>12</Volume><Issue>3</Issue>'
+                f'<PubDate><Year>{rng.randint(1990, 2025)}</Year><Month>Jan</Month></PubDate></JournalIssue>'
+                f'<Title>Journal {rng.randint(1, 200)}</Title><ISOAbbreviation>J Test</ISOAbbreviation></Journal>'
+                f'<ArticleTitle>{_sentence(rng, 12)}</ArticleTitle>'
+                '<Pagination><MedlinePgn>100-110</MedlinePgn></Pagination>'
+                f'<ELocationID EIdType="doi" ValidYN="Y">10.1000/test.{pmid}</ELocationID>'
+                f'<Abstract>{sections}</Abstract>'
+                f'<AuthorList CompleteYN="Y">{authors}</AuthorList>'
+                '<Language>eng</Language>'
+                '<PublicationTypeList><PublicationType UI="D016428">Journal Article</PublicationType>'
+                '</PublicationTypeList></Article>'
+                '<MedlineJournalInfo><Country>England</Country><MedlineTA>J Test</MedlineTA>'
+                '<NlmUniqueID>0001</NlmUniqueID><ISSNLinking>1234-5678</ISSNLinking></MedlineJournalInfo>'
+                f'<MeshHeadingList>{mesh}</MeshHeadingList>'
+                '<KeywordList Owner="NOTNLM"><Keyword MajorTopicYN="N">kinase</Keyword></KeywordList>'
+                '</MedlineCitation></PubmedArticle>\n'
+            )
+        f.write('</PubmedArticleSet>\n')
+
+
+def parse_with_entrez(path):
+    querier = PubMedQuerier.__new__(PubMedQuerier)
+    with open(path, 'rb') as handle:
+        records = Entrez.read(handle)
+    return [querier._extract_article_info(r) for r in records['PubmedArticle']]
+
+
+def measure(name, func, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    articles = func(path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<12} {len(articles):>7} records  {elapsed:8.2f} s  peak {peak / 2**20:8.1f} MiB")
+    return articles, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixture', required=True, help='PubMed efetch XML file')
+    parser.add_argument('--generate', type=int, default=0,
+                        help='Write a synthetic fixture with this many records first')
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_fixture(args.fixture, args.generate)
+        print(f"Wrote {args.generate} records to {args.fixture}")
+
+    reference, reference_time = measure('Entrez.read', parse_with_entrez, args.fixture)
+    streamed, streamed_time = measure('iterparse', parse_pubmed_articles, args.fixture)
+
+    mismatches = sum(1 for a, b in zip(reference, streamed) if a != b)
+    mismatches += abs(len(reference) - len(streamed))
+    print(f"\nSpeed-up: {reference_time / streamed_time:.1f}x")
+    print(f"Records differing: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Run AsyncPubMedQuerier against a local mock E-utilities server and check
+concurrency, rate limiting and 429 handling through base_url.
+
+The server holds every efetch for --delay seconds so requests overlap, and
+answers the first --throttled ones with 429 and Retry-After: 1. The check
+fails if more requests were in flight than max_concurrency, if requests
+arrived faster than the rate limit allows, if a 429 was retried
+before its Retry-After, or if a PMID was neither returned nor reported.
+
+Usage:
+    python benchmarks/check_async_eutils.py
+    python benchmarks/check_async_eutils.py --pmids 200 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web
+
+from article_store import ArticleStore
+from async_query_pubmed import AsyncPubMedQuerier
+
+
+def _article_set(pmids):
+    records = ''.join(
+        '<PubmedArticle><MedlineCitation Status="MEDLINE" Owner="NLM">'
+        f'<PMID Version="1">{pmid}</PMID>'
+        '<Article PubModel="Print">'
+        '<Journal><Title>J Test</Title><JournalIssue><PubDate><Year>2020</Year></PubDate></JournalIssue></Journal>'
+        f'<ArticleTitle>Article {pmid}</ArticleTitle>'
+        '</Article></MedlineCitation></PubmedArticle>'
+        for pmid in pmids
+    )
+    return f'<?xml version="1.0"?>\n<PubmedArticleSet>{records}</PubmedArticleSet>\n'
+
+
+class MockEutils:
+    def __init__(self, delay, throttled):
+        self.delay = delay
+        self.throttled = throttled
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.arrivals = []
+        self.throttled_at = {}
+        self.retry_gaps = []
+
+    async def efetch(self, request):
+        form = await request.post()
+        batch = form['id']
+        now = time.monotonic()
+        self.arrivals.append(now)
+
+        if batch in self.throttled_at:
+            self.retry_gaps.append(now - self.throttled_at.pop(batch))
+        elif self.throttled > 0:
+            self.throttled -= 1
+            self.throttled_at[batch] = now
+            return web.Response(status=429, text='Too Many Requests', headers={'Retry-After': '1'})
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return web.Response(text=_article_set(batch.split(',')), content_type='text/xml')
+
+
+async def run(args):
+    mock = MockEutils(args.delay, args.throttled)
+    app = web.Application()
+    app.router.add_post('/efetch.fcgi', mock.efetch)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    requested = [str(30000000 + i) for i in range(args.pmids)]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ArticleStore(os.path.join(tmp, 'articles.sqlite'))
+        try:
+            async with AsyncPubMedQuerier(
+                'mock@example.org', api_key=args.api_key, base_url=f'http://127.0.0.1:{port}/',
+                max_concurrency=args.concurrency, article_store=store,
+            ) as querier:
+                querier.backoff_base = 0.05
+                start = time.perf_counter()
+                articles, failed = await querier.fetch_article_details(
+                    requested, return_failed=True, batch_size=args.batch_size
+                )
+                elapsed = time.perf_counter() - start
+                rate = querier.rate_limiter.rate
+                # A second pass must come entirely from the store
+                before = len(mock.arrivals)
+                cached = await querier.fetch_article_details(requested, batch_size=args.batch_size)
+        finally:
+            await runner.cleanup()
+        stored = len(store.get_many(requested))
+
+    # Arrivals jitter, so check the sustained rate over a window of one second's worth
+    window = int(rate)
+    spans = [b - a for a, b in zip(mock.arrivals, mock.arrivals[window:])]
+    returned = {str(a['pmid']) for a in articles}
+    unaccounted = sorted(set(requested) - returned - {str(p) for p in failed})
+
+    print(f"\n{len(mock.arrivals)} efetch requests in {elapsed:.2f} s")
+    print(f"Peak in flight: {mock.peak_in_flight} (limit {args.concurrency})")
+    print(f"Shortest span of {window + 1} requests: {min(spans):.3f} s (limit {window / rate:.3f} s)")
+    print(f"429 retried after: {', '.join(f'{g:.2f}' for g in mock.retry_gaps)} s")
+
+    assert not unaccounted, f"PMIDs neither returned nor reported: {unaccounted}"
+    assert not failed, f"PMIDs failed: {failed}"
+    assert 1 < mock.peak_in_flight <= args.concurrency, "Requests did not overlap up to the limit"
+    assert min(spans) >= 0.9 * window / rate, "Requests arrived faster than the rate limit"
+    assert len(mock.retry_gaps) == args.throttled, "Not every 429 was retried"
+    assert all(g >= 1.0 for g in mock.retry_gaps), "A 429 was retried before Retry-After"
+    assert stored == len(requested), "Fetched articles were not written to the store"
+    assert len(mock.arrivals) == before and len(cached) == len(requested), "Second pass hit the server"
+    print("OK")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pmids', type=int, default=100, help='Number of PMIDs to request')
+    parser.add_argument('--batch-size', type=int, default=5, help='PMIDs per efetch')
+    parser.add_argument('--concurrency', type=int, default=3, help='max_concurrency of the querier')
+    parser.add_argument('--delay', type=float, default=0.5, help='Seconds the server holds each efetch')
+    parser.add_argument('--throttled', type=int, default=3, help='Requests answered with 429 first')
+    parser.add_argument('--api-key', default='mock-key', help='API key (selects the 10/s limiter)')
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Run PubMedQuerier.iter_article_batches against a local fake E-utilities
+server that injects faults, and check that every requested PMID is either
+returned or reported in failed_pmids.
+
+The server answers efetch with, in order: 429 with Retry-After, 500, a body
+cut off mid-record, a body shorter than its Content-Length, and a response
+missing one of the requested records; after that it answers normally. PMIDs
+listed with --broken always get malformed XML, and those listed with --down
+always get a 500.
+
+Usage:
+    python benchmarks/check_entrez_faults.py
+    python benchmarks/check_entrez_faults.py --pmids 60 --batch-size 8
+"""
+
+import argparse
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Bio import Entrez
+
+from query_pubmed import PubMedQuerier
+
+FAULTS = ['429', '500', 'truncated', 'short', 'drop']
+EUTILS = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
+
+
+def point_entrez_at(base_url):
+    """
+    Send Bio.Entrez requests to base_url; Biopython hardcodes the NCBI URL in
+    each utility, so rewrite it where the request is built
+    """
+    build_request = Entrez._build_request
+
+    def _build_local_request(cgi, *args, **kwargs):
+        return build_request(cgi.replace(EUTILS, base_url), *args, **kwargs)
+
+    Entrez._build_request = _build_local_request
+
+
+def _article(pmid):
+    return (
+        '<PubmedArticle><MedlineCitation Status="MEDLINE" Owner="NLM">'
+        f'<PMID Version="1">{pmid}</PMID>'
+        '<Article PubModel="Print">'
+        '<Journal><Title>J Test</Title><JournalIssue><PubDate><Year>2020</Year></PubDate></JournalIssue></Journal>'
+        f'<ArticleTitle>Article {pmid}</ArticleTitle>'
+        '<Abstract><AbstractText>Fault injection fixture.</AbstractText></Abstract>'
+        '</Article></MedlineCitation></PubmedArticle>'
+    )
+
+
+def _article_set(pmids):
+    records = ''.join(_article(p) for p in pmids)
+    return f'<?xml version="1.0"?>\n<PubmedArticleSet>{records}</PubmedArticleSet>\n'.encode()
+
+
+class FakeEutils(BaseHTTPRequestHandler):
+    faults = []
+    broken = set()
+    down = set()
+    lock = threading.Lock()
+    requests = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle(parse_qs(urlparse(self.path).query))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self._handle(parse_qs(self.rfile.read(length).decode()))
+
+    def _handle(self, params):
+        if not self.path.split('?')[0].endswith('efetch.fcgi'):
+            self._send(404, b'unknown utility')
+            return
+        pmids = params.get('id', [''])[0].split(',')
+        with self.lock:
+            type(self).requests += 1
+            fault = self.faults.pop(0) if self.faults else None
+
+        if fault == '429':
+            self._send(429, b'Too Many Requests', {'Retry-After': '1'})
+        elif fault == '500' or self.down.intersection(pmids):
+            self._send(500, b'Internal Server Error')
+        elif fault == 'truncated' or self.broken.intersection(pmids):
+            body = _article_set(pmids)
+            self._send(200, body[:len(body) // 2])
+        elif fault == 'short':
+            body = _article_set(pmids)
+            self._send(200, body[:len(body) // 2], {'Content-Length': str(len(body))})
+        elif fault == 'drop':
+            self._send(200, _article_set(pmids[1:]))
+        else:
+            self._send(200, _article_set(pmids))
+
+    def _send(self, status, body, headers=None):
+        headers = dict(headers or {})
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', headers.pop('Content-Length', str(len(body))))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.close_connection = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pmids', type=int, default=40, help='Number of PMIDs to request')
+    parser.add_argument('--batch-size', type=int, default=10, help='PMIDs per efetch')
+    parser.add_argument('--broken', nargs='*', default=['30000007'],
+                        help='PMIDs whose records always come back malformed')
+    parser.add_argument('--down', nargs='*', default=['30000033'],
+                        help='PMIDs whose batch always gets a 500')
+    args = parser.parse_args()
+
+    FakeEutils.faults = list(FAULTS)
+    FakeEutils.broken = set(args.broken)
+    FakeEutils.down = set(args.down)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeEutils)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    point_entrez_at(f'http://127.0.0.1:{server.server_port}/')
+    querier = PubMedQuerier('faults@example.org')
+    querier.max_retries = 2
+    querier.backoff_base = 0.05
+
+    requested = [str(30000000 + i) for i in range(args.pmids)]
+    try:
+        articles = [a for batch in querier.iter_article_batches(requested, args.batch_size) for a in batch]
+    finally:
+        server.shutdown()
+    failed = querier.failed_pmids
+
+    returned = {str(a['pmid']) for a in articles}
+    failed = {str(p) for p in failed}
+    unaccounted = sorted(set(requested) - returned - failed)
+    overlap = sorted(returned & failed)
+
+    print(f"\n{FakeEutils.requests} efetch requests, {len(returned)} returned, {len(failed)} failed")
+    print(f"Failed PMIDs: {sorted(failed)}")
+    assert not unaccounted, f"PMIDs neither returned nor reported: {unaccounted}"
+    assert not overlap, f"PMIDs both returned and reported failed: {overlap}"
+    assert not FakeEutils.faults, f"Faults never triggered: {FakeEutils.faults}"
+    print("OK: every requested PMID was returned or reported in failed_pmids")
+
+
+if __name__ == '__main__':
+    main()
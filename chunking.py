@@ -0,0 +1,162 @@
+import re
+from typing import Dict, List, Optional, Sequence
+
+
+# Sentence ends: terminal punctuation followed by whitespace and an upper-case
+# letter, digit or opening bracket (keeps "e.g. the", "vs. placebo" together)
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9(\[])')
+
+# Chunk ids are pmid * MAX_CHUNKS + chunk number
+MAX_CHUNKS = 256
+
+# Fields embedded chunk by chunk; 'title' always fits in one
+CHUNKED_FIELDS = ('abstract', 'combined')
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s for s in (part.strip() for part in SENTENCE_END_RE.split(text)) if s]
+
+
+class AbstractChunker:
+    def __init__(self, max_tokens: int = 254, tokenizer=None):
+        """
+        Split abstracts into chunks that fit the embedding model
+
+        Structured abstracts are split on their AbstractText sections first,
+        then on sentences, and consecutive pieces are packed greedily up to
+        max_tokens. Abstracts that already fit stay a single chunk, so they
+        embed exactly as before.
+
+        Args:
+            max_tokens (int): Token budget per chunk (excluding special tokens)
+            tokenizer: HuggingFace tokenizer used to count tokens; without one
+                tokens are estimated from word counts
+        """
+        self.max_tokens = max_tokens
+        self.tokenizer = tokenizer
+
+    @classmethod
+    def for_model(cls, model, max_tokens: Optional[int] = None):
+        """
+        Build a chunker matching the tokenizer and sequence length of model
+
+        Args:
+            model: PubMedBERTEmbedding, a SentenceTransformer, or any embeddings object
+            max_tokens (int, optional): Override the budget derived from the model
+        """
+        st_model = getattr(model, 'model', model)
+        tokenizer = getattr(st_model, 'tokenizer', None)
+        if max_tokens is None:
+            max_seq_length = getattr(st_model, 'max_seq_length', None) or 256
+            max_tokens = max_seq_length - 2  # [CLS] and [SEP]
+        return cls(max_tokens, tokenizer)
+
+    def _lengths(self, texts: Sequence[str]) -> List[int]:
+        if not texts:
+            return []
+        if self.tokenizer is not None:
+            # One batched call for every piece of every abstract
+            encoded = self.tokenizer(list(texts), add_special_tokens=False)['input_ids']
+            return [len(ids) for ids in encoded]
+        return [int(len(text.split()) * 1.4) + 1 for text in texts]
+
+    def _pack(self, pieces: List[str], lengths: List[int], budget: int) -> List[str]:
+        chunks, current, size = [], [], 0
+        for piece, length in zip(pieces, lengths):
+            if current and size + length > budget:
+                chunks.append(' '.join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += length
+        if current:
+            chunks.append(' '.join(current))
+        return chunks
+
+    def _split_long(self, pieces: List[str], lengths: List[int], budget: int):
+        # Replace pieces over budget by their sentences, and sentences over budget by word windows
+        out_pieces, out_lengths = [], []
+        for piece, length in zip(pieces, lengths):
+            if length <= budget:
+                out_pieces.append(piece)
+                out_lengths.append(length)
+                continue
+            for sentence, sentence_length in zip(*self._sentences(piece)):
+                if sentence_length <= budget:
+                    out_pieces.append(sentence)
+                    out_lengths.append(sentence_length)
+                    continue
+                words = sentence.split()
+                step = max(1, int(len(words) * budget / sentence_length))
+                for start in range(0, len(words), step):
+                    window = ' '.join(words[start:start + step])
+                    out_pieces.append(window)
+                    out_lengths.append(budget)
+        return out_pieces, out_lengths
+
+    def _sentences(self, text):
+        sentences = split_sentences(text)
+        return sentences, self._lengths(sentences)
+
+    def chunk_many(self, abstracts: Sequence[str], sections: Optional[Sequence[List[str]]] = None,
+                   prefixes: Optional[Sequence[str]] = None) -> List[List[str]]:
+        """
+        Chunk several abstracts
+
+        Args:
+            abstracts: Abstract texts
+            sections: Optional AbstractText sections per abstract
+            prefixes: Optional text prepended to every chunk of an abstract
+                (the title, for 'combined' chunks); it counts against the budget.
+                When given, an abstract that fits is embedded as "prefix. abstract".
+
+        Returns:
+            list: Chunks per abstract ([] for an empty abstract without a prefix)
+        """
+        sections = sections or [None] * len(abstracts)
+        if prefixes is None:
+            whole = list(abstracts)
+            prefixes = [''] * len(abstracts)
+        else:
+            # Same text as the unchunked 'combined' field, so short abstracts keep their cache keys
+            whole = [f"{p}. {a}".strip() if (p or a) else '' for p, a in zip(prefixes, abstracts)]
+
+        # Tokenize all whole texts in one call; most fit and need nothing else
+        whole_lengths = self._lengths(whole)
+
+        results = []
+        long_rows = []
+        for i, (text, length) in enumerate(zip(whole, whole_lengths)):
+            if not text:
+                results.append([])
+            elif length <= self.max_tokens or not abstracts[i]:
+                results.append([text])
+            else:
+                results.append(None)
+                long_rows.append(i)
+
+        prefix_lengths = dict(zip(long_rows, self._lengths([prefixes[i] for i in long_rows])))
+        for i in long_rows:
+            prefix = prefixes[i]
+            budget = max(self.max_tokens - (prefix_lengths[i] + 1 if prefix else 0), 16)
+            pieces = [p for p in (sections[i] or []) if p] or [abstracts[i]]
+            pieces, lengths = self._split_long(pieces, self._lengths(pieces), budget)
+            chunks = self._pack(pieces, lengths, budget)[:MAX_CHUNKS]
+            results[i] = [f"{prefix}. {chunk}" for chunk in chunks] if prefix else chunks
+        return results
+
+    def chunk(self, abstract: str, sections: Optional[List[str]] = None,
+              prefix: Optional[str] = None) -> List[str]:
+        return self.chunk_many([abstract], [sections], None if prefix is None else [prefix])[0]
+
+
+def field_chunks(chunker: AbstractChunker, articles: Sequence[Dict], field: str) -> List[List[str]]:
+    """
+    Chunks of field ('abstract' or 'combined') for each article dict
+    """
+    sections = [a.get('abstract_sections') or None for a in articles]
+    if field == 'combined':
+        abstracts = [a.get('abstract') or '' for a in articles]
+        prefixes = [a.get('title') or '' for a in articles]
+        return chunker.chunk_many(abstracts, sections, prefixes)
+    abstracts = [(a.get('abstract') or '').strip() for a in articles]
+    return chunker.chunk_many(abstracts, sections)
@@ -0,0 +1,148 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+class EmbeddingCache:
+    def __init__(self, path=".pubkin_cache/embeddings.sqlite", max_entries=200_000):
+        """
+        Persistent embedding store keyed by (model_name, field, pmid, text_hash)
+
+        Vectors are stored as raw float32 bytes. When the store grows past
+        max_entries the least recently used rows are evicted.
+
+        Args:
+            path (str): SQLite file to use (created if missing)
+            max_entries (int): Maximum number of vectors kept on disk
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Streamlit serves sessions from several threads, so share one
+        # connection and serialize access through the lock.
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model_name TEXT NOT NULL,
+                field TEXT NOT NULL,
+                pmid TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model_name, field, pmid, text_hash)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def text_hash(text):
+        """
+        Hash the embedded text so edited records never reuse a stale vector
+        """
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model_name, field, keys):
+        """
+        Look up cached vectors
+
+        Args:
+            model_name (str): Embedding model identifier
+            field (str): Embedded field ('title', 'abstract', 'combined', ...)
+            keys (list): List of (pmid, text_hash) tuples
+
+        Returns:
+            dict: Mapping of (pmid, text_hash) -> np.ndarray for the hits
+        """
+        hits = {}
+        if not keys:
+            return hits
+
+        now = time.time()
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 400):
+                chunk = keys[start:start + 400]
+                clause = " OR ".join(["(pmid = ? AND text_hash = ?)"] * len(chunk))
+                params = [model_name, field]
+                for pmid, text_hash in chunk:
+                    params.extend([pmid, text_hash])
+                rows = self._conn.execute(
+                    f"SELECT pmid, text_hash, vector FROM embeddings "
+                    f"WHERE model_name = ? AND field = ? AND ({clause})",
+                    params,
+                ).fetchall()
+                for pmid, text_hash, blob in rows:
+                    hits[(pmid, text_hash)] = np.frombuffer(blob, dtype=np.float32)
+
+            if hits:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? "
+                    "WHERE model_name = ? AND field = ? AND pmid = ? AND text_hash = ?",
+                    [(now, model_name, field, pmid, h) for pmid, h in hits],
+                )
+                self._conn.commit()
+        return hits
+
+    def put_many(self, model_name, field, items):
+        """
+        Store vectors and evict least recently used rows beyond max_entries
+
+        Args:
+            model_name (str): Embedding model identifier
+            field (str): Embedded field
+            items (list): List of ((pmid, text_hash), vector) tuples
+        """
+        if not items:
+            return
+
+        now = time.time()
+        rows = []
+        for (pmid, text_hash), vector in items:
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((model_name, field, pmid, text_hash, vector.shape[0], vector.tobytes(), now))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings "
+                "(model_name, field, pmid, text_hash, dim, vector, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
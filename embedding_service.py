@@ -0,0 +1,353 @@
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional
+
+import numpy as np
+
+from onnx_backend import DEFAULT_ONNX_DIR
+
+
+def _worker_main(worker, model_name, threads, cores, tasks, results, backend="torch", onnx_dir=None,
+                 int8=True):
+    """
+    Worker process: load one model copy and encode batches until told to stop
+
+    worker is the (worker id, generation) pair echoed in every message, so
+    the service can tell a restarted worker's messages from its predecessor's.
+    """
+    # Thread counts must be pinned before torch starts its pools
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+
+    if backend == "onnx":
+        from onnx_backend import OnnxEncoder
+        model = OnnxEncoder(onnx_dir or DEFAULT_ONNX_DIR, int8=int8, threads=threads)
+    else:
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        torch.set_num_threads(threads)
+        model = SentenceTransformer(model_name, device="cpu")
+    results.put(("ready", worker, model.get_sentence_embedding_dimension(), model.max_seq_length))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        batch_id, texts = task
+        try:
+            vectors = model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+            results.put(("done", worker, batch_id, np.asarray(vectors, dtype=np.float32), None))
+        except Exception as e:
+            results.put(("done", worker, batch_id, None, repr(e)))
+
+
+class _Request:
+    __slots__ = ("texts", "vectors", "remaining", "future", "error")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.vectors = [None] * len(texts)
+        self.remaining = len(texts)
+        self.future = Future()
+        self.error = None
+
+
+class EmbeddingService:
+    def __init__(self, model_name="neuml/pubmedbert-base-embeddings", workers: int = 2,
+                 threads_per_worker: Optional[int] = None, max_batch_size: int = 64,
+                 max_latency_ms: float = 10.0, pin_cores: bool = False, backend: str = "torch",
+                 onnx_dir: Optional[str] = None, int8: bool = True, max_restarts: int = 3):
+        """
+        Pool of embedding worker processes with dynamic request batching
+
+        Each worker holds one SentenceTransformer with a fixed torch thread
+        count. Requests from any thread (queries and documents from different
+        Streamlit sessions) are queued; the dispatcher waits for a free worker,
+        then packs queued texts into one batch until max_batch_size texts or
+        max_latency_ms after the first one, so concurrent requests share
+        forward passes.
+
+        Each worker gets one batch at a time through its own task queue, so a
+        worker that dies (OOM kill, segfault) fails exactly the requests of
+        the batch it held. It is then restarted; after max_restarts deaths the
+        service closes and fails everything still queued.
+
+        The service implements the parts of the SentenceTransformer API that
+        PubMedBERTEmbedding uses (encode, get_sentence_embedding_dimension,
+        max_seq_length, tokenizer), so it can stand in for the model.
+
+        Args:
+            model_name (str): SentenceTransformer model to load in each worker
+            workers (int): Worker processes
+            threads_per_worker (int, optional): Torch threads per worker; defaults
+                to the CPU count divided by workers
+            max_batch_size (int): Maximum texts per forward pass
+            max_latency_ms (float): Longest a queued text waits for others to join its batch
+            pin_cores (bool): Bind each worker to its own block of cores (Linux)
+            backend (str): 'torch' or 'onnx' (see onnx_backend.py)
+            onnx_dir (str, optional): Exported model directory for the onnx backend
+            int8 (bool): Use the int8-quantized graph with the onnx backend
+            max_restarts (int): Worker restarts before the service gives up
+        """
+        self.model_name = model_name
+        self.backend = backend
+        self.int8 = int8
+        self.workers = workers
+        cpus = os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker or max(1, cpus // workers)
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self._dim = None
+        self.max_seq_length = None
+        self._tokenizer = None
+        self._onnx_dir = (onnx_dir or DEFAULT_ONNX_DIR) if backend == "onnx" else None
+        self.max_restarts = max_restarts
+        self.restarts = 0
+
+        self._ctx = mp.get_context("spawn")
+        self._worker_args = (model_name, self.threads_per_worker, backend, onnx_dir, int8)
+        self._cores = []
+        for i in range(workers):
+            cores = None
+            if pin_cores:
+                first = i * self.threads_per_worker
+                cores = set(range(first, first + self.threads_per_worker)) & set(range(cpus)) or None
+            self._cores.append(cores)
+        self._results = self._ctx.Queue()
+        self._tasks = [None] * workers
+        self._processes = [None] * workers
+        self._generations = [0] * workers
+        for i in range(workers):
+            self._spawn(i)
+
+        ready = 0
+        while ready < workers:
+            try:
+                _, _, self._dim, self.max_seq_length = self._results.get(timeout=1.0)
+                ready += 1
+            except queue.Empty:
+                if not all(process.is_alive() for process in self._processes):
+                    for process in self._processes:
+                        process.terminate()
+                    raise RuntimeError("An embedding worker exited while loading the model")
+        print(f"[INFO] Embedding service: {workers} workers x {self.threads_per_worker} threads")
+
+        self._pending = queue.Queue()  # (request, start, end) segments
+        self._idle = queue.Queue()  # (worker id, generation) of workers waiting for a batch
+        for i in range(workers):
+            self._idle.put((i, 0))
+        self._in_flight = {}  # batch_id -> segments
+        self._assigned = {}  # worker id -> batch_id it is encoding
+        self._batch_ids = iter(range(1, 2 ** 62))
+        self._lock = threading.Lock()
+        self._complete_lock = threading.Lock()
+        self._closed = False
+        self._stopped = threading.Event()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._collector = threading.Thread(target=self._collect_loop, daemon=True)
+        self._monitor = threading.Thread(target=self._monitor_loop, daemon=True)
+        self._dispatcher.start()
+        self._collector.start()
+        self._monitor.start()
+
+    def _spawn(self, worker_id):
+        # A fresh task queue too: one a worker died reading from may be left locked
+        model_name, threads, backend, onnx_dir, int8 = self._worker_args
+        self._tasks[worker_id] = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=((worker_id, self._generations[worker_id]), model_name, threads, self._cores[worker_id], self._tasks[worker_id],
+                  self._results, backend, onnx_dir, int8),
+            daemon=True,
+        )
+        process.start()
+        self._processes[worker_id] = process
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_sentence_embedding_dimension(self):
+        return self._dim
+
+    @property
+    def tokenizer(self):
+        # Only used for counting tokens (chunking); loaded in this process on demand
+        if self._tokenizer is None:
+            from transformers import AutoTokenizer
+            self._tokenizer = AutoTokenizer.from_pretrained(self._onnx_dir or self.model_name)
+        return self._tokenizer
+
+    def submit(self, texts: List[str]) -> Future:
+        """
+        Queue texts for embedding
+
+        Returns:
+            Future: Resolves to a float32 matrix of shape (len(texts), dim)
+        """
+        if self._closed:
+            raise RuntimeError("Embedding service is closed")
+        request = _Request(list(texts))
+        if not request.texts:
+            request.future.set_result(np.zeros((0, self._dim), dtype=np.float32))
+            return request.future
+        for start in range(0, len(request.texts), self.max_batch_size):
+            self._pending.put((request, start, min(start + self.max_batch_size, len(request.texts))))
+        return request.future
+
+    def encode(self, texts, batch_size=None, convert_to_numpy=True, **kwargs):
+        """
+        Blocking encode with SentenceTransformer.encode semantics (batch_size is ignored)
+        """
+        if isinstance(texts, str):
+            return self.submit([texts]).result()[0]
+        return self.submit(texts).result()
+
+    def _dispatch_loop(self):
+        carry = None
+        while True:
+            worker = self._idle.get()
+            if worker is None:
+                break
+            worker_id, generation = worker
+            if generation != self._generations[worker_id]:
+                continue  # token of a worker that died; its replacement reports ready itself
+            segment = carry or self._pending.get()
+            carry = None
+            if segment is None:
+                break
+
+            # Fill the batch until it is full or the oldest text has waited long enough
+            batch = [segment]
+            size = segment[2] - segment[1]
+            deadline = time.monotonic() + self.max_latency
+            while size < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    segment = self._pending.get(timeout=timeout) if timeout > 0 else self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                if segment is None:
+                    self._pending.put(None)
+                    break
+                if size + segment[2] - segment[1] > self.max_batch_size:
+                    carry = segment
+                    break
+                batch.append(segment)
+                size += segment[2] - segment[1]
+
+            batch_id = next(self._batch_ids)
+            with self._lock:
+                if self._closed:
+                    self._fail(batch + ([carry] if carry else []), "Embedding service is closed")
+                    break
+                self._in_flight[batch_id] = batch
+                self._assigned[worker_id] = batch_id
+            texts = [text for request, start, end in batch for text in request.texts[start:end]]
+            self._tasks[worker_id].put((batch_id, texts))
+
+    def _collect_loop(self):
+        while True:
+            message = self._results.get()
+            if message is None:
+                break
+            if message[0] == "ready":
+                # A restarted worker finished loading
+                self._idle.put(message[1])
+                continue
+            _, worker, batch_id, vectors, error = message
+            with self._lock:
+                batch = self._in_flight.pop(batch_id, None)
+                if self._assigned.get(worker[0]) == batch_id:
+                    del self._assigned[worker[0]]
+            self._idle.put(worker)
+            if batch is not None:
+                self._complete(batch, vectors, error)
+
+    def _monitor_loop(self):
+        # Workers can die mid-batch without reporting; fail their batch and restart them
+        while not self._stopped.wait(0.5):
+            for worker_id, process in enumerate(self._processes):
+                if process.is_alive() or self._closed:
+                    continue
+                with self._lock:
+                    batch = self._in_flight.pop(self._assigned.pop(worker_id, None), None)
+                reason = f"embedding worker {worker_id} exited with code {process.exitcode}"
+                if batch is not None:
+                    self._fail(batch, reason)
+                if self.restarts >= self.max_restarts:
+                    print(f"[WARN] {reason}; restart limit reached, closing the embedding service")
+                    self._shutdown(reason)
+                    return
+                self.restarts += 1
+                print(f"[WARN] {reason}; restarting it ({self.restarts}/{self.max_restarts})")
+                self._generations[worker_id] += 1
+                self._spawn(worker_id)
+
+    def _shutdown(self, reason):
+        # Give up: fail every queued and in-flight request and stop the threads
+        with self._lock:
+            self._closed = True
+            batches = list(self._in_flight.values())
+            self._in_flight.clear()
+            self._assigned.clear()
+        for batch in batches:
+            self._fail(batch, reason)
+        while True:
+            try:
+                segment = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            if segment is not None:
+                self._fail([segment], reason)
+        self._pending.put(None)
+        self._idle.put(None)
+        self._results.put(None)
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+
+    def _fail(self, batch, reason):
+        self._complete(batch, None, reason)
+
+    def _complete(self, batch, vectors, error):
+        offset = 0
+        with self._complete_lock:
+            for request, start, end in batch:
+                if error is not None:
+                    request.error = error
+                else:
+                    request.vectors[start:end] = vectors[offset:offset + end - start]
+                offset += end - start
+                request.remaining -= end - start
+                if request.remaining == 0:
+                    if request.error is not None:
+                        request.future.set_exception(RuntimeError(f"Embedding worker failed: {request.error}"))
+                    else:
+                        request.future.set_result(np.vstack(request.vectors).astype(np.float32, copy=False))
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._stopped.set()
+        self._monitor.join(timeout=10)
+        self._pending.put(None)
+        self._idle.put(None)
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+        self._results.put(None)
+        self._dispatcher.join(timeout=10)
+        self._collector.join(timeout=10)
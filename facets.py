@@ -0,0 +1,123 @@
+import threading
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+
+FACET_FIELDS = ('publication_types', 'journal', 'pub_year', 'mesh_terms')
+
+
+def _popcount(bits: int) -> int:
+    return bin(bits).count('1')
+
+
+class FacetIndex:
+    def __init__(self, articles: Iterable[Dict], fields: Sequence[str] = FACET_FIELDS):
+        """
+        Posting bitsets per facet value over one result set
+
+        Built once per search from the fetched articles. Article i is bit i;
+        every facet value maps to the bitset of the articles that have it, so
+        filtering on several facets and counting the values left are set
+        operations instead of scans over the results. Articles that join a
+        ranking later (hits from the accumulated corpus) are added on the fly.
+
+        Args:
+            articles: Article dicts (any ranking of them can be filtered later)
+            fields: Article fields to index; list fields (publication_types,
+                mesh_terms) put an article under every value they hold
+        """
+        self.fields = tuple(fields)
+        self.size = 0
+        self.all = 0
+        self.positions: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[str, int]] = {field: {} for field in self.fields}
+        self._lock = threading.Lock()
+        self.add(articles)
+
+    def add(self, articles: Iterable[Dict]) -> int:
+        """
+        Index articles whose PMID is not indexed yet
+
+        Returns:
+            int: Number of articles added
+        """
+        added = 0
+        with self._lock:
+            for article in articles:
+                pmid = str(article.get('pmid', ''))
+                if pmid in self.positions:
+                    continue
+                self.positions[pmid] = self.size
+                bit = 1 << self.size
+                for field in self.fields:
+                    value = article.get(field)
+                    values = value if isinstance(value, (list, tuple, set)) else [value]
+                    postings = self.postings[field]
+                    for v in values:
+                        if v in (None, ''):
+                            continue
+                        v = str(v)
+                        postings[v] = postings.get(v, 0) | bit
+                self.size += 1
+                added += 1
+            self.all = (1 << self.size) - 1
+        return added
+
+    def values(self, field: str) -> List[str]:
+        """
+        Values of a facet, most common first (years newest first)
+        """
+        postings = self.postings.get(field, {})
+        if field == 'pub_year':
+            return sorted(postings, reverse=True)
+        return sorted(postings, key=lambda v: (-_popcount(postings[v]), v))
+
+    def select(self, filters: Optional[Mapping[str, Optional[Iterable[str]]]] = None, exclude: Optional[str] = None) -> int:
+        """
+        Bitset of the articles matching filters
+
+        Values within a facet are OR-ed, facets are AND-ed. A facet mapped to
+        None is unconstrained; one mapped to an empty collection matches nothing.
+
+        Args:
+            filters (dict): facet -> selected values
+            exclude (str, optional): Facet to leave out (for drill-down counts)
+
+        Returns:
+            int: Bitset over article positions
+        """
+        bits = self.all
+        for field, selected in (filters or {}).items():
+            if selected is None or field == exclude:
+                continue
+            postings = self.postings.get(field, {})
+            allowed = 0
+            for value in selected:
+                allowed |= postings.get(str(value), 0)
+            bits &= allowed
+            if not bits:
+                break
+        return bits
+
+    def counts(self, field: str, filters: Optional[Mapping[str, Optional[Iterable[str]]]] = None) -> Dict[str, int]:
+        """
+        Articles per value of field among those matching the other facets' filters
+        """
+        bits = self.select(filters, exclude=field)
+        return {value: _popcount(posting & bits) for value, posting in self.postings.get(field, {}).items()}
+
+    def filter(self, results: Iterable[Dict], filters: Optional[Mapping[str, Optional[Iterable[str]]]] = None) -> List[Dict]:
+        """
+        Keep the results (in their order) whose article matches filters
+
+        Results whose pmid is not in the index yet are indexed from the
+        result dicts themselves first, so late corpus hits are filtered too.
+        """
+        results = list(results)
+        self.add(results)
+        bits = self.select(filters)
+        if bits == self.all and not any(selected is not None for selected in (filters or {}).values()):
+            return results
+        return [
+            item for item in results
+            if (bits >> self.positions.get(str(item.get('pmid', '')), self.size)) & 1
+        ]
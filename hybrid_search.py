@@ -0,0 +1,243 @@
+import json
+import math
+import os
+import re
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# English stopwords plus PubMed query syntax (boolean operators, field tags)
+STOPWORDS = frozenset("""
+a an and are as at be by for from has in is it of on or that the to was were will with
+not all mesh terms term tiab ti ab majr mh pt subheading title abstract
+""".split())
+
+# BM25F field weights over the fields _extract_article_info extracts
+DEFAULT_FIELD_WEIGHTS = {
+    'title': 3.0,
+    'abstract': 1.0,
+    'mesh_terms': 2.0,
+    'keywords': 2.0,
+}
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, field_weights=None, k1=1.2, b=0.75, path: Optional[str] = None):
+        """
+        Incremental inverted index with BM25F scoring over article fields
+
+        Articles can be added at any time; postings are append-only, so an
+        article that is already indexed is skipped.
+
+        Args:
+            field_weights (dict): Weight per article field (title/abstract/mesh_terms/keywords)
+            k1 (float): BM25 term-frequency saturation
+            b (float): BM25 length normalization
+            path (str, optional): .npz file the index is saved to
+        """
+        self.field_weights = dict(field_weights or DEFAULT_FIELD_WEIGHTS)
+        self.k1 = k1
+        self.b = b
+        self.path = path
+        self.pmids: List[str] = []
+        self._doc_ids: Dict[str, int] = {}
+        self._doc_lengths = array('f')
+        self._total_length = 0.0
+        # term -> (doc ids, weighted term frequencies), doc ids ascending
+        self._postings: Dict[str, tuple] = {}
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+
+    def __len__(self):
+        return len(self.pmids)
+
+    def __contains__(self, pmid):
+        return str(pmid) in self._doc_ids
+
+    def _field_text(self, article, field):
+        value = article.get(field) or ''
+        if isinstance(value, list):
+            return ' '.join(str(v) for v in value)
+        return str(value)
+
+    def add(self, articles: Iterable[Dict]):
+        """
+        Index articles that are not indexed yet
+
+        Returns:
+            int: Number of articles added
+        """
+        added = 0
+        with self._lock:
+            for article in articles:
+                pmid = str(article.get('pmid', ''))
+                if not pmid or pmid in self._doc_ids:
+                    continue
+
+                tfs = {}
+                length = 0.0
+                for field, weight in self.field_weights.items():
+                    tokens = tokenize(self._field_text(article, field))
+                    length += weight * len(tokens)
+                    for token in tokens:
+                        tfs[token] = tfs.get(token, 0.0) + weight
+
+                doc_id = len(self.pmids)
+                self.pmids.append(pmid)
+                self._doc_ids[pmid] = doc_id
+                self._doc_lengths.append(length)
+                self._total_length += length
+
+                for token, tf in tfs.items():
+                    postings = self._postings.get(token)
+                    if postings is None:
+                        postings = (array('I'), array('f'))
+                        self._postings[token] = postings
+                    postings[0].append(doc_id)
+                    postings[1].append(tf)
+                added += 1
+
+            if added:
+                self._dirty = True
+        return added
+
+    def search(self, query: str, k: int = 100):
+        """
+        Rank indexed articles against a free-text or PubMed-style query
+
+        Returns:
+            list: (pmid, bm25_score) tuples, best first
+        """
+        with self._lock:
+            n_docs = len(self.pmids)
+            terms = set(tokenize(query))
+            if not n_docs or not terms:
+                return []
+
+            avg_length = self._total_length / n_docs or 1.0
+            lengths = np.frombuffer(self._doc_lengths, dtype=np.float32)
+            scores = np.zeros(n_docs, dtype=np.float32)
+
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                doc_ids = np.frombuffer(postings[0], dtype=np.uint32)
+                tfs = np.frombuffer(postings[1], dtype=np.float32)
+                df = len(doc_ids)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths[doc_ids] / avg_length)
+                scores[doc_ids] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+            matched = np.flatnonzero(scores)
+            if not len(matched):
+                return []
+            if len(matched) > k:
+                matched = matched[np.argpartition(-scores[matched], k)[:k]]
+            matched = matched[np.argsort(-scores[matched])]
+            return [(self.pmids[i], float(scores[i])) for i in matched]
+
+    def save(self, path: Optional[str] = None):
+        """
+        Write the index as plain arrays to an .npz file
+
+        Postings are concatenated per term, in vocabulary order, with an
+        offsets array marking where each term starts; nothing is pickled, so
+        loading a file never runs code from it.
+        """
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given to save the index to")
+        with self._save_lock:
+            # Copy under the lock, write outside it so searches are not held up by disk I/O
+            with self._lock:
+                terms = list(self._postings)
+                doc_ids = [np.frombuffer(self._postings[term][0], dtype=np.uint32) for term in terms]
+                tfs = [np.frombuffer(self._postings[term][1], dtype=np.float32) for term in terms]
+                arrays = {
+                    'meta': np.array(json.dumps({
+                        'field_weights': self.field_weights, 'k1': self.k1, 'b': self.b,
+                        'total_length': self._total_length,
+                    })),
+                    'pmids': np.array(self.pmids, dtype=str),
+                    'doc_lengths': np.array(self._doc_lengths, dtype=np.float32),
+                    'terms': np.array(terms, dtype=str),
+                    'offsets': np.concatenate([[0], np.cumsum([len(ids) for ids in doc_ids], dtype=np.int64)]),
+                    'doc_ids': np.concatenate(doc_ids or [np.empty(0, dtype=np.uint32)]),
+                    'tfs': np.concatenate(tfs or [np.empty(0, dtype=np.float32)]),
+                }
+                self._dirty = False
+            try:
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(path + '.tmp', 'wb') as f:
+                    np.savez(f, **arrays)
+                os.replace(path + '.tmp', path)
+            except BaseException:
+                self._dirty = True
+                raise
+            self.path = path
+
+    def save_if_dirty(self):
+        if self._dirty and self.path:
+            self.save()
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            obj = cls(meta['field_weights'], meta['k1'], meta['b'], path=path)
+            obj._total_length = meta['total_length']
+            obj.pmids = data['pmids'].tolist()
+            obj._doc_ids = {pmid: i for i, pmid in enumerate(obj.pmids)}
+            obj._doc_lengths = array('f', data['doc_lengths'].tobytes())
+            offsets = data['offsets']
+            doc_ids = data['doc_ids']
+            tfs = data['tfs']
+            for i, term in enumerate(data['terms'].tolist()):
+                start, end = offsets[i], offsets[i + 1]
+                obj._postings[term] = (array('I', doc_ids[start:end].tobytes()), array('f', tfs[start:end].tobytes()))
+        return obj
+
+    @classmethod
+    def open(cls, path: str = ".pubkin_cache/bm25.npz"):
+        """
+        Load the index at path, or start an empty one that saves there
+        """
+        if os.path.exists(path):
+            print(f"[INFO] Loading BM25 index from {path}")
+            return cls.load(path)
+        legacy = os.path.splitext(path)[0] + '.pkl'
+        if os.path.exists(legacy):
+            # Pickles are no longer loaded; the index refills from new searches or a re-ingest
+            print(f"[WARN] Ignoring pickled BM25 index {legacy}; starting an empty one at {path}")
+        return cls(path=path)
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60):
+    """
+    Fuse several rankings of PMIDs with reciprocal rank fusion
+
+    Args:
+        rankings: Lists of PMIDs, best first
+        k (int): RRF damping constant
+
+    Returns:
+        list: (pmid, fused_score) tuples, best first
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, pmid in enumerate(ranking):
+            fused[pmid] = fused.get(pmid, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
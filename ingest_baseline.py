@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Offline ingest of PubMed baseline/update dumps (pubmed25n0001.xml.gz, ...).
+
+Files are parsed in a process pool with the same schema as
+PubMedQuerier._extract_article_info, embedded in batches with
+PubMedBERTEmbedding and written to the local ArticleStore and the
+persistent per-field vector indexes. Finished files are recorded in a
+checkpoint so an interrupted run resumes with the next file.
+
+Usage:
+    python ingest_baseline.py /data/pubmed/baseline --workers 8
+    python ingest_baseline.py /data/pubmed/updatefiles/*.xml.gz --fields combined
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from article_store import ArticleStore
+from chunking import AbstractChunker, field_chunks
+from hybrid_search import BM25Index
+from pubmed_xml import parse_pubmed_articles
+from vector_index import INDEX_TYPES, IndexConfig, VectorIndexStore
+
+
+FIELDS = ('title', 'abstract', 'combined')
+
+
+def field_text(article, field):
+    title = article.get('title', '')
+    abstract = article.get('abstract', '')
+    if field == 'combined':
+        return f"{title}. {abstract}".strip()
+    elif field == 'title':
+        return title.strip()
+    return abstract.strip()
+
+
+def find_dump_files(paths):
+    """
+    Expand directories and glob patterns into a sorted list of .xml/.xml.gz files
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, '*.xml.gz')))
+            files.extend(glob.glob(os.path.join(path, '*.xml')))
+        else:
+            files.extend(glob.glob(path) or [path])
+    return sorted(set(files))
+
+
+def load_checkpoint(path):
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return set(json.load(f).get('completed', []))
+    return set()
+
+
+def save_checkpoint(path, completed):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'completed': sorted(completed)}, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def parse_file(path):
+    """
+    Worker entry point: parse one dump file into article dicts
+    """
+    return path, parse_pubmed_articles(path)
+
+
+class BaselineIngester:
+    def __init__(self, model, article_store, index_store, fields=FIELDS, embed_batch_size=256,
+                 sparse_index=None):
+        """
+        Args:
+            model (PubMedBERTEmbedding): Embedding model
+            article_store (ArticleStore): Where parsed records are written
+            index_store (VectorIndexStore): Where vectors are written
+            fields (tuple): Which of 'title', 'abstract', 'combined' to index
+            embed_batch_size (int): Texts per embedding call
+            sparse_index (BM25Index, optional): Lexical index fed alongside the vectors
+        """
+        self.model = model
+        self.article_store = article_store
+        self.index_store = index_store
+        self.fields = fields
+        self.embed_batch_size = embed_batch_size
+        self.sparse_index = sparse_index
+        self.chunker = AbstractChunker.for_model(model)
+
+    def _embed(self, texts, field, ids):
+        if hasattr(self.model, 'embed_texts'):
+            return self.model.embed_texts(texts, field=field, ids=ids)
+        return self.model.embed_documents(texts)
+
+    def ingest_articles(self, articles):
+        """
+        Store articles and index each configured field
+
+        Records already in an index are replaced, since update files carry
+        revised versions of earlier citations.
+        """
+        self.article_store.put_many(articles)
+        if self.sparse_index is not None:
+            self.sparse_index.add(articles)
+
+        for field in self.fields:
+            index = self.index_store.get(field)
+            chunked = self.index_store.is_chunked(field)
+            for start in range(0, len(articles), self.embed_batch_size):
+                batch = articles[start:start + self.embed_batch_size]
+                if chunked:
+                    texts = field_chunks(self.chunker, batch, field)
+                else:
+                    texts = [[field_text(a, field)] if field_text(a, field) else [] for a in batch]
+                keep = [i for i, chunks in enumerate(texts) if chunks]
+                if not keep:
+                    continue
+                pmids = [str(batch[i]['pmid']) for i in keep]
+                counts = [len(texts[i]) for i in keep]
+                vectors = self._embed(
+                    [chunk for i in keep for chunk in texts[i]], field,
+                    [pmid for pmid, count in zip(pmids, counts) for _ in range(count)],
+                )
+                extra = {'counts': counts} if chunked else {}
+                try:
+                    index.upsert(pmids, vectors, **extra)
+                except ValueError as e:
+                    # Layouts without removal (HNSW) keep the first version
+                    print(f"[WARN] {e}; adding new PMIDs only")
+                    index.add(pmids, vectors, **extra)
+
+    def _save(self):
+        self.index_store.save_all()
+        if self.sparse_index is not None:
+            self.sparse_index.save_if_dirty()
+
+    def run(self, files, checkpoint_path, workers=4, save_interval=900):
+        """
+        Ingest files in order, skipping those already in the checkpoint
+
+        Every save rewrites the whole index files, so they are saved on a
+        timer rather than per file; files finished since the last save are
+        only checkpointed once their vectors are on disk.
+
+        Args:
+            files (list): Dump files
+            checkpoint_path (str): JSON file listing completed files
+            workers (int): Parser processes
+            save_interval (float): Seconds between saves of indexes + checkpoint
+        """
+        completed = load_checkpoint(checkpoint_path)
+        todo = [f for f in files if os.path.basename(f) not in completed]
+        print(f"[INFO] {len(files)} files, {len(files) - len(todo)} already ingested, {len(todo)} to go")
+        if not todo:
+            return
+
+        unsaved = []
+        last_save = time.monotonic()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Parse a few files ahead while the main process embeds, without
+            # holding every parsed file in memory at once
+            queue = deque()
+            remaining = iter(todo)
+            for path in remaining:
+                queue.append(pool.submit(parse_file, path))
+                if len(queue) >= workers + 1:
+                    break
+
+            while queue:
+                path, articles = queue.popleft().result()
+                next_path = next(remaining, None)
+                if next_path is not None:
+                    queue.append(pool.submit(parse_file, next_path))
+
+                start = time.perf_counter()
+                self.ingest_articles(articles)
+                print(f"[INFO] {os.path.basename(path)}: {len(articles)} articles in "
+                      f"{time.perf_counter() - start:.1f}s")
+
+                unsaved.append(os.path.basename(path))
+                if time.monotonic() - last_save >= save_interval:
+                    self._save()
+                    completed.update(unsaved)
+                    save_checkpoint(checkpoint_path, completed)
+                    unsaved = []
+                    last_save = time.monotonic()
+
+        if unsaved:
+            self._save()
+            completed.update(unsaved)
+            save_checkpoint(checkpoint_path, completed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='Dump files, directories or glob patterns')
+    parser.add_argument('--fields', default=','.join(FIELDS),
+                        help='Comma-separated fields to index (title, abstract, combined)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='Parser processes')
+    parser.add_argument('--embed-batch-size', type=int, default=256)
+    parser.add_argument('--save-interval', type=float, default=900,
+                        help='Seconds between index saves + checkpoints')
+    parser.add_argument('--checkpoint', default='.pubkin_cache/ingest_checkpoint.json')
+    parser.add_argument('--article-store', default='.pubkin_cache/articles.sqlite')
+    parser.add_argument('--index-dir', default='.pubkin_cache/indexes')
+    parser.add_argument('--index-type', choices=INDEX_TYPES, default='flat')
+    parser.add_argument('--bm25-index', default='.pubkin_cache/bm25.npz',
+                        help="BM25 index file to extend ('' to skip lexical indexing)")
+    parser.add_argument('--model', default='neuml/pubmedbert-base-embeddings')
+    args = parser.parse_args()
+
+    fields = tuple(f.strip() for f in args.fields.split(',') if f.strip())
+    unknown = set(fields) - set(FIELDS)
+    if unknown:
+        parser.error(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    files = find_dump_files(args.paths)
+    if not files:
+        parser.error("No dump files found")
+
+    # Imported here so --help works without loading torch
+    from wrapPubmed import PubMedBERTEmbedding
+
+    model = PubMedBERTEmbedding(args.model, batch_size=args.embed_batch_size)
+    article_store = ArticleStore(args.article_store)
+    index_store = VectorIndexStore(
+        args.index_dir,
+        dim=model.model.get_sentence_embedding_dimension(),
+        mmap=False,
+        config=IndexConfig(args.index_type),
+        article_store=article_store,
+        model=model.cache_name,
+    )
+
+    sparse_index = BM25Index.open(args.bm25_index) if args.bm25_index else None
+
+    ingester = BaselineIngester(model, article_store, index_store, fields, args.embed_batch_size,
+                                sparse_index=sparse_index)
+    ingester.run(files, args.checkpoint, workers=args.workers, save_interval=args.save_interval)
+
+
+if __name__ == '__main__':
+    main()
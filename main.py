@@ -6,19 +6,94 @@ from searchworkflow_faiss import SearchWork_faiss
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from wrapPubmed import PubMedBERTEmbedding
 from query_conversion import queryConvert
+from embedding_cache import EmbeddingCache
+from vector_index import VectorIndexStore
+from article_store import ArticleStore
+from hybrid_search import BM25Index
+from embedding_service import EmbeddingService
+from search_jobs import SearchJobs
+from autosave import Autosaver
+from metrics import get_metrics
+import os
 import streamlit as st
 
 @st.cache_resource(show_spinner="🔬 Loading Pubkin...")
 
 def load_model():
-    return PubMedBERTEmbedding()
+    # PUBKIN_EMBED_WORKERS > 0 encodes in a shared pool of worker processes
+    workers = int(os.getenv("PUBKIN_EMBED_WORKERS", "0"))
+    service = EmbeddingService(workers=workers) if workers > 0 else None
+    return PubMedBERTEmbedding(cache=EmbeddingCache(), service=service)
+
+
+@st.cache_resource(show_spinner="📚 Loading indexes...")
+
+def load_index_store(_model, _article_store):
+    # Records of corpus hits are looked up in the article store, not kept with the vectors
+    store = VectorIndexStore(dim=_model.model.get_sentence_embedding_dimension(), article_store=_article_store,
+                             model=_model.cache_name)
+    store.load_all()
+    return store
+
+
+@st.cache_resource
+
+def load_article_store():
+    return ArticleStore()
+
+
+@st.cache_resource
+
+def load_sparse_index():
+    return BM25Index.open()
+
+
+@st.cache_resource
+
+def load_search_jobs(_model, _index_store, _article_store, _sparse_index):
+    # One runner for the whole server: sessions share its result cache and running jobs
+    return SearchJobs(
+        _model, PubMedQuerier, SearchWork_faiss, queryConvert,
+        index_store=_index_store, article_store=_article_store, sparse_index=_sparse_index
+    )
+
+
+@st.cache_resource
+
+def start_autosave(_index_store, _sparse_index):
+    # Searches only grow the in-memory indexes; one thread writes them to disk
+    interval = float(os.getenv("PUBKIN_SAVE_INTERVAL", "120"))
+    return Autosaver([_index_store.save_all, _sparse_index.save_if_dirty], interval=interval)
+
+
+@st.cache_resource
+
+def start_metrics_export():
+    # PUBKIN_METRICS_PORT serves /metrics; PUBKIN_METRICS_FILE feeds node_exporter's textfile collector
+    metrics = get_metrics()
+    port = int(os.getenv("PUBKIN_METRICS_PORT", "0"))
+    if port:
+        metrics.serve_prometheus(port)
+    path = os.getenv("PUBKIN_METRICS_FILE")
+    if path:
+        metrics.start_textfile_export(path)
+    return metrics
 
 
 # Use cached model
 model = load_model()
+article_store = load_article_store()
+index_store = load_index_store(model, article_store)
+sparse_index = load_sparse_index()
+search_jobs = load_search_jobs(model, index_store, article_store, sparse_index)
+start_autosave(index_store, sparse_index)
+start_metrics_export()
 
     
-app = StreamlitApp(model, PubMedQuerier, SearchWork_faiss, queryConvert)
+app = StreamlitApp(
+    model, PubMedQuerier, SearchWork_faiss, queryConvert,
+    index_store=index_store, article_store=article_store, sparse_index=sparse_index, jobs=search_jobs
+)
     
 
 if __name__ == "__main__":
@@ -24,16 +24,16 @@ def main():
         if not pmid_list:
             print("No results found.")
             return
-        querier.display_summary(articles)
-        
         # Fetch detailed article information
         articles = querier.fetch_article_details(pmid_list)
-    
+
+        # Display summary
+        querier.display_summary(articles)
+
         obj_search = SearchWork(model,search_query,articles)
         
         obj_search.search_similar('title')
-        # Display summary
-        
+
         # Save results
         #csv_file = querier.save_to_csv(articles)
         #json_file = querier.save_to_json(articles)
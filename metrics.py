@@ -0,0 +1,287 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+# Histogram buckets (seconds) for stage durations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Span attributes summed into counters; anything else only goes into the trace
+COUNTERS = ('count', 'bytes', 'cache_hits', 'cache_misses')
+
+# Spans of the search being run on this thread (see collect)
+_collector = contextvars.ContextVar('pubkin_span_collector', default=None)
+
+
+class Span:
+    __slots__ = ('stage', 'start', 'duration', 'attrs', 'thread')
+
+    def __init__(self, stage: str, start: float, attrs: Dict):
+        """
+        One timed pipeline stage: wall-clock start (epoch seconds), duration and attributes
+        """
+        self.stage = stage
+        self.start = start
+        self.duration = 0.0
+        self.attrs = attrs
+        self.thread = threading.get_ident()
+
+    def add(self, **values):
+        """
+        Increment numeric attributes (count, bytes, cache_hits, cache_misses, ...)
+        """
+        for key, value in values.items():
+            self.attrs[key] = self.attrs.get(key, 0) + value
+
+    def to_dict(self):
+        return {'stage': self.stage, 'start': self.start, 'duration': self.duration, **self.attrs}
+
+
+class Metrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS, max_spans: int = 20000, prefix: str = 'pubkin'):
+        """
+        Per-stage timing histograms, counters and a ring buffer of recent spans
+
+        Stages are the pipeline steps (query_convert, esearch, efetch,
+        xml_parse, embed, encode, index_search, ...). Durations feed a
+        Prometheus histogram per stage; count/bytes/cache_hits/cache_misses
+        attributes feed counters. The most recent max_spans spans are kept
+        for percentiles and JSON trace export.
+
+        Args:
+            buckets (tuple): Histogram upper bounds in seconds
+            max_spans (int): Recent spans kept in memory
+            prefix (str): Metric name prefix
+        """
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self._spans = deque(maxlen=max_spans)
+        self._histograms = {}  # stage -> [bucket counts..., +Inf count], sum
+        self._counters = {}  # (stage, counter) -> total
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage: str, **attrs):
+        """
+        Time the with-block as one span of stage
+
+        Usage:
+            with metrics.span("esearch") as span:
+                ...
+                span.add(count=len(ids))
+        """
+        span = Span(stage, time.time(), attrs)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - start
+            self._finish(span)
+
+    def record(self, stage: str, seconds: float, start: Optional[float] = None, **attrs):
+        """
+        Record a span whose duration was measured elsewhere
+        """
+        span = Span(stage, start if start is not None else time.time() - seconds, attrs)
+        span.duration = seconds
+        self._finish(span)
+        return span
+
+    def _finish(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+            histogram = self._histograms.get(span.stage)
+            if histogram is None:
+                histogram = self._histograms[span.stage] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts = histogram[0]
+            for i, bound in enumerate(self.buckets):
+                if span.duration <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            histogram[1] += span.duration
+            for name in COUNTERS:
+                value = span.attrs.get(name)
+                if value:
+                    self._counters[(span.stage, name)] = self._counters.get((span.stage, name), 0) + value
+        collected = _collector.get()
+        if collected is not None:
+            collected.append(span)
+
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def prometheus_text(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format
+        """
+        name = f"{self.prefix}_stage_duration_seconds"
+        lines = [f"# HELP {name} Pipeline stage duration", f"# TYPE {name} histogram"]
+        with self._lock:
+            histograms = {stage: (list(h[0]), h[1]) for stage, h in self._histograms.items()}
+            counters = dict(self._counters)
+        for stage in sorted(histograms):
+            counts, total = histograms[stage]
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {counts[-1]}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {counts[-1]}')
+        for counter in COUNTERS:
+            name = f"{self.prefix}_stage_{counter}_total"
+            stages = sorted(stage for stage, c in counters if c == counter)
+            if not stages:
+                continue
+            lines.append(f"# TYPE {name} counter")
+            for stage in stages:
+                lines.append(f'{name}{{stage="{stage}"}} {counters[(stage, counter)]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        """
+        Write prometheus_text() atomically (for node_exporter's textfile collector)
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(path + '.tmp', path)
+
+    def start_textfile_export(self, path: str, interval: float = 15.0):
+        """
+        Rewrite the Prometheus text file every interval seconds from a daemon thread
+        """
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_prometheus(path)
+                except OSError as e:
+                    print(f"[WARN] Could not write metrics to {path}: {e}")
+
+        threading.Thread(target=loop, name='pubkin-metrics-file', daemon=True).start()
+
+    def serve_prometheus(self, port: int, addr: str = ''):
+        """
+        Serve prometheus_text() at http://addr:port/metrics from a daemon thread
+
+        Returns:
+            ThreadingHTTPServer: call shutdown() to stop it
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((addr, port), Handler)
+        threading.Thread(target=server.serve_forever, name='pubkin-metrics-http', daemon=True).start()
+        print(f"[INFO] Serving metrics on :{port}/metrics")
+        return server
+
+    def write_trace(self, path: str, spans: Optional[List[Span]] = None):
+        """
+        Write spans as a Chrome/Perfetto JSON trace (complete events, one lane per thread)
+        """
+        spans = self.spans() if spans is None else spans
+        events = [
+            {
+                'name': span.stage, 'ph': 'X', 'pid': os.getpid(), 'tid': span.thread,
+                'ts': round(span.start * 1e6), 'dur': round(span.duration * 1e6), 'args': span.attrs,
+            }
+            for span in spans
+        ]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
+
+
+def summarize(spans: List[Span]) -> List[Dict]:
+    """
+    Per-stage totals and percentiles of spans, in first-seen order
+
+    Returns:
+        list: Dicts with stage, calls, total_ms, p50_ms, p95_ms, max_ms and summed counters
+    """
+    stages = {}
+    for span in spans:
+        stages.setdefault(span.stage, []).append(span)
+    rows = []
+    for stage, group in stages.items():
+        durations = np.array([span.duration for span in group]) * 1000.0
+        row = {
+            'stage': stage,
+            'calls': len(group),
+            'total_ms': round(float(durations.sum()), 1),
+            'p50_ms': round(float(np.percentile(durations, 50)), 1),
+            'p95_ms': round(float(np.percentile(durations, 95)), 1),
+            'max_ms': round(float(durations.max()), 1),
+        }
+        for name in COUNTERS:
+            row[name] = sum(span.attrs.get(name, 0) for span in group)
+        rows.append(row)
+    return rows
+
+
+@contextmanager
+def collect():
+    """
+    Gather every span finished in this context into a list
+
+    Threads started from inside only report into it when they run in a copy
+    of this context (contextvars.copy_context().run).
+
+    Yields:
+        list: Spans, filled as they finish
+    """
+    spans = []
+    token = _collector.set(spans)
+    try:
+        yield spans
+    finally:
+        _collector.reset(token)
+
+
+_default_metrics = None
+_default_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+        return _default_metrics
+
+
+def span(stage: str, **attrs):
+    """
+    Time a block as a span of stage in the process-wide Metrics
+    """
+    return get_metrics().span(stage, **attrs)
+
+
+def record(stage: str, seconds: float, start: Optional[float] = None, **attrs):
+    return get_metrics().record(stage, seconds, start, **attrs)
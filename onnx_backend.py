@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+ONNX Runtime backend for PubMedBERTEmbedding.
+
+Export the SentenceTransformer once (plus a dynamically int8-quantized copy
+unless --no-int8 is given), then encode with OnnxEncoder, which has the same
+encode() surface as a SentenceTransformer:
+
+    python onnx_backend.py --model neuml/pubmedbert-base-embeddings
+
+    model = PubMedBERTEmbedding(backend="onnx")
+
+Needs onnxruntime; the export additionally needs torch, transformers and onnx.
+"""
+
+import argparse
+import json
+import os
+from typing import List, Optional
+
+import numpy as np
+
+
+DEFAULT_ONNX_DIR = ".pubkin_cache/onnx/pubmedbert-base-embeddings"
+CONFIG_FILE = "pubkin_onnx.json"
+
+
+def export_onnx(model_name: str = "neuml/pubmedbert-base-embeddings", output_dir: str = DEFAULT_ONNX_DIR,
+                int8: bool = True, opset: int = 14):
+    """
+    Export a SentenceTransformer's transformer to ONNX
+
+    The pooling (and normalization, if the model has it) stays outside the
+    graph and is read back from pubkin_onnx.json by OnnxEncoder.
+
+    Args:
+        model_name (str): SentenceTransformer model
+        output_dir (str): Where model.onnx, model.int8.onnx, the tokenizer and the config go
+        int8 (bool): Also write a dynamically int8-quantized copy
+        opset (int): ONNX opset version
+
+    Returns:
+        str: output_dir
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+
+    pooling = "mean"
+    normalize = False
+    for module in st_model:
+        name = type(module).__name__
+        if name == "Pooling":
+            config = module.get_config_dict()
+            if config.get("pooling_mode_cls_token"):
+                pooling = "cls"
+            elif config.get("pooling_mode_max_tokens"):
+                pooling = "max"
+        elif name == "Normalize":
+            normalize = True
+
+    os.makedirs(output_dir, exist_ok=True)
+    dummy = tokenizer(["PubMed abstract", "export"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    print(f"[INFO] Exporting {model_name} to {fp32_path}")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(dummy[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+
+    if int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        int8_path = os.path.join(output_dir, "model.int8.onnx")
+        print(f"[INFO] Quantizing weights to int8: {int8_path}")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+    tokenizer.save_pretrained(output_dir)
+    with open(os.path.join(output_dir, CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "model_name": model_name,
+            "dim": st_model.get_sentence_embedding_dimension(),
+            "max_seq_length": st_model.max_seq_length,
+            "pooling": pooling,
+            "normalize": normalize,
+            "input_names": input_names,
+        }, f, indent=2)
+    return output_dir
+
+
+class OnnxEncoder:
+    def __init__(self, model_dir: str = DEFAULT_ONNX_DIR, int8: bool = True, threads: Optional[int] = None,
+                 tokenizer=None):
+        """
+        Encode with an exported model on ONNX Runtime (CPU)
+
+        Implements the parts of the SentenceTransformer API PubMedBERTEmbedding
+        uses (encode, get_sentence_embedding_dimension, max_seq_length,
+        tokenizer). Texts are sorted by length before batching so each batch
+        pads to similar lengths.
+
+        Args:
+            model_dir (str): Directory written by export_onnx
+            int8 (bool): Use the int8-quantized graph
+            threads (int, optional): Intra-op threads (ONNX Runtime picks by default)
+            tokenizer (optional): Tokenizer to use instead of the one saved in model_dir
+        """
+        import onnxruntime as ort
+
+        with open(os.path.join(model_dir, CONFIG_FILE), encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.model_dir = model_dir
+        self.int8 = int8
+        self.max_seq_length = self.config["max_seq_length"]
+        self.pooling = self.config["pooling"]
+        self.normalize = self.config["normalize"]
+        self.input_names = self.config["input_names"]
+
+        path = os.path.join(model_dir, "model.int8.onnx" if int8 else "model.onnx")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found; run onnx_backend.py first")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+        if tokenizer is None:
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.tokenizer = tokenizer
+
+    def get_sentence_embedding_dimension(self):
+        return self.config["dim"]
+
+    def _pool(self, hidden, mask):
+        if self.pooling == "cls":
+            pooled = hidden[:, 0]
+        elif self.pooling == "max":
+            pooled = np.where(mask[:, :, None] > 0, hidden, -np.inf).max(axis=1)
+        else:
+            weights = mask[:, :, None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        if self.normalize:
+            pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype(np.float32, copy=False)
+
+    def _encode_batch(self, texts: List[str]):
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np"
+        )
+        feed = {name: np.asarray(encoded[name], dtype=np.int64) for name in self.input_names}
+        hidden = self.session.run(None, feed)[0]
+        return self._pool(hidden, feed["attention_mask"])
+
+    def encode(self, texts, batch_size: int = 32, convert_to_numpy: bool = True, **kwargs):
+        """
+        Encode texts with SentenceTransformer.encode semantics
+
+        Returns:
+            np.ndarray: (len(texts), dim) float32 matrix, or a vector for a single string
+        """
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        # Longest first, like SentenceTransformer, so batches pad to similar lengths
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        vectors = np.empty((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            vectors[rows] = self._encode_batch([texts[i] for i in rows])
+        return vectors[0] if single else vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='neuml/pubmedbert-base-embeddings')
+    parser.add_argument('--output', default=DEFAULT_ONNX_DIR)
+    parser.add_argument('--int8', action=argparse.BooleanOptionalAction, default=True,
+                        help='Also write an int8-quantized graph (the encoder default)')
+    parser.add_argument('--opset', type=int, default=14)
+    args = parser.parse_args()
+    export_onnx(args.model, args.output, int8=args.int8, opset=args.opset)
+
+
+if __name__ == '__main__':
+    main()
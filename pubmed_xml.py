@@ -0,0 +1,180 @@
+import gzip
+import xml.etree.ElementTree as ET
+
+
+def _text(elem):
+    """
+    Full text of an element, including text inside inline markup (<i>, <sup>, ...)
+    """
+    if elem is None:
+        return ''
+    return ''.join(elem.itertext())
+
+
+def _child_text(parent, path):
+    if parent is None:
+        return ''
+    return _text(parent.find(path))
+
+
+def extract_article(elem):
+    """
+    Build the article dict for one <PubmedArticle> element
+
+    Produces the same schema as PubMedQuerier._extract_article_info.
+
+    Args:
+        elem: ElementTree element for a PubmedArticle
+
+    Returns:
+        dict: Dictionary containing article information
+    """
+    medline_citation = elem.find('MedlineCitation')
+    article = medline_citation.find('Article')
+
+    # Basic article information
+    info = {
+        'pmid': _child_text(medline_citation, 'PMID'),
+        'title': '',
+        'abstract': '',
+        'abstract_sections': [],
+        'authors': [],
+        'journal': '',
+        'journal_abbrev': '',
+        'issn': '',
+        'volume': '',
+        'issue': '',
+        'pages': '',
+        'pub_date': '',
+        'pub_year': '',
+        'doi': '',
+        'keywords': [],
+        'mesh_terms': [],
+        'publication_types': [],
+        'language': '',
+        'country': '',
+        'nlm_unique_id': '',
+        'issn_linking': ''
+    }
+
+    # Title
+    info['title'] = _child_text(article, 'ArticleTitle')
+
+    # Abstract
+    abstract_parts = article.findall('Abstract/AbstractText')
+    if abstract_parts:
+        # Sections are kept so long structured abstracts can be chunked on them
+        info['abstract_sections'] = [_text(part) for part in abstract_parts]
+        info['abstract'] = ' '.join(info['abstract_sections'])
+
+    # Authors
+    authors = []
+    for author in article.findall('AuthorList/Author'):
+        last_name = author.find('LastName')
+        fore_name = author.find('ForeName')
+        if last_name is not None and fore_name is not None:
+            full_name = f"{_text(fore_name)} {_text(last_name)}"
+            initials = author.find('Initials')
+            if initials is not None:
+                full_name = f"{_text(fore_name)} {_text(initials)} {_text(last_name)}"
+            authors.append(full_name)
+        elif author.find('CollectiveName') is not None:
+            authors.append(_child_text(author, 'CollectiveName'))
+    info['authors'] = authors
+
+    # Journal information
+    journal = article.find('Journal')
+    if journal is not None:
+        info['journal'] = _child_text(journal, 'Title')
+        info['journal_abbrev'] = _child_text(journal, 'ISOAbbreviation')
+        info['issn'] = _child_text(journal, 'ISSN')
+
+        # Volume, Issue, Publication date
+        issue = journal.find('JournalIssue')
+        if issue is not None:
+            info['volume'] = _child_text(issue, 'Volume')
+            info['issue'] = _child_text(issue, 'Issue')
+
+            pub_date = issue.find('PubDate')
+            if pub_date is not None:
+                year = _child_text(pub_date, 'Year')
+                month = _child_text(pub_date, 'Month')
+                day = _child_text(pub_date, 'Day')
+                info['pub_date'] = f"{year}-{month}-{day}".strip('-')
+                info['pub_year'] = year
+
+    # Pages
+    info['pages'] = _child_text(article, 'Pagination/MedlinePgn')
+
+    # DOI
+    for eloc in article.findall('ELocationID'):
+        if eloc.get('EIdType') == 'doi':
+            info['doi'] = _text(eloc)
+
+    # Keywords
+    info['keywords'] = [_text(k) for k in medline_citation.findall('KeywordList/Keyword')]
+
+    # MeSH terms
+    info['mesh_terms'] = [
+        _text(d) for d in medline_citation.findall('MeshHeadingList/MeshHeading/DescriptorName')
+    ]
+
+    # Publication types
+    info['publication_types'] = [
+        _text(p) for p in article.findall('PublicationTypeList/PublicationType')
+    ]
+
+    # Language
+    language = article.find('Language')
+    if language is not None:
+        info['language'] = _text(language)
+
+    # Country and other journal info
+    journal_info = medline_citation.find('MedlineJournalInfo')
+    if journal_info is not None:
+        info['country'] = _child_text(journal_info, 'Country')
+        info['nlm_unique_id'] = _child_text(journal_info, 'NlmUniqueID')
+        info['issn_linking'] = _child_text(journal_info, 'ISSNLinking')
+
+    return info
+
+
+def iter_pubmed_articles(source):
+    """
+    Incrementally parse a PubmedArticleSet, yielding one article dict at a time
+
+    Each <PubmedArticle> is discarded as soon as it has been converted, so
+    memory stays flat regardless of how many records the response holds.
+
+    Args:
+        source: File path (.xml or .xml.gz) or a binary/text file object
+
+    Yields:
+        dict: Article information (see extract_article)
+    """
+    close = False
+    if isinstance(source, str):
+        source = gzip.open(source, 'rb') if source.endswith('.gz') else open(source, 'rb')
+        close = True
+
+    try:
+        root = None
+        for event, elem in ET.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag == 'PubmedArticle':
+                yield extract_article(elem)
+                # Drop the processed record from the tree
+                root.clear()
+    finally:
+        if close:
+            source.close()
+
+
+def parse_pubmed_articles(source):
+    """
+    Parse a PubmedArticleSet into a list of article dicts
+    """
+    return list(iter_pubmed_articles(source))
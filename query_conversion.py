@@ -1,28 +1,19 @@
 from langchain_groq import ChatGroq
 from langchain_core.messages import HumanMessage, SystemMessage
 import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
 from dotenv import load_dotenv
 import streamlit as st
 
+from metrics import span
 
+load_dotenv()
 
-class queryConvert:
-    def __init__(self, query:str):
-        load_dotenv()
-        self.query = query
-        os.environ["GROQ_API_KEY"]= os.getenv("GROQ_API_KEY")
-        #self.API_KEY = st.secrets["GROQ_API_KEY"]
-
-    def query_convert(self):
-
-        # Initialize Mixtral model
-        llm = ChatGroq(model_name="moonshotai/kimi-k2-instruct", temperature=0.2)
-
-        # Example user query
-        # user_query = "design and synthesis of gsk3 inhibitors"
-
-        # System instruction to guide the LLM to focus on PubMed-style search generation
-        system_prompt = """
+# System instruction to guide the LLM to focus on PubMed-style search generation
+SYSTEM_PROMPT = """
         You are a biomedical search expert. Your task is to convert user questions into precise PubMed search queries.
 
         Rules:
@@ -33,11 +24,161 @@ class queryConvert:
         Return only the query string.
         """
 
-        # Generate PubMed search query
-        response = llm([
+
+class GroqBackend:
+    def __init__(self, model_name="moonshotai/kimi-k2-instruct", temperature=0.2):
+        """
+        LLM backend that converts questions with a single reused ChatGroq client
+        """
+        self.model_name = model_name
+        self.temperature = temperature
+        self._llm = None
+        self._lock = threading.Lock()
+
+    def _client(self):
+        with self._lock:
+            if self._llm is None:
+                api_key = os.getenv("GROQ_API_KEY")
+                #api_key = st.secrets["GROQ_API_KEY"]
+                if api_key:
+                    os.environ["GROQ_API_KEY"] = api_key
+                self._llm = ChatGroq(model_name=self.model_name, temperature=self.temperature)
+            return self._llm
+
+    def convert(self, system_prompt, query):
+        response = self._client().invoke([
             SystemMessage(content=system_prompt),
-            HumanMessage(content=self.query)
+            HumanMessage(content=query)
         ])
-
-    
         return response.content
+
+
+class ConversionCache:
+    def __init__(self, path=".pubkin_cache/query_conversions.sqlite", ttl=7 * 24 * 3600, max_entries=1024):
+        """
+        Cache of converted queries: bounded in-memory LRU backed by SQLite
+
+        Args:
+            path (str): SQLite file (None keeps the cache in memory only)
+            ttl (float): Seconds a conversion stays valid
+            max_entries (int): Size of the in-memory LRU
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS conversions (
+                    key TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def normalize(query):
+        """
+        Case- and whitespace-insensitive key for a user question
+        """
+        return " ".join(query.lower().split()).rstrip("?.! ")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            if key in self._memory:
+                result, created_at = self._memory[key]
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    return result
+                del self._memory[key]
+
+            if self._conn is None:
+                return None
+            row = self._conn.execute(
+                "SELECT result, created_at FROM conversions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                return None
+            self._remember(key, row[0], row[1])
+            return row[0]
+
+    def put(self, key, result):
+        now = time.time()
+        with self._lock:
+            self._remember(key, result, now)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO conversions (key, result, created_at) VALUES (?, ?, ?)",
+                    (key, result, now),
+                )
+                self._conn.commit()
+
+    def _remember(self, key, result, created_at):
+        self._memory[key] = (result, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+_default_backend = None
+_default_cache = None
+_defaults_lock = threading.Lock()
+
+
+def get_default_backend():
+    global _default_backend
+    with _defaults_lock:
+        if _default_backend is None:
+            _default_backend = GroqBackend()
+        return _default_backend
+
+
+def get_default_cache():
+    global _default_cache
+    with _defaults_lock:
+        if _default_cache is None:
+            _default_cache = ConversionCache()
+        return _default_cache
+
+
+class queryConvert:
+    def __init__(self, query:str, backend=None, cache=None):
+        """
+        Args:
+            query (str): User question
+            backend (optional): Object with convert(system_prompt, query) -> str;
+                defaults to a shared GroqBackend
+            cache (ConversionCache, optional): Defaults to a shared on-disk cache
+        """
+        self.query = query
+        self.backend = backend or get_default_backend()
+        self.cache = cache or get_default_cache()
+
+    def query_convert(self):
+        # Example user query
+        # user_query = "design and synthesis of gsk3 inhibitors"
+
+        model_name = getattr(self.backend, "model_name", type(self.backend).__name__)
+        key = f"{model_name}\x1f{ConversionCache.normalize(self.query)}"
+
+        with span("query_convert") as timing:
+            cached = self.cache.get(key)
+            if cached is not None:
+                timing.add(cache_hits=1)
+                return cached
+
+            # Generate PubMed search query
+            timing.add(cache_misses=1)
+            result = self.backend.convert(SYSTEM_PROMPT, self.query)
+            self.cache.put(key, result)
+            return result
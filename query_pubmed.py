@@ -4,22 +4,73 @@ import time
 from Bio import Entrez
 import pandas as pd
 from datetime import datetime
-import json
+from http.client import IncompleteRead
+from urllib.error import HTTPError, URLError
 import sys
+import contextvars
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from rate_limiter import get_entrez_limiter, retry_delay
+from pubmed_xml import parse_pubmed_articles
+from article_export import export_fields, write_csv, write_json, write_parquet
+from metrics import record, span
+
+
+class _CountingReader:
+    """
+    File-like wrapper that counts the bytes and the seconds spent in read()
+
+    The parser pulls the efetch response while it parses, so the time
+    spent waiting on the network is only known from inside read().
+    """
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.bytes = 0
+        self.read_seconds = 0.0
+
+    def read(self, size=-1):
+        start = time.perf_counter()
+        data = self.handle.read(size)
+        self.read_seconds += time.perf_counter() - start
+        self.bytes += len(data)
+        return data
+
 class PubMedQuerier:
-    def __init__(self, email, api_key=None):
+    # Retry policy for transient E-utilities failures
+    max_retries = 4
+    backoff_base = 0.5
+    backoff_max = 30.0
+
+    def __init__(self, email, api_key=None, article_store=None):
         """
         Initialize PubMed querier with email (required by NCBI)
         
         Args:
             email (str): Your email address (required by NCBI)
             api_key (str, optional): NCBI API key for higher rate limits
+            article_store (ArticleStore, optional): Local cache consulted before fetching
         """
         Entrez.email = email
         if api_key:
             Entrez.api_key = api_key
+        # Biopython retries 429/5xx immediately and sleeps 15s on URLError, outside
+        # the rate limiter and without Retry-After; _with_retry owns that policy
+        Entrez.max_tries = 1
+        self.api_key = api_key
+        self.article_store = article_store
+
+        # Every E-utilities request goes through this shared limiter
+        self.rate_limiter = get_entrez_limiter(api_key)
+        self.max_workers = int(self.rate_limiter.rate)
+
+        # History server state of the last search
+        self.webenv = None
+        self.query_key = None
+        self.count = 0
+
+        # PMIDs that could not be fetched by the last fetch_article_details call
+        self.failed_pmids = []
         
     def search_pubmed(self, query, max_results=30, sort_by='relevance'):
         """
@@ -36,16 +87,23 @@ class PubMedQuerier:
             print(f"Searching PubMed for: '{query}'")
             
             # Perform the search
-            search_handle = Entrez.esearch(
-                db="pubmed",
-                term=query,
-                retmax=max_results,
-                sort=sort_by,
-                usehistory="y"
-            )
-            
-            search_results = Entrez.read(search_handle)
-            search_handle.close()
+            with span("esearch") as timing:
+                search_handle = self._entrez(
+                    Entrez.esearch,
+                    db="pubmed",
+                    term=query,
+                    retmax=max_results,
+                    sort=sort_by,
+                    usehistory="y"
+                )
+
+                search_results = Entrez.read(search_handle)
+                search_handle.close()
+                timing.add(count=len(search_results["IdList"]))
+
+            self.webenv = search_results.get("WebEnv")
+            self.query_key = search_results.get("QueryKey")
+            self.count = int(search_results.get("Count", 0))
             
             id_list = search_results["IdList"]
             print(f"Found {len(id_list)} articles")
@@ -57,55 +115,289 @@ class PubMedQuerier:
             return []
     
 
-    def fetch_article_details(self, pmid_list):
+    def fetch_article_details(self, pmid_list, return_failed=False):
         """
         Fetch detailed information for a list of PubMed IDs using batching + threading + rate-limiting
+
+        Failed requests are retried with backoff. A batch that still fails on
+        transient errors (429, 5xx, network) is reported failed as a whole; one
+        that fails on a bad request or unparseable response is split in half
+        and each half retried, down to single PMIDs. PMIDs missing from a
+        successful response are reported failed too.
+
+        Args:
+            pmid_list (list): PubMed IDs to fetch
+            return_failed (bool): Also return the PMIDs that still failed
+
+        Returns:
+            list: Article dictionaries, or (articles, failed_pmids) if return_failed
         """
         articles = []
-        batch_size = 10
-        rate_limit_per_sec = 3  # PubMed allows 3 requests/sec without API key
-        delay_between_batches = 1 / rate_limit_per_sec  # ~333ms
+        for batch_articles in self.iter_article_batches(pmid_list):
+            articles.extend(batch_articles)
 
-        def fetch_batch(batch):
-            try:
-                handle = Entrez.efetch(
-                    db="pubmed",
-                    id=batch,
-                    rettype="medline",
-                    retmode="xml"
-                )
-                records = Entrez.read(handle)
-                handle.close()
-                return [self._extract_article_info(r) for r in records['PubmedArticle']]
-            except Exception as e:
-                print(f"[ERROR] Failed fetching batch {batch}: {e}")
-                return []
+        print(f"[INFO] Finished fetching {len(articles)} articles")
+
+        if return_failed:
+            return articles, self.failed_pmids
+        return articles
+
+    def iter_article_batches(self, pmid_list, batch_size=10):
+        """
+        Fetch articles and yield each batch as soon as it arrives
+
+        All batches are submitted up front, so the next requests are already in
+        flight while the caller processes the current batch. PMIDs that could
+        not be fetched are in self.failed_pmids once the generator is exhausted.
+        With an article_store, fresh cached records are yielded first and only
+        the misses are requested from NCBI.
+
+        Args:
+            pmid_list (list): PubMed IDs to fetch
+            batch_size (int): PMIDs per efetch request
+
+        Yields:
+            list: Article dictionaries of one completed batch
+        """
+        self.failed_pmids = []
+
+        if self.article_store is not None:
+            with span("article_store", count=len(pmid_list)) as timing:
+                cached = self.article_store.get_many(pmid_list)
+                timing.add(cache_hits=len(cached), cache_misses=len(pmid_list) - len(cached))
+            if cached:
+                print(f"[INFO] {len(cached)} of {len(pmid_list)} articles served from the local store")
+                yield [cached[str(p)] for p in pmid_list if str(p) in cached]
+            pmid_list = [p for p in pmid_list if str(p) not in cached]
+            if not pmid_list:
+                return
 
         print(f"Fetching {len(pmid_list)} articles in batches of {batch_size}...")
 
         # Create all batches
         batches = [pmid_list[i:i + batch_size] for i in range(0, len(pmid_list), batch_size)]
 
-        with ThreadPoolExecutor(max_workers=rate_limit_per_sec) as executor:
-            futures = []
-            last_submit_time = time.time()
+        # Workers block on the shared rate limiter, so submit everything up front
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Each task runs in a copy of this context so its spans reach the caller's trace
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._fetch_batch, batch) for batch in batches
+            ]
 
-            for i, batch in enumerate(batches):
-                now = time.time()
-                elapsed = now - last_submit_time
-                if elapsed < delay_between_batches:
-                    time.sleep(delay_between_batches - elapsed)
+            for future in as_completed(futures):
+                batch_articles, batch_failed = future.result()
+                self.failed_pmids.extend(batch_failed)
+                if batch_articles:
+                    if self.article_store is not None:
+                        self.article_store.put_many(batch_articles)
+                    yield batch_articles
 
-                futures.append(executor.submit(fetch_batch, batch))
-                last_submit_time = time.time()
+        if self.failed_pmids:
+            print(f"[WARN] {len(self.failed_pmids)} PMIDs could not be fetched: {self.failed_pmids}")
 
-            # Gather results
-            for future in as_completed(futures):
-                articles.extend(future.result())
+    def iter_articles(self, query, max_results=30, batch_size=10, sort_by='relevance'):
+        """
+        Search PubMed and yield parsed articles as each efetch batch completes
+
+        Args:
+            query (str): Search query
+            max_results (int): Maximum number of results to retrieve
+            batch_size (int): PMIDs per efetch request
+            sort_by (str): Sort order
+
+        Yields:
+            dict: Article information
+        """
+        pmid_list = self.search_pubmed(query, max_results=max_results, sort_by=sort_by)
+        for batch_articles in self.iter_article_batches(pmid_list, batch_size=batch_size):
+            yield from batch_articles
+
+    def _fetch_batch(self, batch):
+        """
+        Fetch one batch of PMIDs, splitting it in half when a part of it is bad
+
+        Only errors that a smaller request could avoid (a 4xx other than 429,
+        an unparseable response) split the batch; once transient errors have
+        used up the retries, splitting would only repeat them, so the whole
+        batch is reported failed.
+
+        Returns:
+            tuple: (articles, failed_pmids)
+        """
+        try:
+            articles = self._with_retry(self._efetch, id=batch)
+        except Exception as e:
+            if self._is_transient(e) or len(batch) == 1:
+                print(f"[ERROR] Failed fetching PMIDs {list(batch)}: {e}")
+                return [], list(batch)
+            print(f"[WARN] Batch {batch} kept failing ({e}); splitting")
+            mid = len(batch) // 2
+            left, left_failed = self._fetch_batch(batch[:mid])
+            right, right_failed = self._fetch_batch(batch[mid:])
+            return left + right, left_failed + right_failed
+
+        returned = {str(article.get('pmid')) for article in articles}
+        missing = [pmid for pmid in batch if str(pmid) not in returned]
+        if missing:
+            print(f"[WARN] efetch returned no record for PMIDs {missing}")
+        return articles, missing
+
+    def search_history(self, query, sort_by='relevance'):
+        """
+        Run a search on the NCBI history server without downloading the ID list
+
+        Args:
+            query (str): Search query
+            sort_by (str): Sort order ('relevance', 'pub_date', 'title', etc.)
+
+        Returns:
+            dict: {'webenv', 'query_key', 'count'} for use with fetch_from_history
+        """
+        print(f"Searching PubMed (history) for: '{query}'")
+
+        search_handle = self._entrez(
+            Entrez.esearch,
+            db="pubmed",
+            term=query,
+            retmax=0,
+            sort=sort_by,
+            usehistory="y"
+        )
+        search_results = Entrez.read(search_handle)
+        search_handle.close()
+
+        self.webenv = search_results["WebEnv"]
+        self.query_key = search_results["QueryKey"]
+        self.count = int(search_results["Count"])
+        print(f"Found {self.count} articles")
+
+        return {'webenv': self.webenv, 'query_key': self.query_key, 'count': self.count}
+
+    def fetch_from_history(self, webenv, query_key, max_results, batch_size=500):
+        """
+        Page through a history-server result set with retstart/retmax
+
+        Args:
+            webenv (str): WebEnv returned by esearch
+            query_key (str): QueryKey returned by esearch
+            max_results (int): Number of records to fetch
+            batch_size (int): Records per efetch request
+
+        Returns:
+            list: List of article dictionaries, in result order
+        """
+        def fetch_page(retstart):
+            try:
+                return self._with_retry(
+                    self._efetch,
+                    webenv=webenv,
+                    query_key=query_key,
+                    retstart=retstart,
+                    retmax=min(batch_size, max_results - retstart)
+                )
+            except Exception as e:
+                print(f"[ERROR] Failed fetching records {retstart}-{retstart + batch_size}: {e}")
+                return []
+
+        starts = list(range(0, max_results, batch_size))
+        print(f"Fetching {max_results} articles from history in pages of {batch_size}...")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {retstart: executor.submit(fetch_page, retstart) for retstart in starts}
+
+            # Keep the server's ordering
+            articles = []
+            for retstart in starts:
+                articles.extend(futures[retstart].result())
 
         print(f"[INFO] Finished fetching {len(articles)} articles")
         return articles
 
+    def fetch_large_result(self, query, max_results=10000, batch_size=500, sort_by='relevance'):
+        """
+        Search and fetch a large result set entirely through the history server
+
+        Args:
+            query (str): Search query
+            max_results (int): Maximum number of records to fetch
+            batch_size (int): Records per efetch request
+            sort_by (str): Sort order
+
+        Returns:
+            list: List of article dictionaries
+        """
+        try:
+            history = self.search_history(query, sort_by=sort_by)
+        except Exception as e:
+            print(f"Error during search: {e}")
+            return []
+
+        total = min(max_results, history['count'])
+        if not total:
+            return []
+        return self.fetch_from_history(history['webenv'], history['query_key'], total, batch_size)
+
+    def _entrez(self, func, **params):
+        """
+        Call an Entrez function once the shared rate limiter allows it
+        """
+        self.rate_limiter.acquire()
+        return func(**params)
+
+    def _is_retryable(self, error):
+        # Client errors other than 429 will not succeed on retry
+        if isinstance(error, HTTPError):
+            return error.code == 429 or error.code >= 500
+        return True
+
+    def _is_transient(self, error):
+        # Server-side or network trouble, as opposed to a bad request or response
+        if isinstance(error, HTTPError):
+            return error.code == 429 or error.code >= 500
+        return isinstance(error, (URLError, ConnectionError, TimeoutError, IncompleteRead))
+
+    def _with_retry(self, func, **params):
+        """
+        Call func(**params), retrying transient failures up to max_retries times
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return func(**params)
+            except Exception as e:
+                if attempt == self.max_retries or not self._is_retryable(e):
+                    raise
+                headers = getattr(e, 'headers', None)
+                retry_after = headers.get('Retry-After') if headers is not None else None
+                delay = retry_delay(retry_after, attempt, self.backoff_base, self.backoff_max)
+                print(f"[WARN] Request failed ({e}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _efetch(self, **params):
+        """
+        Run one efetch request and stream-parse the PubmedArticle records
+        """
+        wall_start = time.time()
+        start = time.perf_counter()
+        handle = self._entrez(
+            Entrez.efetch,
+            db="pubmed",
+            rettype="medline",
+            retmode="xml",
+            **params
+        )
+        request_seconds = time.perf_counter() - start
+        reader = _CountingReader(handle)
+        try:
+            articles = parse_pubmed_articles(reader)
+        finally:
+            handle.close()
+        # Network time (request, rate-limit wait and reads) vs time spent parsing
+        total = time.perf_counter() - start
+        network = request_seconds + reader.read_seconds
+        record("efetch", network, wall_start, count=len(articles), bytes=reader.bytes)
+        record("xml_parse", total - network, wall_start + network, count=len(articles))
+        return articles
+
     def _extract_article_info(self, record):
         """
         Extract comprehensive information from a PubMed record
@@ -124,6 +416,7 @@ class PubMedQuerier:
             'pmid': medline_citation['PMID'],
             'title': '',
             'abstract': '',
+            'abstract_sections': [],
             'authors': [],
             'journal': '',
             'journal_abbrev': '',
@@ -151,9 +444,11 @@ class PubMedQuerier:
         if 'Abstract' in article and 'AbstractText' in article['Abstract']:
             abstract_parts = article['Abstract']['AbstractText']
             if isinstance(abstract_parts, list):
-                info['abstract'] = ' '.join([str(part) for part in abstract_parts])
+                info['abstract_sections'] = [str(part) for part in abstract_parts]
+                info['abstract'] = ' '.join(info['abstract_sections'])
             else:
                 info['abstract'] = str(abstract_parts)
+                info['abstract_sections'] = [info['abstract']]
         
         # Authors
         if 'AuthorList' in article:
@@ -237,48 +532,64 @@ class PubMedQuerier:
         
         return info
     
-    def save_to_csv(self, articles, filename=None):
+    def save_to_csv(self, articles, filename=None, compress=False):
         """
         Save articles to CSV file
-        
+
+        Rows are streamed in chunks and list fields are joined with '; ' in
+        the output only; the article dicts are left unchanged.
+
         Args:
-            articles (list): List of article dictionaries
+            articles (iterable): Article dictionaries (a list or a generator)
             filename (str): Output filename (optional)
+            compress (bool): gzip the output (also implied by a '.gz' filename)
         """
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"pubmed_results_{timestamp}.csv"
-        
-        # Convert lists to strings for CSV
-        for article in articles:
-            for key, value in article.items():
-                if isinstance(value, list):
-                    article[key] = '; '.join(value)
-        
-        df = pd.DataFrame(articles)
-        df.to_csv(filename, index=False)
-        print(f"Results saved to {filename}")
-        
+            filename = f"pubmed_results_{timestamp}.csv{'.gz' if compress else ''}"
+
+        count = write_csv(articles, filename, fields=export_fields(articles), compress=compress or None)
+        print(f"Results saved to {filename} ({count} articles)")
+
         return filename
-    
-    def save_to_json(self, articles, filename=None):
+
+    def save_to_json(self, articles, filename=None, compress=False):
         """
         Save articles to JSON file
-        
+
+        Articles are streamed into the array one chunk at a time; a '.jsonl'
+        filename writes JSON Lines instead.
+
         Args:
-            articles (list): List of article dictionaries
+            articles (iterable): Article dictionaries (a list or a generator)
             filename (str): Output filename (optional)
+            compress (bool): gzip the output (also implied by a '.gz' filename)
         """
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"pubmed_results_{timestamp}.json"
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(articles, f, indent=2, ensure_ascii=False)
-        
-        print(f"Results saved to {filename}")
+            filename = f"pubmed_results_{timestamp}.json{'.gz' if compress else ''}"
+
+        count = write_json(articles, filename, compress=compress or None)
+        print(f"Results saved to {filename} ({count} articles)")
         return filename
-    
+
+    def save_to_parquet(self, articles, filename=None, compression='snappy'):
+        """
+        Save articles to a Parquet file with list-typed author/MeSH/type columns
+
+        Args:
+            articles (iterable): Article dictionaries (a list or a generator)
+            filename (str): Output filename (optional)
+            compression (str): Parquet codec ('snappy', 'gzip', 'zstd', 'none')
+        """
+        if not filename:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"pubmed_results_{timestamp}.parquet"
+
+        count = write_parquet(articles, filename, fields=export_fields(articles), compression=compression)
+        print(f"Results saved to {filename} ({count} articles)")
+        return filename
+
     def display_summary(self, articles):
         """
         Display a summary of the retrieved articles
@@ -0,0 +1,93 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        """
+        Thread-safe token bucket
+
+        Args:
+            rate (float): Tokens added per second
+            capacity (float, optional): Burst size (defaults to rate)
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self, tokens=1):
+        """
+        Take tokens if available without blocking
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise seconds to wait before retrying
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        """
+        Block until tokens are available, then take them
+        """
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return
+            time.sleep(wait)
+
+
+# NCBI E-utilities limits: 3 requests/sec per IP without a key, 10/sec with one
+ENTREZ_RATE_NO_KEY = 3
+ENTREZ_RATE_WITH_KEY = 10
+
+_entrez_limiters = {}
+_entrez_limiters_lock = threading.Lock()
+
+
+def get_entrez_limiter(api_key=None):
+    """
+    Return the process-wide limiter for E-utilities requests
+
+    All requests without a key share one 3/s bucket (NCBI counts them per IP);
+    each API key gets its own 10/s bucket.
+    """
+    key = api_key or None
+    with _entrez_limiters_lock:
+        if key not in _entrez_limiters:
+            rate = ENTREZ_RATE_WITH_KEY if key else ENTREZ_RATE_NO_KEY
+            # Burst of 1 keeps requests evenly spaced inside each second
+            _entrez_limiters[key] = TokenBucket(rate, capacity=1)
+        return _entrez_limiters[key]
+
+
+def retry_delay(retry_after, attempt, base, cap):
+    """
+    Seconds to wait before retry number attempt + 1
+
+    Honours a Retry-After value (seconds or an HTTP date) when the server
+    sent one, otherwise uses jittered exponential backoff. Never above cap.
+    """
+    if retry_after:
+        try:
+            return min(cap, max(0.0, float(retry_after)))
+        except ValueError:
+            try:
+                when = parsedate_to_datetime(retry_after)
+                return min(cap, max(0.0, (when - datetime.now(timezone.utc)).total_seconds()))
+            except (TypeError, ValueError):
+                pass
+
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
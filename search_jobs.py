@@ -0,0 +1,249 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from facets import FacetIndex
+from metrics import collect, span
+
+
+def use_case_key(use_case):
+    """
+    Hashable form of a use_case ('combined', or a dict of field -> weight)
+    """
+    if isinstance(use_case, dict):
+        return tuple(sorted((field, round(float(weight), 4)) for field, weight in use_case.items()))
+    return use_case
+
+
+class ResultCache:
+    def __init__(self, ttl=3600, max_entries=128):
+        """
+        In-memory cache of finished searches shared by all sessions
+
+        Keyed by (converted query, use_case, max_results). Entries expire
+        after ttl seconds; past max_entries the least recently used go first.
+
+        Args:
+            ttl (float): Seconds a result stays valid
+            max_entries (int): Maximum cached searches
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query, use_case, max_results):
+        return (" ".join(query.split()), use_case_key(use_case), max_results)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            result, created_at = entry
+            if now - created_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = (result, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SearchJob:
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, job_id, query, use_case, max_results):
+        """
+        State of one background search, read by the UI while it runs
+
+        Args:
+            job_id (int): Unique id
+            query (str): Query as typed by the user
+            use_case: 'abstract', 'title', 'combined', or a dict of field -> weight
+            max_results (int): PMIDs requested from esearch
+        """
+        self.id = job_id
+        self.query = query
+        self.use_case = use_case
+        self.max_results = max_results
+        self.converted = None
+        self.status = self.RUNNING
+        self.message = "Converting query..."
+        self.error = None
+        self.cached = False
+        self.total = 0
+        self.articles = []
+        self.similarities = []
+        self.facets = None
+        self.searcher = None
+        self.spans = []  # metrics.Span objects of this job, filled while it runs
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+
+    @property
+    def done(self):
+        return self.status != self.RUNNING
+
+    def wait(self, timeout=None):
+        """
+        Block until the job is done or failed
+
+        Returns:
+            bool: False if timeout expired first
+        """
+        return self._finished.wait(timeout)
+
+    def snapshot(self):
+        """
+        Consistent copy of the progress fields
+
+        Returns:
+            dict: status, message, error, cached, total, ranked and similarities
+        """
+        with self._lock:
+            return {
+                "status": self.status,
+                "message": self.message,
+                "error": self.error,
+                "cached": self.cached,
+                "total": self.total,
+                "ranked": len(self.articles),
+                "similarities": list(self.similarities),
+            }
+
+    def _update(self, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+
+    def _finish(self, result, cached=False):
+        self._update(
+            articles=result["articles"], similarities=result["similarities"],
+            facets=result["facets"], searcher=result["searcher"], total=result["total"],
+            cached=cached, message=result["message"], status=self.DONE,
+        )
+        self._finished.set()
+
+
+class SearchJobs:
+    def __init__(self, model, querier_class, search_class, query_class, index_store=None, article_store=None,
+                 sparse_index=None, cache=None, max_workers=4, top_k=25):
+        """
+        Run the convert → esearch → efetch → embed chain in background threads
+
+        Meant to be created once per server (st.cache_resource) so every
+        session shares the result cache and the running jobs: an identical
+        request that is already running is joined instead of started again,
+        and a finished one is answered from the cache.
+
+        Args:
+            model: Embeddings model passed to search_class
+            querier_class: PubMedQuerier-like class
+            search_class: SearchWork_faiss-like class
+            query_class: queryConvert-like class
+            index_store (VectorIndexStore, optional): Shared dense indexes
+            article_store (ArticleStore, optional): Shared article cache
+            sparse_index (BM25Index, optional): Shared sparse index
+            cache (ResultCache, optional): Defaults to a one-hour cache
+            max_workers (int): Searches running at the same time
+            top_k (int): Results kept per search
+        """
+        self.model = model
+        self.PubMedQuerier = querier_class
+        self.SearchWork = search_class
+        self.query = query_class
+        self.index_store = index_store
+        self.article_store = article_store
+        self.sparse_index = sparse_index
+        self.cache = cache or ResultCache()
+        self.top_k = top_k
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="pubkin-search")
+        self._running = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, email, query, use_case, max_results=30):
+        """
+        Start a search, or join the identical one already running
+
+        Returns:
+            SearchJob: Poll job.done / job.snapshot() for progress
+        """
+        request_key = (" ".join(query.split()), use_case_key(use_case), max_results)
+        with self._lock:
+            job = self._running.get(request_key)
+            if job is not None:
+                return job
+            job = SearchJob(next(self._ids), query, use_case, max_results)
+            self._running[request_key] = job
+        self._executor.submit(self._run, job, email, request_key)
+        return job
+
+    def _run(self, job, email, request_key):
+        try:
+            with collect() as spans, span("search") as timing:
+                job._update(spans=spans)
+                converted = self.query(job.query).query_convert()
+                job._update(converted=converted)
+                key = self.cache.key(converted, job.use_case, job.max_results)
+                result = self.cache.get(key)
+                cached = result is not None
+                timing.add(cache_hits=int(cached), cache_misses=int(not cached))
+                if not cached:
+                    result = self._search(job, email, converted)
+                    self.cache.put(key, result)
+                timing.add(count=len(result["articles"]))
+            # Finish after the search span closes so it is part of job.spans
+            job._finish(result, cached=cached)
+        except Exception as e:
+            job._update(error=str(e), message=f"Error: {e}", status=SearchJob.FAILED)
+            job._finished.set()
+        finally:
+            with self._lock:
+                self._running.pop(request_key, None)
+
+    def _search(self, job, email, converted):
+        if self.article_store is not None:
+            querier = self.PubMedQuerier(email=email, article_store=self.article_store)
+        else:
+            querier = self.PubMedQuerier(email=email)
+
+        job._update(message="Searching PubMed...")
+        pmids = querier.search_pubmed(converted, max_results=job.max_results)
+        if not pmids:
+            return {"articles": [], "similarities": [], "facets": None, "searcher": None,
+                    "total": 0, "message": "No articles found."}
+
+        search_kwargs = {}
+        if self.index_store is not None:
+            search_kwargs["index_store"] = self.index_store
+        if self.sparse_index is not None:
+            search_kwargs["sparse_index"] = self.sparse_index
+        searcher = self.SearchWork(self.model, converted, [], **search_kwargs)
+
+        # Publish the partial ranking after every micro-batch
+        job._update(total=len(pmids), message="Ranking articles...")
+        similarities = []
+        for similarities in searcher.iter_search(querier.iter_article_batches(pmids), job.use_case, top_k=self.top_k):
+            job._update(articles=list(searcher.articles), similarities=similarities)
+
+        articles = searcher.articles
+        message = "Articles retrieved!" if similarities else "No embeddings found for selected type."
+        # Built once per result set; every filter widget change is then a set operation.
+        # The table also holds the corpus hits appended while ranking.
+        table = searcher.table
+        facets = FacetIndex(table.row(row) for row in range(len(table)))
+        return {"articles": articles, "similarities": similarities, "facets": facets,
+                "searcher": searcher, "total": len(pmids), "message": message}
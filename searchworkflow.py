@@ -9,115 +9,141 @@ import torch
 import numpy as np
 from transformers import AutoTokenizer, AutoModel
 
+from article_table import ArticleTable, SearchHit
+
 
 class SearchWork:
-    def __init__(self, model,query,data):
+    FIELDS = ('abstract', 'title', 'combined')
+
+    def __init__(self, model,query,data, batch_size=64):
         self.model = model 
         self.articles = data
         self.query = query
-        self.embedding_data = {}
-        self.embedding_results = {}
-        
-
-    def search_similar(self,use_case):
-        
-
-        for article in self.articles:
-            # Extract required fields
-            pmid = str(article.get('pmid', ''))
-            abstract = article.get('abstract', '')
-            title = article.get('title', '')
-            authors = article.get('authors', [])
-            publishers = article.get('publishers', '')
-
-            if not pmid:
+        self.batch_size = batch_size
+        self.table = data if isinstance(data, ArticleTable) else ArticleTable.from_articles(data)
+        # field -> (normalized float32 matrix, table row of each matrix row)
+        self.embedding_matrices = {}
+        self._query_embedding = None
+
+    def _encode(self, texts):
+        """
+        Encode texts in batches and L2-normalize the rows
+
+        Returns:
+            np.ndarray: Contiguous float32 matrix of shape (len(texts), dim)
+        """
+        vectors = self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-10)
+        return vectors
+
+    def _combined(self, row):
+        # Combine title and abstract for comprehensive embedding
+        return f"{self.table.get(row, 'title')}. {self.table.get(row, 'abstract')}".strip()
+
+    def build_embeddings(self):
+        """
+        Embed all titles, abstracts and combined texts in one batched pass
+        """
+        texts = {field: [] for field in self.FIELDS}
+        rows = {field: [] for field in self.FIELDS}
+
+        for row in range(len(self.table)):
+            if not self.table.get(row, 'pmid'):
                 continue
 
-            # Combine title and abstract for comprehensive embedding
-            combined_text = f"{title}. {abstract}".strip()
-
-            # Create embeddings
-            embeddings = {}
-
-            if abstract:
-                abstract_embedding = self.model.encode([abstract])[0]   #[0] → extracts the first (and only) embedding from the returned list.
-                embeddings['abstract'] = abstract_embedding.tolist()    #.tolist() converts the embedding from a NumPy array or tensor to a Python list (useful for serialization).
-
-            if title:
-                title_embedding = self.model.encode([title])[0]
-                embeddings['title'] = title_embedding.tolist()
-
-            if combined_text:
-                combined_embedding = self.model.encode([combined_text])[0]
-                embeddings['combined'] = combined_embedding.tolist()
-
-            # Store in results
-            self.embedding_results[pmid] = {
-                'pmid': pmid,
-                'title': title,
-                'abstract': abstract,
-                'authors': authors,
-                'publishers': publishers,
-                'embeddings': embeddings,
-                'chunk': combined_text
-            }
-
-        self.embedding_data = self.embedding_results
-
-        # Encode the query
-        query_embedding = self.model.encode([self.query])[0]
-        # Compute similarities
+            abstract = self.table.get(row, 'abstract')
+            title = self.table.get(row, 'title')
+            for field, text in (('abstract', abstract), ('title', title), ('combined', self._combined(row))):
+                if text:
+                    texts[field].append(text)
+                    rows[field].append(row)
+
+        all_texts = [text for field in self.FIELDS for text in texts[field]]
+        if not all_texts:
+            return
+        vectors = self._encode(all_texts)
+
+        start = 0
+        for field in self.FIELDS:
+            if texts[field]:
+                end = start + len(texts[field])
+                self.embedding_matrices[field] = (
+                    vectors[start:end], np.asarray(rows[field], dtype=np.int64)
+                )
+                start = end
+
+    def _field_scores(self, use_case, query_embedding):
+        # Scores for one field, or the weighted mean over the fields each article has
+        if isinstance(use_case, str):
+            if use_case not in self.embedding_matrices:
+                return None, None
+            matrix, table_rows = self.embedding_matrices[use_case]
+            return matrix @ query_embedding, table_rows
+
+        total = np.zeros(len(self.table), dtype=np.float32)
+        weight_sum = np.zeros(len(self.table), dtype=np.float32)
+        for field, weight in use_case.items():
+            if not weight or field not in self.embedding_matrices:
+                continue
+            matrix, table_rows = self.embedding_matrices[field]
+            total[table_rows] += weight * (matrix @ query_embedding)
+            weight_sum[table_rows] += weight
+        table_rows = np.flatnonzero(weight_sum)
+        if not len(table_rows):
+            return None, None
+        return total[table_rows] / weight_sum[table_rows], table_rows
+
+    def search_rows(self, use_case, top_k=None):
+        """
+        Rank articles by cosine similarity to the query
+
+        Field embeddings and the query embedding are computed once, so ranking
+        again by another use_case is just matrix-vector products.
+
+        Args:
+            use_case: 'abstract', 'title', 'combined', or a dict of field -> weight
+            top_k (int, optional): Only return the best top_k articles (all by default)
+
+        Returns:
+            list: SearchHit (table row, similarity) objects, highest first
+        """
+        if not self.embedding_matrices:
+            self.build_embeddings()
+
+        # Encode the query once and score every article with matrix-vector products
+        if self._query_embedding is None:
+            self._query_embedding = self._encode([self.query])[0]
+        scores, table_rows = self._field_scores(use_case, self._query_embedding)
+        if scores is None:
+            return []
+
+        n = scores.shape[0]
+        if top_k is not None and top_k < n:
+            top = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            top = np.arange(n)
+        top = top[np.argsort(-scores[top])]
+
+        return [SearchHit(int(table_rows[i]), float(scores[i])) for i in top]
+
+    def search_similar(self,use_case, top_k=None):
+        """
+        Like search_rows, but materializes each hit as a result dict
+        """
         similarities = []
-        for pmid, article_data in self.embedding_data.items():
-            #performing semantic search on combined (topic + abs data)
-            if use_case=='combined':
-                #performing semantic search on combined (topic + abs data)
-            
-                if 'combined' in article_data['embeddings']:
-                    article_embedding = np.array(article_data['embeddings']['combined'])
-                    similarity = np.dot(query_embedding, article_embedding) / (
-                        np.linalg.norm(query_embedding) * np.linalg.norm(article_embedding)+ 1e-10
-                    )
-
-            elif use_case=='title':
-                #performing semantic search on title.
-            
-                if 'title' in article_data['embeddings']:
-                    article_embedding = np.array(article_data['embeddings']['title'])
-                    similarity = np.dot(query_embedding, article_embedding) / (
-                        np.linalg.norm(query_embedding) * np.linalg.norm(article_embedding)+ 1e-10
-                    )
-
-
-            elif use_case=='abstract':
-                # perfroming semntic search on abstract
-
-                if 'abstract' in article_data['embeddings']:
-                    article_embedding = np.array(article_data['embeddings']['abstract'])
-                    similarity = np.dot(query_embedding, article_embedding) / (
-                        np.linalg.norm(query_embedding) * np.linalg.norm(article_embedding)+ 1e-10
-                    )
-
-
+        for hit in self.search_rows(use_case, top_k=top_k):
+            row = hit.row
             similarities.append({
-                'pmid': pmid,
-                'similarity': float(similarity),
-                'title': article_data['title'],
-                'abstract': article_data['abstract'],
-                'chunk': article_data['chunk'],
-                'authors': article_data['authors'],
-                'publishers': article_data['publishers']
+                'pmid': self.table.get(row, 'pmid'),
+                'similarity': hit.score,
+                'title': self.table.get(row, 'title'),
+                'abstract': self.table.get(row, 'abstract'),
+                'chunk': self._combined(row),
+                'authors': self.table.get(row, 'authors'),
+                'publishers': ''
             })
 
-        # Sort and print top results
-        similarities.sort(key=lambda x: x['similarity'], reverse=True)
         return similarities
-
-        #for i in range(min(10, len(similarities))):
-        #   print(f"\nResult {i+1}")
-         #   print(f"PMID: {similarities[i]['pmid']}")
-          #  print(f"Title: {similarities[i]['title']}")
-           # print(f"Abstract: {similarities[i]['abstract']}")
-            #print(f"Similarity Score: {similarities[i]['similarity']:.4f}")
-    
-        
\ No newline at end of file
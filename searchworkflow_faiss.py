@@ -1,89 +1,295 @@
-from langchain.vectorstores import FAISS
 from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.schema import Document
-from typing import List, Dict
+from typing import List, Dict, Iterable, Optional, Union
+import threading
+import numpy as np
+
+from article_table import ArticleTable, SearchHit
+from chunking import CHUNKED_FIELDS, AbstractChunker, field_chunks
+from hybrid_search import reciprocal_rank_fusion
+from metrics import span
+from vector_index import INDEX_FIELDS, VectorIndexStore
 
 class SearchWork_faiss:
-    def __init__(self, model, query: str, articles: List[Dict]):
+    def __init__(self, model, query: str, articles, index_store=None, sparse_index=None,
+                 rrf_k: int = 60, candidate_pool: int = 100, chunker=None):
+        """
+        Args:
+            model: Embeddings model (PubMedBERTEmbedding or any LangChain Embeddings)
+            query (str): Search query
+            articles: List of article dicts or an ArticleTable
+            index_store (VectorIndexStore, optional): Persistent indexes to search;
+                without one the field vectors are kept in memory for this searcher.
+                Searches never write them to disk; their owner does (see Autosaver)
+            sparse_index (BM25Index, optional): Lexical index; when given, dense and
+                BM25 rankings are fused with reciprocal rank fusion
+            rrf_k (int): RRF damping constant
+            candidate_pool (int): Minimum candidates taken from each ranking before fusion
+            chunker (AbstractChunker, optional): Splits long abstracts for chunked
+                fields; defaults to one matching the model's tokenizer
+        """
         self.model = model
         self.query = query
         self.articles = articles
+        self.table = articles if isinstance(articles, ArticleTable) else ArticleTable.from_articles(articles)
+        self.index_store = index_store
+        self.sparse_index = sparse_index
+        self.rrf_k = rrf_k
+        self.candidate_pool = candidate_pool
+        self._store = index_store
+        self._query_vector = None
+        self.chunker = chunker
+        # Cached results hand one searcher to every session; a re-rank appends
+        # corpus hits to self.table, so rankings run one at a time
+        self._lock = threading.RLock()
 
-    def build_documents(self, use_case: str) -> List[Document]:
-        documents = []
-        for article in self.articles:
-            pmid = str(article.get('pmid', ''))
-            title = article.get('title', '')
-            abstract = article.get('abstract', '')
-            authors = article.get('authors', [])
-            doi = article.get('doi', '')
-            journal = article.get('journal')
-            pub_year = article.get('pub_year')
-            pub_type = article.get('publication_types')
+    def _content(self, row: int, use_case) -> str:
+        title = self.table.get(row, 'title')
+        abstract = self.table.get(row, 'abstract')
+        if use_case == 'combined' or isinstance(use_case, dict):
+            return f"{title}. {abstract}".strip()
+        elif use_case == 'title':
+            return title.strip()
+        elif use_case == 'abstract':
+            return abstract.strip()
+        return ''
+
+    def build_documents(self, use_case: str, articles: Optional[List[Dict]] = None) -> List[Document]:
+        """
+        Build one Document per article with text for use_case
 
+        Document metadata only holds the PMID and the article's row in self.table.
+        """
+        if articles is None:
+            rows = range(len(self.table))
+        else:
+            rows = [self.table.append(article) for article in articles]
+
+        documents = []
+        for row in rows:
+            pmid = self.table.get(row, 'pmid')
             if not pmid:
                 continue
 
-            if use_case == 'combined':
-                content = f"{title}. {abstract}".strip()
-            elif use_case == 'title':
-                content = title.strip()
-            elif use_case == 'abstract':
-                content = abstract.strip()
-            else:
+            if use_case not in INDEX_FIELDS:
                 continue  # skip invalid use_case
 
+            content = self._content(row, use_case)
             if content:
-                metadata = {
-                    "pmid": pmid,
-                    "title": title,
-                    "abstract": abstract,
-                    "chunk": content,
-                    "authors": authors,
-                    "doi": doi,
-                    "journal": journal,
-                    "pub_year": pub_year,
-                    "publication_types":pub_type
-
-                }
-                documents.append(Document(page_content=content, metadata=metadata))
+                documents.append(Document(page_content=content, metadata={"pmid": pmid, "row": row}))
         return documents
 
-    def search_similar(self, use_case, top_k=25, similarity_threshold: float = 0.48):
-        # Step 1: Convert to LangChain documents
-        docs = self.build_documents(use_case)
+    def _embed_fields(self, texts: Dict[str, List[str]], ids: Dict[str, List[str]]) -> Dict[str, np.ndarray]:
+        # One encode pass over every field when the model supports it
+        if hasattr(self.model, "embed_fields"):
+            return self.model.embed_fields(texts, ids)
+        if hasattr(self.model, "embed_texts"):
+            return {field: self.model.embed_texts(texts[field], field=field, ids=ids[field]) for field in texts}
+        return {
+            field: np.asarray(self.model.embed_documents(texts[field]), dtype=np.float32)
+            for field in texts
+        }
+
+    def _is_chunked(self, field: str) -> bool:
+        # The in-memory store is created with default settings once vectors exist
+        if self._store is None:
+            return field in CHUNKED_FIELDS
+        return self._store.is_chunked(field)
+
+    def _field_texts(self, rows: List[int], field: str) -> List[List[str]]:
+        # Texts to embed per row: one for plain fields, one per chunk for chunked ones
+        if not self._is_chunked(field):
+            return [[content] if content else [] for content in (self._content(row, field) for row in rows)]
+        if self.chunker is None:
+            self.chunker = AbstractChunker.for_model(self.model)
+        articles = [
+            {key: self.table.get(row, key) for key in ('title', 'abstract', 'abstract_sections')}
+            for row in rows
+        ]
+        return field_chunks(self.chunker, articles, field)
 
-        if not docs:
+    def _index_rows(self, rows: Iterable[int]):
+        """
+        Embed and index every field of the given rows that is not indexed yet
+        """
+        rows = [row for row in rows if self.table.get(row, 'pmid')]
+        texts, ids, field_rows, counts = {}, {}, {}, {}
+        for field in INDEX_FIELDS:
+            new_rows = rows
+            if self._store is not None:
+                new = set(self._store.get(field).missing([self.table.get(row, 'pmid') for row in rows]))
+                new_rows = [row for row in rows if self.table.get(row, 'pmid') in new]
+            for row, chunks in zip(new_rows, self._field_texts(new_rows, field)):
+                if not chunks:
+                    continue
+                pmid = self.table.get(row, 'pmid')
+                texts.setdefault(field, []).extend(chunks)
+                ids.setdefault(field, []).extend([pmid] * len(chunks))
+                field_rows.setdefault(field, []).append(row)
+                counts.setdefault(field, []).append(len(chunks))
+
+        if not texts:
+            return
+
+        # Every field and chunk in one pass; the encoder length-sorts it into batches
+        vectors = self._embed_fields(texts, ids)
+        if self._store is None:
+            dim = next(iter(vectors.values())).shape[1]
+            self._store = VectorIndexStore(directory=None, dim=dim)
+        for field, matrix in vectors.items():
+            index = self._store.get(field)
+            pmids = [self.table.get(row, 'pmid') for row in field_rows[field]]
+            if self._store.is_chunked(field):
+                index.add(pmids, matrix, counts=counts[field])
+            else:
+                index.add(pmids, matrix)
+
+    def _index_sparse(self, articles: Optional[Iterable[Dict]] = None):
+        if self.sparse_index is None:
+            return
+        if articles is None:
+            articles = (self.table.row(row) for row in range(len(self.table)))
+        self.sparse_index.add(articles)
+
+    def query_vector(self):
+        # Embedded once per searcher; re-ranking by another field reuses it
+        if self._query_vector is None:
+            self._query_vector = self.model.embed_query(self.query)
+        return self._query_vector
+
+    def _hits(self, use_case, top_k: int, similarity_threshold: Optional[float]) -> List[SearchHit]:
+        if self._store is None or (isinstance(use_case, str) and use_case not in INDEX_FIELDS):
             return []
+        self.query_vector()  # timed as its own encode span
+        with span("index_search", hybrid=self.sparse_index is not None) as timing:
+            if self.sparse_index is not None:
+                hits = self._hybrid_hits(use_case, top_k, similarity_threshold)
+            else:
+                hits = self._dense_hits(use_case, top_k, similarity_threshold)
+            timing.add(count=len(hits))
+        return hits
 
-        # Step 2: Build FAISS index
-        vectorstore = FAISS.from_documents(docs, self.model)
+    def _rows(self, pmids: List[str]) -> Dict[str, int]:
+        # Table rows of hits; hits from the accumulated corpus that are not in
+        # this result set are appended from the article store, or dropped
+        # when it has no record for them
+        rows = {pmid: self.table.row_of(pmid) for pmid in pmids}
+        unknown = [pmid for pmid, row in rows.items() if row is None]
+        records = self._store.articles(unknown) if unknown else {}
+        for pmid in unknown:
+            if pmid in records:
+                rows[pmid] = self.table.append(records[pmid])
+        return {pmid: row for pmid, row in rows.items() if row is not None}
 
-        # Step 3: Search
-        results = vectorstore.similarity_search_with_score(self.query, k=top_k)
+    def _dense_hits(self, use_case, top_k: int, similarity_threshold: Optional[float]) -> List[SearchHit]:
+        # Cosine index: scores are similarities, best first, already cut at the threshold
+        dense = self._store.search(self.query_vector(), use_case, k=top_k, threshold=similarity_threshold)
+        rows = self._rows([pmid for pmid, _ in dense])
+        return [SearchHit(rows[pmid], score) for pmid, score in dense if pmid in rows]
 
-        # Step 4: Format results
-        formatted = []
-        for doc, score in results:
-            if score is None:
-                continue  # skip invalid results
+    def _hybrid_hits(self, use_case, top_k: int, similarity_threshold: Optional[float]) -> List[SearchHit]:
+        # Fuse the dense and BM25 rankings; the threshold only cuts the dense side,
+        # so lexical matches the embedding misses can still surface
+        pool = max(top_k * 4, self.candidate_pool)
+        dense = self._store.search(self.query_vector(), use_case, k=pool, threshold=similarity_threshold)
+        sparse = self.sparse_index.search(self.query, k=pool)
+        fused = reciprocal_rank_fusion([[pmid for pmid, _ in dense], [pmid for pmid, _ in sparse]], k=self.rrf_k)
+        # Only the best top_k fused PMIDs that can be shown need a record lookup
+        hits = []
+        while fused and len(hits) < top_k:
+            batch, fused = fused[:top_k - len(hits)], fused[top_k - len(hits):]
+            rows = self._rows([pmid for pmid, _ in batch])
+            hits.extend(SearchHit(rows[pmid], None, rrf_score=score) for pmid, score in batch if pmid in rows)
+        self._dense_scores(hits, dict(dense), use_case)
+        return hits
 
-            similarity = 1 - score  # FAISS returns distance; convert to similarity
-            if similarity < similarity_threshold:
-                continue
+    def _dense_scores(self, hits: List[SearchHit], dense: Dict[str, float], use_case):
+        # Keep the cosine similarity in hit.score next to the RRF score; lexical-only
+        # hits are scored against their stored vectors
+        pmids = [self.table.get(hit.row, 'pmid') for hit in hits]
+        missing = [i for i, pmid in enumerate(pmids) if pmid not in dense]
+        if missing:
+            scores = self._store.scores(self.query_vector(), [pmids[i] for i in missing], use_case)
+            dense = dict(dense)
+            dense.update((pmids[i], float(score)) for i, score in zip(missing, scores) if not np.isnan(score))
+        for hit, pmid in zip(hits, pmids):
+            hit.score = dense.get(pmid)
+
+    def _format_results(self, hits: List[SearchHit], use_case):
+        return [self.table.result(hit, chunk=self._content(hit.row, use_case)) for hit in hits]
+
+    def search_rows(self, use_case: Union[str, Dict[str, float]], top_k=25,
+                    similarity_threshold: Optional[float] = None) -> List[SearchHit]:
+        """
+        Rank articles and return only (row, score) hits into self.table
+
+        All three field vectors are indexed on the first call, so ranking again
+        by another use_case only costs a search.
+
+        Args:
+            use_case: 'abstract', 'title', 'combined', or a dict of field -> weight
+            top_k (int): Maximum number of hits
+            similarity_threshold (float, optional): Minimum cosine similarity
+
+        Returns:
+            list: SearchHit objects, highest cosine similarity first (highest
+            fused RRF score, hit.rrf_score, first when a sparse index is set)
+        """
+        if isinstance(use_case, str) and use_case not in INDEX_FIELDS:
+            return []
+
+        with self._lock:
+            # Step 1 + 2: Embed whatever is not indexed yet, every field in one pass
+            self._index_rows(range(len(self.table)))
+            self._index_sparse()
+
+            # Step 3: Search
+            return self._hits(use_case, top_k, similarity_threshold)
+
+    def search_similar(self, use_case, top_k=25, similarity_threshold: float = 0.48):
+        with self._lock:
+            hits = self.search_rows(use_case, top_k=top_k, similarity_threshold=similarity_threshold)
+
+            # Step 4: Format results
+            return self._format_results(hits, use_case)
+
+    def iter_search(self, article_batches: Iterable[List[Dict]], use_case, top_k=25,
+                    similarity_threshold: float = 0.48, micro_batch_size: int = 16):
+        """
+        Embed articles as they arrive and yield the ranking after each micro-batch
+
+        Meant to consume PubMedQuerier.iter_article_batches: while a micro-batch
+        is being embedded the next efetch requests are already in flight. Every
+        field is indexed, so search_similar can re-rank by another use_case
+        afterwards without embedding anything.
+
+        Args:
+            article_batches: Iterable of article lists
+            use_case: 'abstract', 'title', 'combined', or a dict of field -> weight
+            top_k (int): Number of results per ranking
+            similarity_threshold (float): Minimum cosine similarity
+            micro_batch_size (int): Articles embedded per step
+
+        Yields:
+            list: Formatted results over everything indexed so far
+        """
+        self.articles = []
+        pending = []
+
+        def flush(chunk):
+            with self._lock:
+                rows = [self.table.append(article) for article in chunk]
+                self._index_rows(rows)
+                self._index_sparse(chunk)
+                return self._format_results(self._hits(use_case, top_k, similarity_threshold), use_case)
+
+        for batch in article_batches:
+            self.articles.extend(batch)
+            pending.extend(batch)
+            while len(pending) >= micro_batch_size:
+                chunk = pending[:micro_batch_size]
+                del pending[:micro_batch_size]
+                yield flush(chunk)
 
-        for doc, score in results:
-            formatted.append({
-                "pmid": doc.metadata["pmid"],
-                "similarity": 1 - score,  # FAISS returns distance; convert to similarity
-                "title": doc.metadata["title"],
-                "abstract": doc.metadata["abstract"],
-                "chunk": doc.metadata["chunk"],
-                "authors": doc.metadata["authors"],
-                "doi": doc.metadata["doi"],
-                "journal": doc.metadata["journal"],
-                "pub_year": doc.metadata["pub_year"],
-                "publication_types":doc.metadata["publication_types"]
-})
-
-        return sorted(formatted, key=lambda x: x["similarity"], reverse=True)
+        if pending:
+            yield flush(pending)
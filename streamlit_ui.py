@@ -1,13 +1,33 @@
+import time
+
 import streamlit as st
 import streamlit.components.v1 as components
 
+from metrics import summarize
+from search_jobs import SearchJobs
+
 
 class StreamlitApp:
-    def __init__(self, model, querier_class, search_class, query_class ):
+    def __init__(self, model, querier_class, search_class, query_class, index_store=None, article_store=None,
+                 sparse_index=None, jobs=None, poll_interval=0.5):
+        """
+        Args:
+            jobs (SearchJobs, optional): Background search runner; share one
+                across sessions (st.cache_resource) so they share its result cache
+            poll_interval (float): Seconds between reruns while a search is running
+        """
         self.model = model
         self.PubMedQuerier = querier_class
         self.SearchWork = search_class
         self.query = query_class
+        self.index_store = index_store
+        self.article_store = article_store
+        self.sparse_index = sparse_index
+        self.jobs = jobs or SearchJobs(
+            model, querier_class, search_class, query_class, index_store=index_store,
+            article_store=article_store, sparse_index=sparse_index
+        )
+        self.poll_interval = poll_interval
 
     #st.write("Loaded UI")
     def run(self):
@@ -16,12 +36,19 @@ class StreamlitApp:
             st.session_state.articles = []
         if "similarities" not in st.session_state:
             st.session_state.similarities = []
-        if "pub_types" not in st.session_state:
-            st.session_state.pub_types = []
+        if "facets" not in st.session_state:
+            st.session_state.facets = None
+        if "searcher" not in st.session_state:
+            st.session_state.searcher = None
+            st.session_state.ranked_by = None
+        if "job" not in st.session_state:
+            st.session_state.job = None
+            st.session_state.finished_job = None
 
         # ------------- Sidebar ---------------- #
         st.sidebar.title("User Info")
         email = st.sidebar.text_input("Enter your email")
+        show_timings = st.sidebar.checkbox("⏱️ Show stage timings", value=False)
 
        
         # ------------- Main Page ---------------- #
@@ -29,83 +56,145 @@ class StreamlitApp:
 
         query = st.text_input("Enter your search query")
         embedding_option = st.selectbox(
-            "Choose embedding type", ["abstract", "title", "combined"], index=2
+            "Choose embedding type", ["abstract", "title", "combined", "weighted"], index=2
         )
+        if embedding_option == "weighted":
+            st.sidebar.markdown("**Field weights**")
+            embedding_option = {
+                field: st.sidebar.slider(field.capitalize(), 0.0, 1.0, default, 0.1)
+                for field, default in (("title", 0.3), ("abstract", 0.3), ("combined", 0.4))
+            }
         search = st.button("Search")
 
         if search:
             if not email or not query:
                 st.warning("Both email and query are required.")
                 return
+            # Identical searches from any session share one job and its cached result
+            st.session_state.job = self.jobs.submit(email, query, embedding_option, max_results=30)
 
+        job = st.session_state.job
+        if job is not None and not job.done:
+            # Render the partial ranking, then poll again on the next rerun
+            progress = job.snapshot()
             with st.spinner("🔄 Fetching data ..."):
-                try:
-                    # Initialize backend classes
-                    querier = self.PubMedQuerier(email=email)
-                    
-                    mesh_query = self.query(query)
-                    query = mesh_query.query_convert()
-                    pmids = querier.search_pubmed(query, max_results=30)
-
-                    if not pmids:
-                        st.error("No articles found.")
-                        return
-
-                    articles = querier.fetch_article_details(pmids)
-                    st.success("Articles retrieved!")
-
-                    pub_types_set = set()
-                    for article in articles:
-                        pub_types_set.update(article.get("publication_types", []))
-                    
-                    st.session_state.pub_types = sorted(list(pub_types_set))
-                    st.session_state.articles = articles
-                    
-                    model = self.model
-                    searcher = self.SearchWork(model, query, articles )
-                    
-                    similarities = searcher.search_similar(embedding_option)
-
-                    if not similarities:
-                        st.warning("No embeddings found for selected type.")
-                        return
-                    
-                    st.session_state.similarities = similarities
-
-                except Exception as e:
-            
-                    st.error(f"❗ Error: {str(e)}")
+                st.caption(progress["message"] if not progress["total"] else
+                           f"Ranked {progress['ranked']} of {progress['total']} articles...")
+                self._render_results(progress["similarities"])
+                time.sleep(self.poll_interval)
+            self._rerun()
+            return
+
+        if job is not None and st.session_state.finished_job != job.id:
+            st.session_state.finished_job = job.id
+            if job.status == job.FAILED:
+                st.error(f"❗ Error: {job.error}")
+                return
+            if not job.articles:
+                st.error(job.message)
+                return
+            st.success("Articles retrieved!" + (" (cached)" if job.cached else ""))
+
+            st.session_state.facets = job.facets
+            st.session_state.articles = job.articles
+
+            # Every field is indexed now; keep the searcher to re-rank on a mode switch
+            st.session_state.searcher = job.searcher
+            st.session_state.ranked_by = job.use_case
+            st.session_state.similarities = job.similarities
+            if not job.similarities:
+                st.warning(job.message)
+                return
+
+        elif st.session_state.searcher is not None and embedding_option != st.session_state.ranked_by:
+            # Switching the embedding type only re-runs the vector search
+            st.session_state.similarities = st.session_state.searcher.search_similar(embedding_option)
+            st.session_state.ranked_by = embedding_option
+            if st.session_state.facets is not None:
+                # The new ranking can bring in corpus hits the facets have not seen
+                st.session_state.facets.add(st.session_state.similarities)
+
+        if show_timings and job is not None and job.done and job.spans:
+            self._render_timings(job)
 
           # ------------- Display Filtered Results ---------------- #
-        selected_types = []
         if st.session_state.similarities:
-            selected_types = st.sidebar.multiselect(
-            "📄 Filter by Publication Type",
-            st.session_state.pub_types,
-            default=st.session_state.pub_types,
-            key="publication_type_filter"
-                            )
-            
-            filtered_results = [
-                item for item in st.session_state.similarities
-                if any(pt in selected_types for pt in item.get("publication_types", []))
-            ]
-                    
+            facets = st.session_state.facets
+            filters = self._facet_filters(facets) if facets is not None else {}
+            filtered_results = facets.filter(st.session_state.similarities, filters) if facets is not None \
+                else st.session_state.similarities
 
             st.markdown("### 🧠 Top Matches")
-            for item in filtered_results:
-                title = item['title']
-                journal = item.get('journal')
-                pub_year = item.get('pub_year')
-                
-                expander_label = f"""**{title}**
-                    \n {journal} · {pub_year}"""
-                with st.expander(expander_label):
-                    # st.markdown(f"**PMID:** {item['pmid']}")
-                    st.markdown(f"**Abstract:** {item['abstract']}")
-                    if item['doi']:
-                        st.markdown(f"[🔗 View on DOI](https://doi.org/{item['doi']})")
-                    else:
-                        st.markdown(f"[🔗 View on PubMed](https://pubmed.ncbi.nlm.nih.gov/{item['pmid']}/)")
-
-            
\ No newline at end of file
+            self._render_results(filtered_results)
+
+    def _facet_filters(self, facets):
+        """
+        Sidebar facet widgets; returns facet -> selected values (None = unconstrained)
+
+        Counts next to each value are drill-down counts: articles that match
+        the other facets' current selections.
+        """
+        pub_types = facets.values("publication_types")
+        widgets = (
+            ("publication_types", "📄 Filter by Publication Type", "publication_type_filter"),
+            ("pub_year", "📅 Filter by Year", "pub_year_filter"),
+            ("journal", "📰 Filter by Journal", "journal_filter"),
+        )
+
+        def as_filter(field, selected):
+            if field == "publication_types":
+                # Everything selected means no filter, so articles without a type stay visible
+                return None if selected is None or len(selected) == len(pub_types) else selected
+            # Nothing selected means any value
+            return selected or None
+
+        # Widget state from this rerun is already in session_state, so counts match the selections
+        current = {field: as_filter(field, st.session_state.get(key)) for field, _, key in widgets}
+
+        filters = {}
+        for field, label, key in widgets:
+            counts = facets.counts(field, current)
+            options = pub_types if field == "publication_types" else facets.values(field)
+            selected = st.sidebar.multiselect(
+                label,
+                options,
+                default=pub_types if field == "publication_types" else None,
+                format_func=lambda v, counts=counts: f"{v} ({counts.get(v, 0)})",
+                key=key
+            )
+            filters[field] = as_filter(field, selected)
+        return filters
+
+    def _render_timings(self, job):
+        """
+        Per-stage time, counts and cache hits of the last search
+        """
+        rows = summarize(job.spans)
+        total = next((row["total_ms"] for row in rows if row["stage"] == "search"), None)
+        label = "⏱️ Stage timings" + (f" · {total / 1000:.2f}s total" if total is not None else "")
+        with st.expander(label):
+            st.table(rows)
+
+    @staticmethod
+    def _rerun():
+        rerun = getattr(st, "rerun", None) or st.experimental_rerun
+        rerun()
+
+    def _render_results(self, results):
+        """
+        Render one expander per result
+        """
+        for item in results:
+            title = item['title']
+            journal = item.get('journal')
+            pub_year = item.get('pub_year')
+            
+            expander_label = f"""**{title}**
+                \n {journal} · {pub_year}"""
+            with st.expander(expander_label):
+                # st.markdown(f"**PMID:** {item['pmid']}")
+                st.markdown(f"**Abstract:** {item['abstract']}")
+                if item['doi']:
+                    st.markdown(f"[🔗 View on DOI](https://doi.org/{item['doi']})")
+                else:
+                    st.markdown(f"[🔗 View on PubMed](https://pubmed.ncbi.nlm.nih.gov/{item['pmid']}/)")
@@ -0,0 +1,843 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Set
+
+import faiss
+import numpy as np
+
+from chunking import CHUNKED_FIELDS, MAX_CHUNKS
+
+
+INDEX_TYPES = ("flat", "ivfpq", "hnsw", "sq8", "sqfp16")
+
+# Text fields embedded per article, one index each
+INDEX_FIELDS = ("title", "abstract", "combined")
+
+def chunk_id(pmid, n: int) -> int:
+    """
+    Vector id of chunk n of pmid in a ChunkIndex
+    """
+    return int(pmid) * MAX_CHUNKS + n
+
+
+def pmid_of_chunk(vector_id: int) -> str:
+    return str(int(vector_id) // MAX_CHUNKS)
+
+
+class IndexConfig:
+    def __init__(self, index_type="flat", metric="ip", nlist=1024, pq_m=64, pq_nbits=8,
+                 hnsw_m=32, nprobe=16, ef_search=64, train_size=None):
+        """
+        How a PmidFaissIndex lays out its vectors
+
+        Args:
+            index_type (str): 'flat' (exact), 'ivfpq', 'hnsw', 'sq8' (int8) or 'sqfp16' (float16)
+            metric (str): 'ip' (cosine: vectors are L2-normalized, scores are similarities)
+                or 'l2' (squared L2 distances)
+            nlist (int): IVF cells (ivfpq)
+            pq_m (int): PQ sub-quantizers; must divide the dimension (ivfpq)
+            pq_nbits (int): Bits per PQ code (ivfpq)
+            hnsw_m (int): Graph degree (hnsw)
+            nprobe (int): IVF cells visited per query (ivfpq)
+            ef_search (int): HNSW search beam width (hnsw)
+            train_size (int, optional): Vectors to buffer before training; defaults per type
+        """
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index_type {index_type!r}; expected one of {INDEX_TYPES}")
+        if metric not in ("l2", "ip"):
+            raise ValueError(f"Unknown metric {metric!r}; expected 'l2' or 'ip'")
+        self.index_type = index_type
+        self.metric = metric
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.pq_nbits = pq_nbits
+        self.hnsw_m = hnsw_m
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        if train_size is None:
+            if index_type == "ivfpq":
+                # faiss wants ~39 points per centroid for both IVF and PQ
+                train_size = 39 * max(nlist, 2 ** pq_nbits)
+            elif index_type in ("sq8", "sqfp16"):
+                train_size = 1000
+            else:
+                train_size = 0
+        self.train_size = train_size
+
+    def factory_string(self):
+        if self.index_type == "flat":
+            desc = "Flat"
+        elif self.index_type == "ivfpq":
+            desc = f"IVF{self.nlist},PQ{self.pq_m}x{self.pq_nbits}"
+        elif self.index_type == "hnsw":
+            desc = f"HNSW{self.hnsw_m}"
+        elif self.index_type == "sq8":
+            desc = "SQ8"
+        else:
+            desc = "SQfp16"
+        return f"IDMap2,{desc}"
+
+    def build(self, dim):
+        metric = faiss.METRIC_INNER_PRODUCT if self.metric == "ip" else faiss.METRIC_L2
+        return faiss.index_factory(dim, self.factory_string(), metric)
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class PmidFaissIndex:
+    def __init__(self, dim: int, path: Optional[str] = None, config: Optional[IndexConfig] = None,
+                 model: Optional[str] = None):
+        """
+        Long-lived FAISS index keyed by PMID
+
+        Vectors are stored under their integer PMID so articles can be added
+        or replaced incrementally. Only the vectors and their ids are kept:
+        article records live in the ArticleStore, and the set of indexed PMIDs
+        is rebuilt from the FAISS id map on load. Index types that need
+        training (IVF-PQ, scalar quantization) buffer vectors until
+        config.train_size have arrived and answer queries exactly from that
+        buffer in the meantime.
+
+        Args:
+            dim (int): Embedding dimension
+            path (str, optional): File the index is saved to
+            config (IndexConfig, optional): Index type and parameters (exact cosine by default)
+            model (str, optional): Embedding model/backend the vectors come from
+                (PubMedBERTEmbedding.cache_name), recorded in the sidecar
+        """
+        self.dim = dim
+        self.path = path
+        self.model = model
+        self.config = config or IndexConfig()
+        self.cosine = self.config.metric == "ip"
+        self.index = self.config.build(dim)
+        self.pmids: Set[str] = set()
+        self._pending_ids = []
+        self._pending_vectors = []
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._mapped = False
+        self.set_search_params()
+
+    def __len__(self):
+        return self.index.ntotal + len(self._pending_ids)
+
+    def __contains__(self, pmid):
+        return str(pmid) in self.pmids
+
+    @property
+    def is_trained(self):
+        return self.index.is_trained
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        """
+        Tune the speed/recall trade-off (nprobe for IVF, efSearch for HNSW)
+        """
+        if nprobe is not None:
+            self.config.nprobe = nprobe
+        if ef_search is not None:
+            self.config.ef_search = ef_search
+
+        base = faiss.downcast_index(self.index.index)
+        if self.config.index_type == "ivfpq":
+            faiss.extract_index_ivf(base).nprobe = self.config.nprobe
+        elif self.config.index_type == "hnsw":
+            base.hnsw.efSearch = self.config.ef_search
+
+    def missing(self, pmids: List[str]) -> List[str]:
+        """
+        Return the PMIDs that are not yet indexed
+        """
+        with self._lock:
+            return [str(p) for p in pmids if str(p) not in self.pmids]
+
+    def add(self, pmids: List[str], vectors):
+        """
+        Add vectors for PMIDs that are not indexed yet; existing PMIDs are skipped
+        """
+        with self._lock:
+            keep = [i for i, pmid in enumerate(pmids) if str(pmid) not in self.pmids]
+            if not keep:
+                return 0
+            vectors = np.asarray(vectors, dtype=np.float32)[keep]
+            self._add([str(pmids[i]) for i in keep], vectors)
+            return len(keep)
+
+    def upsert(self, pmids: List[str], vectors):
+        """
+        Add vectors, replacing any already stored under the same PMID
+        """
+        with self._lock:
+            pmids = [str(p) for p in pmids]
+            existing = {int(p) for p in pmids if p in self.pmids}
+            if existing:
+                self._remove(existing)
+            self._add(pmids, np.asarray(vectors, dtype=np.float32))
+            return len(pmids)
+
+    def _ensure_writable(self):
+        # Memory-mapped indexes are read-only; reload into RAM before the first write
+        if self._mapped:
+            self.index = faiss.read_index(self.path)
+            self._mapped = False
+            self.set_search_params()
+
+    def _remove(self, ids):
+        self._ensure_writable()
+        if self._pending_ids:
+            keep = [i for i, pmid in enumerate(self._pending_ids) if pmid not in ids]
+            self._pending_ids = [self._pending_ids[i] for i in keep]
+            self._pending_vectors = [self._pending_vectors[i] for i in keep]
+        if self.index.ntotal:
+            try:
+                self.index.remove_ids(np.asarray(sorted(ids), dtype=np.int64))
+            except RuntimeError as e:
+                raise ValueError(
+                    f"{self.config.index_type} indexes cannot replace vectors; rebuild the index instead"
+                ) from e
+
+    def _prepare(self, vectors):
+        vectors = np.array(vectors, dtype=np.float32, copy=True)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        if self.cosine:
+            faiss.normalize_L2(vectors)
+        return vectors
+
+    def _add(self, pmids, vectors):
+        self.pmids.update(pmids)
+        self._add_vectors(np.asarray([int(p) for p in pmids], dtype=np.int64), vectors)
+
+    def _add_vectors(self, ids, vectors):
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of shape (n, {self.dim}), got {vectors.shape}")
+        self._ensure_writable()
+        vectors = self._prepare(vectors)
+        self._dirty = True
+
+        if self.index.is_trained:
+            self.index.add_with_ids(np.ascontiguousarray(vectors), ids)
+            return
+
+        self._pending_ids.extend(ids.tolist())
+        self._pending_vectors.extend(vectors)
+        if len(self._pending_ids) >= self.config.train_size:
+            self.train()
+
+    def train(self, sample=None):
+        """
+        Train the quantizer, then move buffered vectors into the index
+
+        Args:
+            sample (np.ndarray, optional): Training vectors; defaults to a random
+                sample of the buffered ones
+        """
+        with self._lock:
+            if self.index.is_trained:
+                return
+            self._ensure_writable()
+            if sample is None:
+                if not self._pending_vectors:
+                    raise ValueError("No vectors to train on")
+                pending = np.vstack(self._pending_vectors).astype(np.float32)
+                rng = np.random.default_rng(0)
+                limit = max(self.config.train_size, 1) * 4
+                if len(pending) > limit:
+                    pending = pending[rng.choice(len(pending), limit, replace=False)]
+                sample = pending
+            print(f"[INFO] Training {self.config.index_type} index on {len(sample)} vectors")
+            self.index.train(self._prepare(sample))
+            self.set_search_params()
+
+            if self._pending_ids:
+                self.index.add_with_ids(
+                    np.ascontiguousarray(np.vstack(self._pending_vectors), dtype=np.float32),
+                    np.asarray(self._pending_ids, dtype=np.int64),
+                )
+                self._pending_ids = []
+                self._pending_vectors = []
+            self._dirty = True
+
+    def _search_pending(self, query, k):
+        # Exact search over vectors still waiting for training
+        vectors = np.vstack(self._pending_vectors).astype(np.float32)
+        if self.config.metric == "ip":
+            scores = vectors @ query[0]
+            order = np.argsort(-scores)[:k]
+        else:
+            scores = ((vectors - query[0]) ** 2).sum(axis=1)
+            order = np.argsort(scores)[:k]
+        return scores[order].reshape(1, -1), np.asarray(self._pending_ids, dtype=np.int64)[order].reshape(1, -1)
+
+    def _search_ids(self, query, k):
+        # Raw (scores, ids) of the k nearest stored vectors, or (None, None) when empty
+        if self.index.ntotal:
+            return self.index.search(query, min(k, self.index.ntotal))
+        if self._pending_ids:
+            return self._search_pending(query, k)
+        return None, None
+
+    def _passes(self, score, threshold):
+        if threshold is None:
+            return True
+        return score >= threshold if self.cosine else score <= threshold
+
+    def search(self, query_vector, k: int = 25, threshold: Optional[float] = None):
+        """
+        Search the accumulated corpus
+
+        Results come back best first, so with a threshold the scan stops at the
+        first neighbour that misses it and nothing below it is materialized.
+
+        Args:
+            query_vector: Query embedding
+            k (int): Number of neighbours to return
+            threshold (float, optional): Minimum cosine similarity ('ip') or
+                maximum squared distance ('l2')
+
+        Returns:
+            list: (pmid, score) tuples, best first; score is the cosine
+                similarity for 'ip' indexes and the squared L2 distance for 'l2'
+        """
+        with self._lock:
+            distances, ids = self._search_ids(self._prepare(query_vector), k)
+            if ids is None:
+                return []
+
+            results = []
+            for score, pmid in zip(distances[0], ids[0]):
+                if pmid < 0:
+                    continue
+                if not self._passes(score, threshold):
+                    break
+                results.append((str(pmid), float(score)))
+            return results
+
+    def scores(self, query_vector, pmids: List[str]) -> np.ndarray:
+        """
+        Score specific PMIDs against a query without a search
+
+        Vectors are reconstructed from the index (approximately for quantized
+        layouts), so the scores match what search() would return for them.
+
+        Returns:
+            np.ndarray: One score per PMID; NaN where the PMID is not indexed or
+                the layout cannot reconstruct vectors (IVF-PQ)
+        """
+        with self._lock:
+            out = np.full(len(pmids), np.nan, dtype=np.float32)
+            known = [i for i, pmid in enumerate(pmids) if str(pmid) in self.pmids]
+            if known:
+                out[known] = self._id_scores(
+                    self._prepare(query_vector)[0], [int(pmids[i]) for i in known]
+                )
+            return out
+
+    def _id_scores(self, query, ids):
+        # Scores of stored vectors by id; NaN where they cannot be reconstructed
+        out = np.full(len(ids), np.nan, dtype=np.float32)
+        pending = {vector_id: i for i, vector_id in enumerate(self._pending_ids)}
+        stored = []
+        for i, vector_id in enumerate(ids):
+            if vector_id in pending:
+                vector = self._pending_vectors[pending[vector_id]]
+                out[i] = vector @ query if self.cosine else ((vector - query) ** 2).sum()
+            else:
+                stored.append(i)
+
+        if stored and self.index.ntotal:
+            try:
+                vectors = self.index.reconstruct_batch(np.asarray([ids[i] for i in stored], dtype=np.int64))
+            except RuntimeError:
+                return out
+            if self.cosine:
+                out[stored] = vectors @ query
+            else:
+                out[stored] = ((vectors - query) ** 2).sum(axis=1)
+        return out
+
+    def range_search(self, query_vector, threshold: float):
+        """
+        Return every indexed vector that passes threshold, best first
+
+        Args:
+            query_vector: Query embedding
+            threshold (float): Minimum cosine similarity ('ip') or maximum squared distance ('l2')
+
+        Returns:
+            list: (pmid, score) tuples
+        """
+        with self._lock:
+            scores, ids = self._range_ids(self._prepare(query_vector), threshold)
+            order = sorted(range(len(ids)), key=lambda i: scores[i], reverse=self.cosine)
+            return [(str(ids[i]), float(scores[i])) for i in order]
+
+    def _range_ids(self, query, threshold):
+        scores, ids = [], []
+        if self.index.ntotal:
+            _, found_scores, found_ids = self.index.range_search(query, float(threshold))
+            scores.extend(found_scores.tolist())
+            ids.extend(found_ids.tolist())
+        if self._pending_ids:
+            pending_scores, pending_ids = self._search_pending(query, len(self._pending_ids))
+            for score, vector_id in zip(pending_scores[0], pending_ids[0]):
+                if self._passes(score, threshold):
+                    scores.append(float(score))
+                    ids.append(int(vector_id))
+        return scores, ids
+
+    def save(self, path: Optional[str] = None):
+        """
+        Write the index and its config sidecar to disk
+
+        The sidecar only holds the dimension and layout, so its size does not
+        grow with the corpus; PMIDs are the vector ids of the index itself.
+        """
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given to save the index to")
+        with self._save_lock:
+            # Snapshot in memory under the lock; searches and adds only wait
+            # for the copy, not for the disk writes below
+            with self._lock:
+                data = faiss.serialize_index(self.index)
+                pending = None
+                if self._pending_ids:
+                    pending = (np.asarray(self._pending_ids, dtype=np.int64),
+                               np.vstack(self._pending_vectors).astype(np.float32))
+                sidecar = self._sidecar()
+                self._dirty = False
+
+            try:
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(path + ".tmp", "wb") as f:
+                    f.write(data.tobytes())
+                os.replace(path + ".tmp", path)
+                if pending is not None:
+                    np.savez(path + ".pending.npz", ids=pending[0], vectors=pending[1])
+                elif os.path.exists(path + ".pending.npz"):
+                    os.remove(path + ".pending.npz")
+                with open(path + ".meta.json.tmp", "w", encoding="utf-8") as f:
+                    json.dump(sidecar, f, ensure_ascii=False)
+                os.replace(path + ".meta.json.tmp", path + ".meta.json")
+            except BaseException:
+                self._dirty = True
+                raise
+            self.path = path
+
+    def _sidecar(self):
+        return {"dim": self.dim, "config": self.config.to_dict(), "model": self.model}
+
+    def _load_sidecar(self, sidecar):
+        self.model = sidecar.get("model")
+
+    def _vector_ids(self) -> np.ndarray:
+        # Every stored vector id: the FAISS id map plus the untrained buffer
+        ids = faiss.vector_to_array(self.index.id_map) if self.index.ntotal else np.empty(0, dtype=np.int64)
+        return np.concatenate([ids, np.asarray(self._pending_ids, dtype=np.int64)])
+
+    def _load_ids(self, ids: np.ndarray):
+        self.pmids = set(ids.astype(str).tolist())
+
+    def save_if_dirty(self):
+        if self._dirty:
+            self.save()
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True):
+        """
+        Load an index written by save()
+
+        Args:
+            path (str): Index file
+            mmap (bool): Memory-map the index file instead of reading it into RAM
+        """
+        with open(path + ".meta.json", encoding="utf-8") as f:
+            sidecar = json.load(f)
+
+        # Indexes saved before configs were recorded are exact L2
+        config = IndexConfig.from_dict(sidecar["config"]) if "config" in sidecar else IndexConfig(metric="l2")
+        obj = cls(sidecar["dim"], path, config)
+        flags = faiss.IO_FLAG_MMAP if mmap else 0
+        obj.index = faiss.read_index(path, flags)
+        obj._mapped = mmap
+        obj._load_sidecar(sidecar)
+        if os.path.exists(path + ".pending.npz"):
+            pending = np.load(path + ".pending.npz")
+            obj._pending_ids = pending["ids"].tolist()
+            obj._pending_vectors = list(pending["vectors"])
+        obj._load_ids(obj._vector_ids())
+        obj.set_search_params()
+        return obj
+
+
+class ChunkIndex(PmidFaissIndex):
+    def __init__(self, dim: int, path: Optional[str] = None, config: Optional[IndexConfig] = None,
+                 aggregate: str = "max", model: Optional[str] = None):
+        """
+        PmidFaissIndex over article chunks, scored per article
+
+        Every chunk vector is stored under chunk_id(pmid, n) and chunk_counts
+        records how many chunks each PMID has, so chunk hits map back to their
+        article. search(), scores() and range_search() aggregate chunk
+        similarities into one score per article.
+
+        Args:
+            dim (int): Embedding dimension
+            path (str, optional): File the index is saved to
+            config (IndexConfig, optional): Index type and parameters (must be cosine)
+            aggregate (str): 'max' (best chunk) or 'mean' (average over all chunks)
+            model (str, optional): Embedding model/backend the vectors come from
+        """
+        super().__init__(dim, path, config, model)
+        if not self.cosine:
+            raise ValueError("Chunk indexes need cosine ('ip') similarity")
+        if aggregate not in ("max", "mean"):
+            raise ValueError(f"Unknown aggregate {aggregate!r}; expected 'max' or 'mean'")
+        self.aggregate = aggregate
+        self.chunk_counts: Dict[str, int] = {}
+
+    def _chunk_ids(self, pmid):
+        return [chunk_id(pmid, n) for n in range(self.chunk_counts.get(str(pmid), 0))]
+
+    def add(self, pmids: List[str], vectors, counts: Optional[List[int]] = None):
+        """
+        Add chunk vectors for PMIDs that are not indexed yet
+
+        Args:
+            pmids (list): One PMID per article
+            vectors: Chunk vectors of all articles, in order
+            counts (list, optional): Chunks per article (one each by default)
+        """
+        with self._lock:
+            counts = counts or [1] * len(pmids)
+            vectors = np.asarray(vectors, dtype=np.float32)
+            starts = np.concatenate([[0], np.cumsum(counts)])
+            keep = [i for i, pmid in enumerate(pmids) if str(pmid) not in self.pmids]
+            if not keep:
+                return 0
+            rows = np.concatenate([np.arange(starts[i], starts[i + 1]) for i in keep])
+            self._add([str(pmids[i]) for i in keep], vectors[rows], [counts[i] for i in keep])
+            return len(keep)
+
+    def upsert(self, pmids: List[str], vectors, counts: Optional[List[int]] = None):
+        """
+        Add chunk vectors, replacing all chunks already stored under the same PMIDs
+        """
+        with self._lock:
+            pmids = [str(p) for p in pmids]
+            existing = {i for p in pmids if p in self.pmids for i in self._chunk_ids(p)}
+            if existing:
+                self._remove(existing)
+            self._add(pmids, np.asarray(vectors, dtype=np.float32), counts or [1] * len(pmids))
+            return len(pmids)
+
+    def _add(self, pmids, vectors, counts):
+        if sum(counts) != len(vectors):
+            raise ValueError(f"Got {len(vectors)} vectors for {sum(counts)} chunks")
+        if max(counts, default=0) > MAX_CHUNKS:
+            raise ValueError(f"At most {MAX_CHUNKS} chunks per article")
+        ids = []
+        for pmid, count in zip(pmids, counts):
+            self.pmids.add(pmid)
+            self.chunk_counts[pmid] = count
+            ids.extend(chunk_id(pmid, n) for n in range(count))
+        self._add_vectors(np.asarray(ids, dtype=np.int64), vectors)
+
+    def _aggregate(self, query, chunk_scores):
+        # chunk_scores: pmid -> scores of the chunks a search returned
+        pmids = list(chunk_scores)
+        if self.aggregate == "max":
+            return {pmid: max(chunk_scores[pmid]) for pmid in pmids}
+
+        results = {}
+        for pmid in pmids:
+            ids = self._chunk_ids(pmid)
+            if len(ids) == 1:
+                results[pmid] = chunk_scores[pmid][0]
+                continue
+            scores = self._id_scores(query, ids)
+            # Chunks that cannot be reconstructed fall back to the ones found
+            results[pmid] = float(np.nanmean(scores)) if not np.isnan(scores).all() \
+                else float(np.mean(chunk_scores[pmid]))
+        return results
+
+    def search(self, query_vector, k: int = 25, threshold: Optional[float] = None):
+        """
+        Search chunks and return the best k articles
+
+        Returns:
+            list: (pmid, score) tuples, best first; score is the best
+                chunk's cosine similarity ('max') or the mean over the article's
+                chunks ('mean')
+        """
+        with self._lock:
+            query = self._prepare(query_vector)
+            # Articles have about one chunk each; over-fetch so k distinct ones come back
+            distances, ids = self._search_ids(query, k * 2 + 8)
+            if ids is None:
+                return []
+
+            chunk_scores = {}
+            for score, vector_id in zip(distances[0], ids[0]):
+                if vector_id < 0:
+                    continue
+                chunk_scores.setdefault(pmid_of_chunk(vector_id), []).append(float(score))
+            scores = self._aggregate(query[0], chunk_scores)
+
+            results = []
+            for pmid in sorted(scores, key=scores.get, reverse=True)[:k]:
+                if not self._passes(scores[pmid], threshold):
+                    break
+                results.append((pmid, scores[pmid]))
+            return results
+
+    def scores(self, query_vector, pmids: List[str]) -> np.ndarray:
+        with self._lock:
+            query = self._prepare(query_vector)[0]
+            out = np.full(len(pmids), np.nan, dtype=np.float32)
+            for i, pmid in enumerate(pmids):
+                ids = self._chunk_ids(pmid)
+                if not ids:
+                    continue
+                chunk_scores = self._id_scores(query, ids)
+                if np.isnan(chunk_scores).all():
+                    continue
+                out[i] = np.nanmax(chunk_scores) if self.aggregate == "max" else np.nanmean(chunk_scores)
+            return out
+
+    def range_search(self, query_vector, threshold: float):
+        with self._lock:
+            query = self._prepare(query_vector)
+            found, ids = self._range_ids(query, threshold)
+            chunk_scores = {}
+            for score, vector_id in zip(found, ids):
+                chunk_scores.setdefault(pmid_of_chunk(vector_id), []).append(float(score))
+            scores = self._aggregate(query[0], chunk_scores)
+            return [
+                (pmid, scores[pmid])
+                for pmid in sorted(scores, key=scores.get, reverse=True)
+                if self._passes(scores[pmid], threshold)
+            ]
+
+    def _sidecar(self):
+        sidecar = super()._sidecar()
+        sidecar["aggregate"] = self.aggregate
+        return sidecar
+
+    def _load_sidecar(self, sidecar):
+        super()._load_sidecar(sidecar)
+        self.aggregate = sidecar.get("aggregate", self.aggregate)
+
+    def _load_ids(self, ids: np.ndarray):
+        # Chunk ids of an article are contiguous from 0, so counting them gives chunk_counts
+        pmids, counts = np.unique(ids // MAX_CHUNKS, return_counts=True)
+        self.chunk_counts = dict(zip(pmids.astype(str).tolist(), counts.tolist()))
+        self.pmids = set(self.chunk_counts)
+
+
+class VectorIndexStore:
+    def __init__(self, directory=".pubkin_cache/indexes", dim=768, mmap=True, config=None,
+                 chunked_fields=CHUNKED_FIELDS, aggregate="max", article_store=None, model=None):
+        """
+        One persistent PmidFaissIndex per use_case ('title', 'abstract', 'combined')
+
+        Together the indexes hold every field vector of an article, so a search
+        can rank by one field or by a weighted mix of fields without embedding
+        anything again. Fields in chunked_fields get a ChunkIndex, so long
+        abstracts are embedded chunk by chunk instead of being truncated.
+
+        Args:
+            directory (str, optional): Where index files are kept; None keeps them in memory
+            dim (int): Embedding dimension of the model in use
+            mmap (bool): Memory-map existing indexes when loading them
+            config (IndexConfig, optional): Layout for newly created indexes (exact cosine by default)
+            chunked_fields (tuple): Fields indexed per chunk (cosine indexes only)
+            aggregate (str): How chunk similarities become an article score ('max' or 'mean')
+            article_store (ArticleStore, optional): Where the records of indexed
+                articles are looked up, so hits from the accumulated corpus can be shown
+            model (str, optional): Embedding model/backend in use
+                (PubMedBERTEmbedding.cache_name); an index built by another one
+                is not loaded, since its vectors are not comparable
+        """
+        self.directory = directory
+        self.dim = dim
+        self.mmap = mmap
+        self.config = config or IndexConfig()
+        self.chunked_fields = tuple(chunked_fields) if self.config.metric == "ip" else ()
+        self.aggregate = aggregate
+        self.article_store = article_store
+        self.model = model
+        self._indexes: Dict[str, PmidFaissIndex] = {}
+        self._lock = threading.Lock()
+
+    def is_chunked(self, use_case: str) -> bool:
+        return use_case in self.chunked_fields
+
+    def _path(self, use_case):
+        if self.directory is None:
+            return None
+        # Chunk indexes use other vector ids, so they never share a file with a per-article index
+        suffix = ".chunks.faiss" if self.is_chunked(use_case) else ".faiss"
+        return os.path.join(self.directory, use_case + suffix)
+
+    def _new_index(self, use_case, path):
+        config = IndexConfig.from_dict(self.config.to_dict())
+        if self.is_chunked(use_case):
+            return ChunkIndex(self.dim, path, config, aggregate=self.aggregate, model=self.model)
+        return PmidFaissIndex(self.dim, path, config, model=self.model)
+
+    def get(self, use_case: str) -> PmidFaissIndex:
+        """
+        Return the index for use_case, loading it from disk on first access
+        """
+        with self._lock:
+            if use_case not in self._indexes:
+                path = self._path(use_case)
+                if path and os.path.exists(path) and os.path.exists(path + ".meta.json"):
+                    print(f"[INFO] Loading {use_case} index from {path}")
+                    index_class = ChunkIndex if self.is_chunked(use_case) else PmidFaissIndex
+                    index = index_class.load(path, mmap=self.mmap)
+                    if index.config.metric != self.config.metric:
+                        # Scores would mean something else; start over (vectors come from the embedding cache)
+                        print(f"[WARN] {path} uses metric {index.config.metric!r}, expected "
+                              f"{self.config.metric!r}; rebuilding it")
+                        index = self._new_index(use_case, path)
+                    elif self.model and index.model != self.model:
+                        # Vectors of another model or backend (torch vs onnx/int8) must not be mixed in;
+                        # indexes saved before models were recorded count as foreign too
+                        print(f"[WARN] {path} holds {index.model or 'unrecorded'} vectors, expected "
+                              f"{self.model}; rebuilding it")
+                        index = self._new_index(use_case, path)
+                else:
+                    index = self._new_index(use_case, path)
+                self._indexes[use_case] = index
+            return self._indexes[use_case]
+
+    def search(self, query_vector, use_case="combined", k: int = 25, threshold: Optional[float] = None,
+               pool: Optional[int] = None):
+        """
+        Search one field, or a weighted combination of fields
+
+        Args:
+            query_vector: Query embedding
+            use_case: Field name, or a dict of field -> weight
+            k (int): Number of results
+            threshold (float, optional): Minimum (weighted) cosine similarity
+            pool (int, optional): Candidates taken from each field before
+                re-scoring; defaults to 4 * k
+
+        Returns:
+            list: (pmid, score) tuples, best first. A weighted score is
+                the weighted mean of the article's field similarities over the
+                fields it has text for.
+        """
+        if isinstance(use_case, str):
+            return self.get(use_case).search(query_vector, k=k, threshold=threshold)
+
+        weights = {field: float(w) for field, w in use_case.items() if w}
+        if not weights:
+            return []
+        if self.config.metric != "ip":
+            raise ValueError("Weighted field search needs cosine ('ip') indexes")
+
+        pool = pool or max(k * 4, 100)
+        indexes = {field: self.get(field) for field in weights}
+
+        # Candidates: the union of each field's nearest neighbours
+        found = {}
+        floors = {}
+        candidates = {}
+        for field, index in indexes.items():
+            results = index.search(query_vector, k=pool)
+            found[field] = dict(results)
+            # Candidates a field did not return scored at most its worst returned score
+            floors[field] = results[-1][1] if len(results) >= pool else None
+            candidates.update(found[field])
+        candidates = list(candidates)
+        if not candidates:
+            return []
+
+        total = np.zeros(len(candidates), dtype=np.float64)
+        weight_sum = np.zeros(len(candidates), dtype=np.float64)
+        for field, index in indexes.items():
+            unseen = [i for i, pmid in enumerate(candidates) if pmid not in found[field]]
+            rescored = index.scores(query_vector, [candidates[i] for i in unseen]) if unseen else []
+            field_scores = np.full(len(candidates), np.nan)
+            for i, pmid in enumerate(candidates):
+                if pmid in found[field]:
+                    field_scores[i] = found[field][pmid]
+            for i, score in zip(unseen, rescored):
+                if not np.isnan(score):
+                    field_scores[i] = score
+                elif candidates[i] in index and floors[field] is not None:
+                    field_scores[i] = floors[field]
+            present = ~np.isnan(field_scores)
+            total[present] += weights[field] * field_scores[present]
+            weight_sum[present] += weights[field]
+
+        scores = total / np.maximum(weight_sum, 1e-12)
+        results = []
+        for i in np.argsort(-scores):
+            if threshold is not None and scores[i] < threshold:
+                break
+            results.append((candidates[i], float(scores[i])))
+            if len(results) >= k:
+                break
+        return results
+
+    def scores(self, query_vector, pmids: List[str], use_case="combined") -> np.ndarray:
+        """
+        Similarity of specific PMIDs to a query, by one field or a weighted mix
+
+        Returns:
+            np.ndarray: One score per PMID; a weighted score averages the fields
+                that have a vector for the PMID, NaN where none has
+        """
+        if isinstance(use_case, str):
+            return self.get(use_case).scores(query_vector, pmids)
+        total = np.zeros(len(pmids), dtype=np.float64)
+        weight_sum = np.zeros(len(pmids), dtype=np.float64)
+        for field, weight in use_case.items():
+            if not weight:
+                continue
+            field_scores = self.get(field).scores(query_vector, pmids)
+            present = ~np.isnan(field_scores)
+            total[present] += float(weight) * field_scores[present]
+            weight_sum[present] += float(weight)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(weight_sum > 0, total / weight_sum, np.nan)
+
+    def articles(self, pmids: List[str]) -> Dict[str, Dict]:
+        """
+        Records of indexed articles from the article store, however old
+
+        Returns:
+            dict: pmid -> article dict for the PMIDs the store has
+        """
+        if self.article_store is None or not pmids:
+            return {}
+        return self.article_store.get_many(pmids, fresh_only=False)
+
+    def load_all(self, use_cases=INDEX_FIELDS):
+        """
+        Eagerly load the indexes for use_cases (call once at startup)
+        """
+        for use_case in use_cases:
+            self.get(use_case)
+
+    def save_all(self):
+        with self._lock:
+            indexes = list(self._indexes.values())
+        for index in indexes:
+            if index.path:
+                index.save_if_dirty()
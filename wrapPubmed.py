@@ -1,12 +1,138 @@
 from sentence_transformers import SentenceTransformer
 from langchain.embeddings.base import Embeddings
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+from metrics import span
 
 class PubMedBERTEmbedding(Embeddings):
-    def __init__(self, model_name="neuml/pubmedbert-base-embeddings"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name="neuml/pubmedbert-base-embeddings", cache=None, batch_size=64,
+                 service=None, backend="torch", onnx_dir=None, int8=True):
+        """
+        Args:
+            model_name (str): SentenceTransformer model to load
+            cache (EmbeddingCache, optional): Persistent vector store consulted before encoding
+            batch_size (int): Encode batch size
+            service (EmbeddingService, optional): Worker pool to encode with instead
+                of a model in this process
+            backend (str): 'torch' (SentenceTransformer) or 'onnx' (ONNX Runtime export,
+                see onnx_backend.py)
+            onnx_dir (str, optional): Exported model directory for the onnx backend
+            int8 (bool): Use the int8-quantized graph with the onnx backend
+        """
+        if service is not None:
+            backend, int8 = service.backend, service.int8
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"Unknown backend {backend!r}; expected 'torch' or 'onnx'")
+        self.model_name = model_name
+        self.backend = backend
+        # Vectors from different backends differ slightly; never mix them in the cache
+        self.cache_name = model_name if backend == "torch" else f"{model_name}#onnx{'-int8' if int8 else ''}"
+        if service is not None:
+            self.model = service
+        elif backend == "onnx":
+            from onnx_backend import DEFAULT_ONNX_DIR, OnnxEncoder
+            self.model = OnnxEncoder(onnx_dir or DEFAULT_ONNX_DIR, int8=int8)
+        else:
+            self.model = SentenceTransformer(model_name)
+        self.cache = cache
+        self.batch_size = batch_size
+
+    def embed_texts(self, texts, field="text", ids=None):
+        """
+        Embed texts, reusing cached vectors where possible
+
+        Args:
+            texts (list): Texts to embed
+            field (str): Field the texts come from ('title', 'abstract', 'combined', ...)
+            ids (list, optional): PMIDs aligned with texts; '' when unknown
+
+        Returns:
+            np.ndarray: float32 matrix of shape (len(texts), dim)
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        if self.cache is None:
+            return self._encode(texts)
+
+        with span("embed", count=len(texts)) as timing:
+            ids = [str(i) for i in ids] if ids is not None else [''] * len(texts)
+            keys = [(pmid, EmbeddingCache.text_hash(text)) for pmid, text in zip(ids, texts)]
+            hits = self.cache.get_many(self.cache_name, field, keys)
+
+            missing = [i for i, key in enumerate(keys) if key not in hits]
+            vectors = [hits.get(key) for key in keys]
+            timing.add(cache_hits=len(texts) - len(missing), cache_misses=len(missing))
+
+            if missing:
+                encoded = self._encode([texts[i] for i in missing])
+                self.cache.put_many(self.cache_name, field, [(keys[i], encoded[j]) for j, i in enumerate(missing)])
+                for j, i in enumerate(missing):
+                    vectors[i] = encoded[j]
+
+            return np.vstack(vectors).astype(np.float32, copy=False)
+
+    def embed_fields(self, texts_by_field, ids_by_field=None):
+        """
+        Embed several fields at once, encoding every cache miss in one batched pass
+
+        Args:
+            texts_by_field (dict): field -> list of texts
+            ids_by_field (dict, optional): field -> PMIDs aligned with the texts
+
+        Returns:
+            dict: field -> float32 matrix of shape (len(texts), dim)
+        """
+        ids_by_field = ids_by_field or {}
+        dim = self.model.get_sentence_embedding_dimension()
+        with span("embed") as timing:
+            vectors = {}
+            misses = []  # (field, position, cache key, text)
+            for field, texts in texts_by_field.items():
+                texts = list(texts)
+                vectors[field] = [None] * len(texts)
+                ids = ids_by_field.get(field)
+                ids = [str(i) for i in ids] if ids is not None else [''] * len(texts)
+                keys = [(pmid, EmbeddingCache.text_hash(text)) for pmid, text in zip(ids, texts)]
+                hits = self.cache.get_many(self.cache_name, field, keys) if self.cache is not None else {}
+                for i, key in enumerate(keys):
+                    if key in hits:
+                        vectors[field][i] = hits[key]
+                    else:
+                        misses.append((field, i, key, texts[i]))
+
+            total = sum(len(vecs) for vecs in vectors.values())
+            timing.add(count=total)
+            if self.cache is not None:
+                timing.add(cache_hits=total - len(misses), cache_misses=len(misses))
+
+            if misses:
+                encoded = self._encode([text for _, _, _, text in misses])
+                for j, (field, i, _, _) in enumerate(misses):
+                    vectors[field][i] = encoded[j]
+                if self.cache is not None:
+                    for field in texts_by_field:
+                        entries = [(key, encoded[j]) for j, (f, _, key, _) in enumerate(misses) if f == field]
+                        if entries:
+                            self.cache.put_many(self.cache_name, field, entries)
+
+        return {
+            field: np.vstack(vecs).astype(np.float32, copy=False) if vecs
+            else np.zeros((0, dim), dtype=np.float32)
+            for field, vecs in vectors.items()
+        }
+
+    def _encode(self, texts):
+        with span("encode", count=len(texts)):
+            return self.model.encode(
+                texts, batch_size=self.batch_size, convert_to_numpy=True
+            ).astype(np.float32, copy=False)
 
     def embed_documents(self, texts):
-        return self.model.encode(texts, convert_to_numpy=True).tolist()
+        return self.embed_texts(texts).tolist()
 
     def embed_query(self, text):
-        return self.model.encode(text, convert_to_numpy=True).tolist()
\ No newline at end of file
+        with span("encode", count=1):
+            return self.model.encode(text, convert_to_numpy=True).tolist()